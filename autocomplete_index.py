@@ -0,0 +1,154 @@
+# autocomplete_index.py
+# In-memory indexes for autocomplete across all semesters
+# Indexes are updated term by term when a quotas file appears, changes or disappears
+import bisect
+import os
+import re
+
+import quota_store
+import search_index
+
+# Length of the n-grams used to narrow down substring matches
+ngram_size = 3
+
+# Normalize text for space-insensitive, case-insensitive matching
+def normalize(text):
+    return text.replace(" ", "").upper()
+
+# Semesters with a quotas file, listed again only when the directory changes
+# "" (current semester) is always included
+semester_list_cache = (None, [""])
+history_files_regex = re.compile(r"quotas(\d{4})\.json")
+
+def list_semesters():
+    global semester_list_cache
+    try:
+        dir_version = os.stat(".").st_mtime_ns
+    except OSError:
+        return semester_list_cache[1]
+
+    if semester_list_cache[0] != dir_version:
+        semesters = [m.group(1) for m in map(history_files_regex.fullmatch, os.listdir()) if m]
+        semester_list_cache = (dir_version, [""] + sorted(semesters, reverse=True))
+    return semester_list_cache[1]
+
+# Create an empty index
+# extract(semester, quotas): get the terms of one quotas file
+def new_index(extract):
+    return {
+        "extract": extract,
+        "semesters": {},  # {semester: (quotas the terms came from, set of terms)}
+        "term_semesters": {},  # {term: set of semesters having the term}
+        "keys": [],  # Sorted list of (normalized term, term)
+        "ngrams": {}  # {n-gram: sorted list of (normalized term, term) containing it}
+    }
+
+def term_ngrams(key):
+    return {key[i: i + ngram_size] for i in range(len(key) - ngram_size + 1)}
+
+def add_term(index, term):
+    entry = (normalize(term), term)
+    bisect.insort(index["keys"], entry)
+    for ngram in term_ngrams(entry[0]):
+        bisect.insort(index["ngrams"].setdefault(ngram, []), entry)
+
+def remove_term(index, term):
+    entry = (normalize(term), term)
+    keys = index["keys"]
+    del keys[bisect.bisect_left(keys, entry)]
+    for ngram in term_ngrams(entry[0]):
+        postings = index["ngrams"][ngram]
+        del postings[bisect.bisect_left(postings, entry)]
+        if not postings:
+            del index["ngrams"][ngram]
+
+# Bring an index up to date with the quotas files on disk
+# Only semesters whose file changed are extracted again
+def refresh_index(index):
+    semesters = list_semesters()
+    term_semesters = index["term_semesters"]
+
+    # Get (old terms, new terms) of every semester that changed
+    changes = {}
+    for semester in list(index["semesters"]):
+        if semester not in semesters:  # File disappeared
+            changes[semester] = (index["semesters"].pop(semester)[1], set())
+    for semester in semesters:
+        quotas = quota_store.load_quotas(f'quotas{semester}.json')
+        if not quotas or 'time' not in quotas:  # Unavailable or incomplete file has no terms
+            quotas = None
+        cached = index["semesters"].get(semester, (None, set()))
+        if semester in index["semesters"] and cached[0] is quotas:
+            continue
+        terms = set(index["extract"](semester, quotas)) if quotas is not None else set()
+        index["semesters"][semester] = (quotas, terms)
+        changes[semester] = (cached[1], terms)
+
+    # Apply the difference to the index
+    for semester, (old_terms, new_terms) in changes.items():
+        for term in old_terms - new_terms:
+            term_semesters[term].discard(semester)
+            if not term_semesters[term]:
+                del term_semesters[term]
+                remove_term(index, term)
+        for term in new_terms - old_terms:
+            if term not in term_semesters:
+                term_semesters[term] = set()
+                add_term(index, term)
+            term_semesters[term].add(semester)
+
+# Find terms containing the query, ignoring spaces and case
+# Returns up to limit terms in alphabetical order
+# prefix_first: terms starting with the query come before the other matches
+def match_terms(index, query, limit=25, prefix_first=False):
+    query = normalize(query)
+    matches = []
+
+    # Terms starting with the query are next to each other in the sorted keys
+    if prefix_first:
+        keys = index["keys"]
+        for key, term in keys[bisect.bisect_left(keys, (query, )): ]:
+            if not key.startswith(query) or len(matches) >= limit:
+                break
+            matches.append(term)
+
+    # Short queries match most terms: scanning stops early
+    candidates = index["keys"]
+    # Longer queries only need to check terms sharing the rarest n-gram of the query
+    if len(query) >= ngram_size:
+        candidates = min((index["ngrams"].get(ngram, []) for ngram in term_ngrams(query)), key=len)
+
+    for key, term in candidates:
+        if len(matches) >= limit:
+            break
+        if query in key and not (prefix_first and key.startswith(query)):
+            matches.append(term)
+    return matches
+
+# Get semesters having a term, "" is the current semester
+def find_term_semesters(index, term):
+    refresh_index(index)
+    return index["term_semesters"].get(term, set())
+
+# Course codes of all semesters
+course_code_index = new_index(lambda semester, quotas: [k for k in quotas if k != 'time'])
+
+# Autocomplete course codes of all semesters
+def match_course_codes(query, limit=25):
+    refresh_index(course_code_index)
+    return match_terms(course_code_index, query, limit)
+
+# Search queries of all semesters: course code prefixes, instructors, TAs and common core areas
+def extract_search_queries(semester, quotas):
+    semester_index = search_index.get_search_index(semester)
+    if semester_index is None:
+        return []
+    return list(semester_index["prefixes"]) + list(semester_index["instructors"]) + list(semester_index["cc_areas"])
+
+search_query_index = new_index(extract_search_queries)
+
+# Autocomplete search queries of all semesters
+# Queries starting with the input are suggested first
+def match_search_queries(query, limit=25):
+    refresh_index(search_query_index)
+    return match_terms(search_query_index, query, limit, prefix_first=True)
@@ -15,6 +15,11 @@ import config
 # import quotas_operations
 # import subject_channels
 import get_quota
+import quota_fetcher
+import quota_parser
+import notify_dispatcher
+import update_schedule
+import trend_store
 
 # Uncomment when running on Windows
 # Fixes runtime error: asyncio.run() cannot be called from a running event loop
@@ -43,9 +48,10 @@ intents.message_content = True
 intents.members = True
 bot = commands.Bot(command_prefix="-", intents=intents, activity=discord.Game(name="Doki Doki Literature Club!"), help_command=None)
 
-# Update quotas every 1.5 minutes
+# Update quotas in bursts after the website refreshes, back off in between
 # quotas on the website is updated at 03, 18, 33, 48 minutes
-@tasks.loop(seconds=90.0)
+# Interval is changed after every update by update_schedule
+@tasks.loop(seconds=config.schedule_burst_interval)
 async def update_quotas():
 
     start_time = get_quota.update_time()
@@ -53,6 +59,10 @@ async def update_quotas():
     update_time = await get_quota.download_quotas(bot, update_quotas.current_loop)
     print(f"Update finished: {update_time}: {update_quotas.current_loop}")
 
+    # Plan next update
+    update_schedule.record_crawl(start_time, quota_fetcher.last_crawl_changed)
+    update_quotas.change_interval(seconds=update_schedule.next_interval(start_time))
+
     # Send update confirmation message to quota-updates channel
     # Handle Discord API service issues
     try:
@@ -73,6 +83,13 @@ async def update_quotas():
     # Confirm new subscribers and unsubscribe unreachable users
     await get_quota.check_on_everyone(bot)
 
+# Close connections to the quota website and stop parser and notification workers when the update loop stops
+@update_quotas.after_loop
+async def close_quota_fetcher():
+    await quota_fetcher.close_session()
+    quota_parser.shutdown_parser_pool()
+    notify_dispatcher.stop_workers()
+
 # On ready event
 # Display bot guilds
 @bot.event
@@ -86,6 +103,11 @@ async def on_ready():
     channels = await get_quota.get_channels(bot)
     print("Channels loaded!")
 
+    # Tab records trends: create and upgrade trends databases, import old trends files
+    if config.trend_capture:
+        trend_store.prepare_databases()
+        print("Trends databases ready!")
+
     await update_quotas.start()
 
 @bot.event
@@ -128,4 +150,6 @@ async def on_command_error(ctx, error):
     raise error
 
 # Launch bot
-bot.run(TOKEN)
\ No newline at end of file
+# Not when imported by a parser worker (see quota_parser)
+if __name__ == "__main__":
+    bot.run(TOKEN)
\ No newline at end of file
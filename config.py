@@ -5,4 +5,39 @@ color_success = 0x91d7e3  # Hill's slash command embeds
 color_failure = 0xed8796  # Error messages
 color_warning = 0xeed49f
 color_info = 0x91d7e3
-color_history = 0xf5a97f  # Historical data embeds
\ No newline at end of file
+color_history = 0xf5a97f  # Historical data embeds
+
+# Quota website crawler
+fetch_concurrency = 8  # Max number of requests in flight to the quota website
+fetch_connection_limit = 16  # Max number of pooled connections
+fetch_timeout = 10  # Seconds before a request times out
+fetch_retries = 3  # Number of retries of a failed request
+fetch_backoff = 1  # Seconds to wait before the first retry, doubled after every retry
+
+# Quota website parser
+parser_workers = 4  # Number of processes parsing subject pages, 0 to parse in the bot's process
+parser_backend = "lxml"  # "lxml" or "bs4" (reference, slower), falls back to bs4 if lxml is not installed
+
+# Quota update schedule
+publish_minutes = [3, 18, 33, 48]  # Minutes of the hour when the quota website refreshes
+schedule_burst_interval = 30  # Seconds between updates right after a refresh
+schedule_burst_length = 240  # Seconds to keep bursting after the expected refresh if no change is seen
+schedule_burst_lead = 15  # Seconds to start bursting before the nominal refresh minute
+schedule_max_delay = 300  # Max seconds the refresh is expected after the nominal refresh minute
+schedule_idle_interval = 900  # Max seconds between updates outside refresh windows
+schedule_history = 20  # Number of observed refreshes used to learn the actual refresh time
+schedule_max_crawls = 40  # Max updates per hour, split evenly between refresh windows (fixed 90 second loop: 40)
+
+# Notification dispatcher
+dispatch_workers = 8  # Max number of channel posts and DMs in flight
+dispatch_retries = 3  # Number of retries of a failed post or DM
+dispatch_retry_delay = 5  # Seconds to wait before the first retry, doubled after every retry
+
+# Enrollment trends
+trend_capture = True  # Record trends in Tab's update loop, False to leave them to trendsetter
+trend_snapshot_interval = 0  # Min seconds between trend snapshots recorded by Tab, 0 to record every update
+
+# Enrollment graphs
+graph_cache_dir = "graph_cache"  # Directory of rendered graphs
+graph_cache_memory = 32 * 1024 * 1024  # Max bytes of rendered graphs kept in memory
+graph_cache_disk = 256 * 1024 * 1024  # Max bytes of rendered graphs kept on disk, 0 to keep them in memory only
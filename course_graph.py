@@ -0,0 +1,70 @@
+# course_graph.py
+# Reverse graph of pre-requisites and exclusions of all semesters
+# "Which courses require/exclude this course" is looked up instead of searched
+import collections
+import re
+
+import autocomplete_index
+import quota_store
+
+# Info fields of the graph's edges
+mode_fields = {"p": "PRE-REQUISITE", "e": "EXCLUSION"}
+
+# Course codes mentioned in info text, e.g. COMP 2012 and COMP 2012H
+course_code_regex = re.compile(r"\b[A-Z]{4} \d{4}[A-Z]*\b")
+
+# (quotas files the graph was built from, graph)
+graph_cache = (None, None)
+
+# Build the reverse graph from the courses of all semesters
+# For courses with multiple recorded offerings, the latest offering is used
+# Returns {mode: {mentioned course: set of courses mentioning it}}, course codes have a space after the prefix
+def build_course_graph(semester_quotas):
+    combined_info = {}
+    for quotas in semester_quotas:
+        combined_info.update({k: v['info'] for k, v in quotas.items() if k != 'time'})
+
+    graph = {mode: collections.defaultdict(set) for mode in mode_fields}
+    for course_code, info in combined_info.items():
+        display_code = course_code[0: 4] + " " + course_code[4: ]
+        for mode, field in mode_fields.items():
+            for target in course_code_regex.findall(info.get(field, "")):
+                graph[mode][target].add(display_code)
+    return graph
+
+# Get the reverse graph, built again only when a quotas file changed
+def get_course_graph():
+    global graph_cache
+
+    # Oldest semester first, current semester last
+    semesters = sorted(autocomplete_index.list_semesters()[1: ]) + [""]
+    semester_quotas = [quota_store.load_quotas(f'quotas{s}.json') for s in semesters]
+    semester_quotas = tuple(q for q in semester_quotas if q and 'time' in q)  # Skip unavailable and incomplete files
+
+    # Quotas views are only replaced when their file is reloaded
+    cached_quotas, graph = graph_cache
+    if cached_quotas is None or len(cached_quotas) != len(semester_quotas) or any(a is not b for a, b in zip(cached_quotas, semester_quotas)):
+        graph = build_course_graph(semester_quotas)
+        graph_cache = (semester_quotas, graph)
+    return graph
+
+# Get courses having a course as pre-requisite ("p") or exclusion ("e")
+# Returns sorted list of course codes with a space after the prefix
+def required_by(course_code, mode):
+    course_code = course_code[0: 4] + " " + course_code[4: ]
+    return sorted(get_course_graph()[mode].get(course_code, ()))
+
+# Get courses eventually needing a course, e.g. pre-requisites of pre-requisites of the course
+# Returns sorted list of course codes with a space after the prefix
+def eventually_required_by(course_code, mode="p"):
+    graph = get_course_graph()[mode]
+    start = course_code[0: 4] + " " + course_code[4: ]
+
+    found = set()
+    queue = collections.deque([start])
+    while queue:
+        for dependent in graph.get(queue.popleft(), ()):
+            if dependent not in found and dependent != start:
+                found.add(dependent)
+                queue.append(dependent)
+    return sorted(found)
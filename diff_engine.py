@@ -0,0 +1,150 @@
+# diff_engine.py
+# Finds changes between two quotas dicts, without rendering or sending anything
+# Courses and sections are hashed first: only records with a different hash are compared field by field
+# Sections are compared and passed on as section_model.Section records, parsed once per course dict
+import collections
+
+import section_model
+
+# One change between the old and new quotas
+# kind: see event kinds below
+# course_code, title: course the change belongs to (title of the new course, or of the old course if it was deleted)
+# section: section code, None for course changes
+# key: changed course info heading, None for other changes
+# old, new: changed record (course dict, section_model.Section or info text), None if it didn't exist
+DiffEvent = collections.namedtuple("DiffEvent", ["kind", "course_code", "title", "section", "key", "old", "new"])
+
+# Event kinds, in the order they are found for each course
+# "new_course", "title", "info_new", "info_changed", "info_removed",
+# "new_section", "quota", "time", "venue", "instructor", "ta", "remarks",
+# "course_deleted", "section_deleted"
+
+# Find additions and removals between two lists
+def list_diffs(temp1, temp2):
+    additions = [x for x in temp1 if x not in set(temp2)]  # Elements in temp1 not in temp2
+    removals = [x for x in temp2 if x not in set(temp1)]  # Elements in temp2 not in temp1
+    return additions, removals  # Returns a tuple (additions, removals)
+
+# Hash of every course and section of a quotas dict
+# Returns {course_code: (course hash, {section code: section hash})}
+def build_hash_index(quotas):
+    hash_index = {}
+    for course_code, course in quotas.items():
+        if course_code == 'time':
+            continue
+        section_hashes = {k: hash(tuple(v)) for k, v in course['sections'].items()}
+        course_hash = hash((course['title'], frozenset(course['info'].items()), tuple(section_hashes.items())))
+        hash_index[course_code] = (course_hash, section_hashes)
+    return hash_index
+
+# Hash indexes of the quotas dicts compared last, reused while the dict is the same object
+# Shared quotas from quota_store stay the same object until their file changes
+hash_index_cache = []
+
+def get_hash_index(quotas):
+    for cached_quotas, hash_index in hash_index_cache:
+        if cached_quotas is quotas:
+            return hash_index
+    hash_index = build_hash_index(quotas)
+    hash_index_cache.insert(0, (quotas, hash_index))
+    del hash_index_cache[2: ]  # Keep the old and new quotas of one comparison
+    return hash_index
+
+# Reserved quotas of a section: {dept: quota}
+def reserved_quotas(section):
+    return {r.dept: r.quota for r in section.reserved}
+
+# Names in a venue, instructor or TA column, without empty lines and duplicates
+def name_list(column):
+    return list(dict.fromkeys([name for name in column.split("\n") if name != ""]))
+
+# Names in the venue, instructor or TA column of every meeting of a section
+# column: "venue", "instructor" or "ta"
+def meeting_names(section, column):
+    return name_list("\n".join(getattr(m, column) for m in section.meetings))
+
+# Remarks lines of a section, without "> " at the beginning of lines
+def remarks_list(section):
+    return [r.strip("> ") for r in section.remarks]
+
+# Compare one section found in both quotas
+# old_section, new_section: Section
+def diff_section(course_code, title, section_code, old_section, new_section):
+    events = []
+    event = lambda kind: DiffEvent(kind, course_code, title, section_code, None, old_section, new_section)
+
+    # Total quota or reserved quotas
+    if new_section.quota != old_section.quota or reserved_quotas(new_section) != reserved_quotas(old_section):
+        events.append(event("quota"))
+
+    # Date & time: time list elements are guaranteed to be unique
+    if list_diffs([m.time for m in new_section.meetings], [m.time for m in old_section.meetings]) != ([], []):
+        events.append(event("time"))
+
+    for kind in ["venue", "instructor", "ta"]:
+        if list_diffs(meeting_names(new_section, kind), meeting_names(old_section, kind)) != ([], []):
+            events.append(event(kind))
+
+    if list_diffs(remarks_list(new_section), remarks_list(old_section)) != ([], []):
+        events.append(event("remarks"))
+
+    return events
+
+# Compare one course found in both quotas
+def diff_course(course_code, old, new, old_hashes, new_hashes):
+    events = []
+    title = new.get('title', 'Error')
+
+    if old['title'] != new['title']:
+        events.append(DiffEvent("title", course_code, title, None, None, old['title'], new['title']))
+
+    # Course info additions and changes, then removals
+    if old['info'] != new['info']:
+        for k, v in new['info'].items():
+            if k not in old['info']:
+                events.append(DiffEvent("info_new", course_code, title, None, k, None, v))
+            elif v != old['info'][k]:
+                events.append(DiffEvent("info_changed", course_code, title, None, k, old['info'][k], v))
+        for k, v in old['info'].items():
+            if k not in new['info']:
+                events.append(DiffEvent("info_removed", course_code, title, None, k, v, None))
+
+    new_sections = section_model.get_sections(new)
+    old_sections = section_model.get_sections(old)
+    for section_code, section in new_sections.items():
+        if section_code not in old_hashes:
+            events.append(DiffEvent("new_section", course_code, title, section_code, None, None, section))
+        elif new_hashes[section_code] != old_hashes[section_code]:
+            events += diff_section(course_code, title, section_code, old_sections[section_code], section)
+
+    return events
+
+# Compare two quotas dicts
+# skip: course codes known to be unchanged
+# Returns list of DiffEvent: changes of new and existing courses in the order of the new quotas, then deletions
+def diff_quotas(new_quotas, old_quotas, skip=()):
+    new_index = get_hash_index(new_quotas)
+    old_index = get_hash_index(old_quotas)
+
+    events = []
+    for course_code, (course_hash, section_hashes) in new_index.items():
+        if course_code in skip:
+            continue
+        new = new_quotas[course_code]
+        if course_code not in old_index:
+            events.append(DiffEvent("new_course", course_code, new.get('title', 'Error'), None, None, None, new))
+        elif course_hash != old_index[course_code][0]:
+            events += diff_course(course_code, old_quotas[course_code], new, old_index[course_code][1], section_hashes)
+
+    for course_code, (course_hash, section_hashes) in old_index.items():
+        if course_code in skip:
+            continue
+        old = old_quotas[course_code]
+        if course_code not in new_index:
+            events.append(DiffEvent("course_deleted", course_code, old.get('title', 'Error'), None, None, old, None))
+        elif course_hash != new_index[course_code][0]:
+            for section_code, section in section_model.get_sections(old).items():
+                if section_code not in new_index[course_code][1]:
+                    events.append(DiffEvent("section_deleted", course_code, old.get('title', 'Error'), section_code, None, section, None))
+
+    return events
@@ -1,21 +1,30 @@
 # get_quota.py
-import requests  # Requires requests 2.29.0!
-import bs4
-
 import discord
 
 import os
+import asyncio
 import json
 from datetime import datetime, timezone, date, timedelta
 import re
 import traceback
 import itertools
+import collections
 import urllib
 # import pymongo  # hidden until hardware incompatibility resolved! 1/2
-from tinydb import TinyDB, Query
 
 import config
 import subject_channels
+import quota_fetcher
+import quota_parser
+import course_graph
+import diff_engine
+import notify_dispatcher
+import subscriber_store
+import quota_store
+import room_index
+import section_model
+import trend_store
+import search_index
 
 # Bots version
 bot_version = "3.3"
@@ -57,7 +66,7 @@ weekday_list = ["Mo", "Tu", "We", "Th", "Fr", "Sa", "Su"]
 full_weekday_list = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
 """
-Each semester a database, each course a collection (hidden until hardware incompatibility resolved! 2/2)
+Each semester a database (tabtrend{semester}.db, see trend_store), snapshots of a section stored together
 
 Course section snapshot schema:
 {
@@ -70,121 +79,97 @@ Course section snapshot schema:
 }
 
 Last update time schema:
-"_default": {
+update_time: {
     last_update_time: int
     last_update_loop: int
 }
 """
 
-# # Update interval in seconds
-trend_snapshot_interval = 900
+# Seconds between trendsetter's snapshots: spacing of loops recorded without a time
+trendsetter_interval = 900
 
-# Prepare enrollment stats database
-# trend_client = pymongo.MongoClient("mongodb://localhost:27017/")
-# trend_db = trend_client[f"tabtrend{semester_code}"]  # Each semester a database
-# trend_db = TinyDB(f'tabtrend{semester_code}.json', indent=4)  # Formatted for testing and debugging
-# trend_db = TinyDB(f'tabtrend{semester_code}.json')
+# Course hash index of the quotas of the last trend capture, see diff_engine.build_hash_index
+captured_hash_index = None
 
-# Extract field from list of documents
-def get_field_data(field_name, documents):
-    field = [r[field_name] for r in documents]
-    return field
+# Courses changed since the last trend snapshot, None to check every course (first capture since start)
+pending_trend_courses = None
 
-# Check if last_update_time exists in current semester's database
-# If no, the database is empty
-# Create last_update_time collection with last_update_time and last_update_loop document
-# Document has value 0 to trigger an update immediately
+# Get last update time (or loop) of a semester's trends
+# Returns 0 if trends were never updated: triggers an update immediately
 def get_trend_update_time(loop=False, sem=""):
     if sem == "":
         sem = semester_code
 
-    trend_db = TinyDB(f'tabtrend{sem}.json', indent=4)  # Get database on demand to prevent outdated data
-    update_time_target = "last_update_loop" if loop else "last_update_time"
-
-    # Query last update time
-    time_query = Query()
-    last_update_time = trend_db.get(time_query.last_update_time.exists())
-    # update_time_col = trend_db["last_update_time"]
-    # time_query = { "last_update_time": {"$exists": "true"} }
-    # last_update_time = update_time_col.find_one(time_query)
+    return trend_store.get_update_time(sem, loop)
 
-    if last_update_time:
-        return last_update_time[update_time_target]
-    else:
-        trend_db.insert(
-            { 
-                "last_update_time": 0, 
-                "last_update_loop": 0 
-            }
-        )
-        # return update_time_col.find_one(time_query)[update_time_target]  # Raise error if database is still empty
-        return trend_db.get(time_query.last_update_time.exists())[update_time_target]
-
-# Create a snapshot of all sections
+# Create a snapshot of all sections, used by trendsetter
 def create_trend_snapshot():
     quotas = open_quotas()
     if not check_quotas_validity():
         return False
-    
+
+    record_trend_snapshot(quotas)
+    return True
+
+# Record trends from the update loop, called by download_quotas after every update
+# Only courses changed since the last capture are checked, every course on the first capture since start:
+# changes while Tab was offline are recorded too
+# Returns True if a snapshot was recorded, False if it was postponed by trend_snapshot_interval
+def capture_trends(quotas):
+    global captured_hash_index, pending_trend_courses
+
+    hash_index = diff_engine.get_hash_index(quotas)
+    if pending_trend_courses is not None:
+        pending_trend_courses.update(
+            course_code for course_code, (course_hash, section_hashes) in hash_index.items()
+            if course_code not in captured_hash_index or captured_hash_index[course_code][0] != course_hash
+        )
+    captured_hash_index = hash_index
+
+    # Downsample: changes are kept until the next snapshot is due
+    if quotas['time'] - get_trend_update_time() < config.trend_snapshot_interval:
+        return False
+
+    record_trend_snapshot(quotas, pending_trend_courses)
+    pending_trend_courses = set()
+    return True
+
+# Record a snapshot of sections of some courses (all courses by default)
+# Every snapshot is a new loop, sections are only stored if they changed since their latest stored state
+def record_trend_snapshot(quotas, course_codes=None):
+    # Create the database and import the trends file before its last loop is read
+    trend_store.get_connection(semester_code)
     this_update_loop = get_trend_update_time(True) + 1
 
-    trend_db = TinyDB(f'tabtrend{semester_code}.json', indent=4)  # Get database on demand to prevent outdated data
+    # Latest stored state of every section of the courses
+    latest_states = trend_store.get_latest_states(semester_code, course_codes)
 
-    for course_code, course_data in quotas.items():
-        # Skip time entry
-        if course_code == "time":
-            continue
-
-        for section_code, section_data in course_data['sections'].items():
-            # Check for reserved quotas
-            reserved_quotas_list = []
-            total_quota = section_data[5].split("\n")
-            if len(total_quota) >= 3:
-                for k in range(2, len(total_quota)):
-                    reserved_quotas = total_quota[k].split(": ")
-                    reserved_quotas_dept = [reserved_quotas[0]]
-                    reserved_quotas_qea = [int(i) for i in reserved_quotas[1].split("/")]
-                    reserved_quotas_list.append(reserved_quotas_dept + reserved_quotas_qea)
+    # Courses in the order of the quotas, skip time entry and courses deleted since they changed
+    course_codes = [k for k in quotas.keys() if k != "time" and (course_codes is None or k in course_codes)]
 
+    new_snapshots = []
+    for course_code in course_codes:
+        for section_code, section in section_model.get_sections(quotas[course_code]).items():
             # Create snapshot of the section
             section_snapshot = {
+                "course_code": course_code,
                 "section_code": trim_section(section_code),
                 "class_nbr": trim_class_nbr(section_code),
                 "time": quotas['time'],
                 "loop": this_update_loop,
-                "total": [int(section_data[i].split("\n")[0]) for i in range(5, 9)],
-                "reserved": reserved_quotas_list
+                "total": section.totals(),
+                "reserved": [list(r) for r in section.reserved]  # [dept, quota, enrol, avail]
             }
 
-            # Insert the snapshot into the collection (table) of the course
-            # trend_course_col = trend_db[course_code]
-            trend_course_col = trend_db.table(course_code, cache_size=0)
+            # Only store snapshot if it differs from the latest stored one or no previous snapshot is stored
+            # Changing back to an earlier state is a change too
+            state = trend_store.section_state(section_snapshot['total'], section_snapshot['reserved'])
+            if latest_states.get((course_code, section_snapshot['section_code'])) != state:
+                latest_states[(course_code, section_snapshot['section_code'])] = state
+                new_snapshots.append(section_snapshot)
 
-            # Compare current snapshot with latest stored version
-            latest_snapshot_query = { 
-                'section_code': section_snapshot['section_code'],
-                'total': section_snapshot['total'],
-                'reserved': section_snapshot['reserved']
-            }
-            # latest_stored_snapshot = trend_course_col.find_one(
-            #     latest_snapshot_query,
-            #     sort=[('time', -1)]
-            # )
-            matching_snapshots = trend_course_col.search(Query().fragment(latest_snapshot_query))
-
-            # Only insert snapshot if difference is found or no previous snapshot is stored
-            # if (not latest_stored_snapshot):
-            if (not matching_snapshots):
-                # snapshot_insert_result = trend_course_col.insert_one(section_snapshot)
-                snapshot_insert_result = trend_course_col.insert(section_snapshot)
-
-    # Change last updated time of database
-    # update_time_col = trend_db["last_update_time"]
-    # time_query = { "last_update_time": {"$exists": "true"} }
-    # new_update_time = { "$set": { "last_update_time": quotas['time'], "last_update_loop": this_update_loop } }
-    # update_time_col.update_one(time_query, new_update_time)
-    trend_db.update({"last_update_time": quotas['time'], "last_update_loop": this_update_loop})
-    return True
+    # Store all snapshots and change last updated time of database at once
+    trend_store.append_snapshots(semester_code, new_snapshots, quotas['time'], this_update_loop)
 
 # Convert semester string (name) to code
 def semester_string_to_code(semester_string, check=True):
@@ -285,9 +270,7 @@ def date_from_weekday(weekday):
 
 # Find additions and removals between two lists
 def list_diffs(temp1, temp2):
-    additions = [x for x in temp1 if x not in set(temp2)]  # Elements in temp1 not in temp2
-    removals = [x for x in temp2 if x not in set(temp1)]  # Elements in temp2 not in temp1
-    return additions, removals  # Returns a tuple (additions, removals)
+    return diff_engine.list_diffs(temp1, temp2)
 
 # Add diff highlighting to a list of strings
 # Calls list_diffs() to find diffs
@@ -319,10 +302,10 @@ def get_space_url(course_code):
     return f"https://ust.space/review/{course_code}"
 
 # Add URL to course entry in HKUST Class Schedule & Quota website
-def add_source_url(view: discord.ui.View, course_code: str, mode=None):
+def add_source_url(view: discord.ui.View, course_code: str, mode=None, label="Source"):
     view.add_item(
         discord.ui.Button(
-            label="Source",
+            label=label,
             style=discord.ButtonStyle.link,
             emoji='📡',
             url=get_source_url(course_code, mode)
@@ -370,51 +353,27 @@ def get_course_list(semester=""):
 
 # Get list of all course code prefixes
 def get_prefix_list(semester=""):
-    # Get course list
-    courses = get_course_list(semester)
-
-    # Trim all course codes to prefix only
-    prefix_list = [x[0: 4] for x in courses]  # All prefixes are 4 letters long
-    # Remove duplicates
-    prefix_list = list(dict.fromkeys(prefix_list))
-
-    return prefix_list
-
-# Get all courses offered in all recorded semesters
-def get_combined_course_dict():
-    # Get courses offered in previous semesters
-    # Combine course data of all semesters
-    # For courses with multiple recorded offerings, use the latest offering
-    semester_list = sorted(find_historical_data())
-    big_course_dict = {}
-    for sem in semester_list:
-        sem_quotas = open_quotas(sem)
-        if not check_quotas_validity(sem):
-            continue
-        big_course_dict.update(sem_quotas)
-    
-    # Get courses of current semester
-    current_quotas = open_quotas()
-    if not check_quotas_validity():
-        pass
-    else:
-        big_course_dict.update(current_quotas)
-
-    big_course_dict.pop('time')
+    # Prefixes are collected by the search index
+    semester_index = search_index.get_search_index(semester)
+    if semester_index is None or not check_quotas_validity(semester):
+        return []
 
-    return big_course_dict
+    return list(semester_index["prefixes"].keys())
 
 # Get list of all instances of a section attribute
+# List is only built again when the quotas file changes
 def get_attribute_list(attribute: int, semester=""):
     # Check if quotas file is available
-    quotas = open_quotas(semester)
     if not check_quotas_validity(semester):
         return []
-    
-    quotas.pop('time')
-    
+
+    attributes = quota_store.load_derived(f'quotas{semester}.json', ("attribute", attribute), lambda quotas: build_attribute_list(attribute, quotas))
+    return list(attributes)  # Copy: callers may edit the list
+
+# Extract list of all instances of a section attribute from quotas
+def build_attribute_list(attribute: int, quotas):
     # Extract attribute list
-    attributes = list(quotas.values())
+    attributes = [v for k, v in quotas.items() if k != 'time']  # Skip update time entry
     attributes = [list(a['sections'].values()) for a in attributes]
     attributes = list(itertools.chain.from_iterable(attributes))  # Unnest list extracted from sections dict
     attributes = [x for a in attributes for x in a[attribute].split("\n")]
@@ -423,61 +382,34 @@ def get_attribute_list(attribute: int, semester=""):
 
     return attributes
 
-# Get list of all instances of a section attribute in a course
-def get_attributes_from_course(attribute: int, course: dict):
-    attributes = list(course['sections'].values())
-    attributes = [x for a in attributes for x in a[attribute].split("\n")]
-    attributes = list(dict.fromkeys(attributes))  # Remove duplicates
-    attributes = [a for a in attributes if a != ""]  # Remove empty elements
-
-    return attributes
-
-# Get list of a section attribute in a section
-def get_attributes_from_section(attribute: int, section: list):
-    attributes = [x for x in section[attribute].split("\n\n\n")]
-    attributes = [a for a in attributes if a != ""]  # Remove empty elements
-
-    return attributes
-
 # Get list of courses that requires a course
 # course_code: no spaces
 # mode: "p" for pre-reqs, "e" for exclusions
 def get_required_by_courses(course_code: str, mode: str):
-    # Add space to course code between prefix and number to follow original display format
-    course_code = course_code[0 : 4] + " " + course_code[4 : ]
-
-    # Get all courses offered in all recorded semesters
-    big_course_dict = get_combined_course_dict()
-
-    # Select between pre-reqs and exclusions
-    mode_dict = {"p": "PRE-REQUISITE", "e": "EXCLUSION"}
-
-    # Filter the courses by requirement: only keep course codes
-    course_code_filter = re.compile(fr"\b{course_code}\b")  # Eliminate false positives e.g. COMP 2012 and COMP2012H
-    filtered_courses = ", ".join(sorted([(k[0: 4] + " " + k[4: ]) for k, v in big_course_dict.items() if (re.search(course_code_filter, v['info'].get(mode_dict[mode], "")) is not None)]))
-
-    return filtered_courses
+    # Look up courses in the reverse pre-requisite/exclusion graph of all recorded semesters
+    return ", ".join(course_graph.required_by(course_code, mode))
+
+# Get list of courses that need a course through the pre-requisites of other courses, not listed in "Required by"
+# Limited to one embed field: these lists can cover most courses of a school
+def get_eventually_required_by_courses(course_code: str):
+    direct = set(course_graph.required_by(course_code, "p"))
+    courses = [c for c in course_graph.eventually_required_by(course_code, "p") if c not in direct]
+
+    shown = []
+    for course in courses:
+        if len(", ".join(shown + [course])) > 960:  # Leave room for the number of courses not shown
+            return ", ".join(shown) + f" and {len(courses) - len(shown)} more"
+        shown.append(course)
+    return ", ".join(shown)
 
 # Get list of all common core areas
 def get_cc_areas(semester=""):
-    quotas = open_quotas(semester)
-
-    # Check if quotas file is available
-    if not check_quotas_validity(semester):
+    # Common core areas are collected by the search index
+    semester_index = search_index.get_search_index(semester)
+    if semester_index is None or not check_quotas_validity(semester):
         return []
-    
-    # Remove update time entry
-    quotas.pop("time")  
-
-    cc_areas = [x['info']['ATTRIBUTES'] for x in quotas.values() if 'ATTRIBUTES' in x['info']]
-    # Split attributes lines
-    cc_areas = sum([y.split("\n") for y in cc_areas], [])
-    # Remove duplicates
-    cc_areas = list(dict.fromkeys(cc_areas))
-    # Remove non CC attributes
-    cc_areas = [z for z in cc_areas if "Common Core" in z]
 
-    return cc_areas
+    return list(semester_index["cc_areas"].keys())
 
 # Get list of all historical course data in directory
 def find_historical_data():
@@ -488,49 +420,11 @@ def find_historical_data():
 
     return sorted(semester_list, reverse=True)  # Ensure consistent order in autocomplete lists
 
-# Get subscribers file
-def open_subs():
-    try:
-        subs = open('subscribers.json', encoding='utf-8')
-        subs = json.load(subs)
-        return subs
-    except FileNotFoundError:  # Create empty subscribers file (dict) if it is not found
-        subs = {}
-        save_subs(subs)
-        return subs
-
-# Save the edited subscribers file
-def save_subs(subs):
-    outfile = open('subscribers.json', 'w', encoding='utf-8')
-    json.dump(subs, outfile, indent=4)
-    return subs
-
-# Add a new user to the subscribers file
-# Only called when they are not on the file
-def new_profile(subs, id):
-    # Initialize entry for new user
-    new_user = {
-        "confirm": 0,
-        "strikes": 0,
-        "courses": []
-    }
-
-    # Add the user to dict of subscribers
-    subs[str(id)] = new_user
-    subs = save_subs(subs)
-    return subs
-
-# Find entry of user in subscribers dict
+# Find entry of user in subscribers database
+# Create new profile for user if they're not found
+# Returns {"confirm": int, "strikes": int, "courses": list}
 def find_sub(id):
-    subs = open_subs()
-    entry = subs.get(str(id), None)
-
-    # Create new profile for user if they're not found in subscribers dict
-    if not entry:
-        subs = new_profile(subs, id)
-        entry = subs.get(str(id), None)
-    
-    return subs, entry
+    return subscriber_store.get_user(id)
 
 # Edit list of courses a subscriber is subscribed to
 #
@@ -539,76 +433,64 @@ def find_sub(id):
 #   1: unsubscribe 1 course
 #   2: unsubscribe all courses
 # course_code: Course code to be added to course list of subscriber
-# idx: index in course list to be removed
 #
 def edit_sub(id, operation, course_code=None):
-    # Get subscriber entry and subscribers dict
-    subs, entry = find_sub(id)
-
     # Add a course to course list of subscriber (subscribe)
+    # User cannot subscribe to more than 10 courses (1) or to the same course twice (3)
     if operation == 0:
-        # User cannot subscribe to more than 10 courses
-        if len(entry['courses']) >= 10:
-            return 1
-        # User cannot subscribe to the same course twice
-        elif course_code in entry['courses']:
-            return 3
-        else:
-            entry['courses'].append(course_code)
+        return subscriber_store.add_course(id, course_code)
     
     # Remove a course from the course list (unsubscribe)
     elif operation == 1:
-        try:
-            entry['courses'].remove(course_code)
         # User cannot unsubscribe from a course they didn't subscribe to
-        except ValueError:
+        if not subscriber_store.remove_course(id, course_code):
             return 2
     
     # Unsubscribe user from all courses
     elif operation == 2:
-        entry['courses'] = []
+        subscriber_store.clear_courses(id)
     
-    # Save the edited subscribers list
-    save_subs(subs)
     return 0
 
 # Check if user is a new/canceled subscriber (value of key "confirm" is 0/2)
 def check_if_new_sub(id, mode):
-    subs, entry = find_sub(id)
+    entry = find_sub(id)
 
     # Subscribing after canceled: reset status and send warning message
     # Only reset status when subscribing
     if entry['confirm'] == 2 and mode == 0:
-        entry['confirm'] = 0
-        save_subs(subs)
+        subscriber_store.set_confirm(id, 0)
         return 2
     else:
         return entry['confirm']
 
 # Check if user is subscribed to a given course
 def check_if_subscribed(course_code, id):
-    subs, entry = find_sub(id)
+    entry = find_sub(id)
 
     if course_code in entry['courses']:
         return True
     else:
         return False
 
+# Get quotas of a semester, parsed once and reloaded only when the file changes
+# Returns a read-only view shared by all callers, or False if unavailable
 def open_quotas(semester=""):
-    try:
-        quotas = open(f'quotas{semester}.json', encoding='utf-8')
-        quotas = json.load(quotas)
-        return quotas
-    except:
-        return False
+    return quota_store.load_quotas(f'quotas{semester}.json')
 
 def open_old_quotas():
+    return quota_store.load_quotas('quotas_old.json')
+
+# Replace a quotas file atomically, Hill never reads a half-written file
+# Returns the error if the file couldn't be written, None if it was saved
+# If saving fails the last saved quotas are kept
+def save_quotas(filename, quotas):
     try:
-        quotas = open('quotas_old.json', encoding='utf-8')
-        quotas = json.load(quotas)
-        return quotas
-    except:
-        return False
+        quota_store.save_quotas(filename, quotas)
+    except (OSError, TypeError, ValueError) as error:
+        traceback.print_exc()
+        return error
+    return None
 
 # If quota searching is interrupted by network issues, quotas file is incomplete and does not contain the update time
 def check_quotas_validity(semester=""):
@@ -629,43 +511,34 @@ embed_quota_unavailable = discord.Embed(title=f"⚠️ Course data is unavailabl
                                         color=config.color_failure)
 
 # Format section information (schedule) to be printed by command output/notification
-# One section at a time!
+# One section at a time! `section`: section_model.Section
 # Returns a list of strings
 def format_section(section):
     # Formatted output will be stored in a list in case string length exceeds 1024 characters
     formatted_section = ["```\n"]
 
-    # Split schedule rows
-    time_list = section[1].split("\n\n\n")
-    venue_list = section[2].split("\n\n\n")
-    instructor_list = section[3].split("\n\n\n")
-    ta_list = section[4].split("\n\n\n")
-
-    # Make all strings single-line
-    time_list = [t.replace('\n', ', ') for t in time_list]
-    venue_list = [t.replace('\n', ', ') for t in venue_list]
-    instructor_list = [t.replace('\n', '\n        ') for t in instructor_list]
-    ta_list = [t.replace('\n', '\n        ') for t in ta_list]
-
     # Add strings to field
     # Add strings row by row
-    for i in range(len(time_list)):
+    for meeting in section.meetings:
         # Add one row of schedule
         # Field character limit protection: buffer new rows
         formatted_schedule_row = ""
 
+        # Make all strings single-line
+        time = meeting.time.replace('\n', ', ')
+        venue = meeting.venue.replace('\n', ', ')
+        instructor = meeting.instructor.replace('\n', '\n        ')
+        ta = meeting.ta.replace('\n', '\n        ')
+
         # Add time, venue and instructor rows
-        formatted_schedule_row += f"{'Time':<6}| {time_list[i]}\n"
-        formatted_schedule_row += f"{'Venue':<6}| {venue_list[i]}\n"
-        formatted_schedule_row += f"{'Inst.':<6}| {instructor_list[i]}\n"
+        formatted_schedule_row += f"{'Time':<6}| {time}\n"
+        formatted_schedule_row += f"{'Venue':<6}| {venue}\n"
+        formatted_schedule_row += f"{'Inst.':<6}| {instructor}\n"
 
         # Uncomment if TA display format is corrected
-        # Only add TA row if it is not empty
-        if ta_list[i] != "":
-            try:
-                formatted_schedule_row += f"{'TA':<6}| {ta_list[i]}\n"
-            except IndexError:  # Handle if not all rows have TA: display nothing
-                pass
+        # Only add TA row if it is not empty (not all rows have TA)
+        if ta != "":
+            formatted_schedule_row += f"{'TA':<6}| {ta}\n"
 
         # End one row
         formatted_schedule_row += "\n"
@@ -710,15 +583,11 @@ def format_section(section):
 
     # Add remarks
     # There will always be at most 1 remark per section
-    if section[9] != "\u00a0":  # Only make space if remarks field is non-empty
-        # Split remarks into lines to remove redundant newlines
-        remarks_list_unfiltered = section[9].split("\n")
-        # Remove empty lines
-        remarks_list = [x for x in remarks_list_unfiltered if x != '' and x != '\xa0']
+    if section.remarks:  # Only make space if remarks field is non-empty
         # Display the remarks
         formatted_schedule_row = "Remarks:\n"  
         #section_field += "\u001b[0;41;37m" #  Coloring start: Orange background, white text
-        formatted_schedule_row += "\n".join(remarks_list)
+        formatted_schedule_row += "\n".join(section.remarks)
         #section_field += "\u001b[0m"  # Coloring end
         formatted_schedule_row += "\n"
     
@@ -785,10 +654,7 @@ def compose_message(course_code, page=0, semester=""):
         return "pmax"
 
     # Cut out one page of data
-    try:
-        sections_paged = list(course_dict['sections'].items())[page_size * page: page_size * (page + 1)]
-    except IndexError:
-        sections_paged = list(course_dict['sections'].items())[page_size * page: ]
+    sections_paged = list(section_model.get_sections(course_dict).items())[page_size * page: page_size * (page + 1)]
 
     # Include section matching message if there is one
     sect_matching = find_sect_matching(course_dict)
@@ -811,29 +677,20 @@ def compose_message(course_code, page=0, semester=""):
         quota_field += f"{trim_section(key):<8}| "
         
         # Total quotas
-        for i in range(5, 9):
-            quota_field += '{:<6}'.format(value[i].split("\n")[0])
+        for total in value.totals():
+            quota_field += '{:<6}'.format(total)
         quota_field += "\n"
 
-        # Check for reserved quotas
-        quota_of_section = value[5].split("\n")
         # If there is reserved quotas, display in next line
-        if len(quota_of_section) >= 3:
-            for k in range(2, len(quota_of_section)):
-            # Split dept name and quota/enrol/avail
-                reserved_quotas = quota_of_section[k].split(": ")
-                reserved_quotas_dept = reserved_quotas[0]  # dept part
-                reserved_quotas_qea = reserved_quotas[1].split("/")  # quota/enrol/avail part
-
-                # Display reserved quotas
-                # Show that quotas are reserved
-                quota_field += f"\u001b[0;41;37m> {'Res.':<6}| "  # Discord ANSI: https://gist.github.com/kkrypt0nn/a02506f3712ff2d1c8ca7c9e0aed7c06
-                # quota/enrol/avail
-                for j in range(3):
-                    quota_field += "{:<6}".format(reserved_quotas_qea[j])
-                # dept
-                quota_field += f"For: {reserved_quotas_dept}"
-                quota_field += "\u001b[0m\n"
+        for reserved in value.reserved:
+            # Display reserved quotas
+            # Show that quotas are reserved
+            quota_field += f"\u001b[0;41;37m> {'Res.':<6}| "  # Discord ANSI: https://gist.github.com/kkrypt0nn/a02506f3712ff2d1c8ca7c9e0aed7c06
+            # quota/enrol/avail
+            quota_field += f"{reserved.quota:<6}{reserved.enrol:<6}{reserved.avail:<6}"
+            # dept
+            quota_field += f"For: {reserved.dept}"
+            quota_field += "\u001b[0m\n"
 
     quota_field += "```"
 
@@ -910,22 +767,23 @@ def compose_info(course_code, page=0, semester=""):
                 except IndexError:
                     embed_info.add_field(name=field_title, value=value[1024 * chunk: ], inline=False)
     else:
-        # Get courses that requires/excludes this course
-        for mode in ["p", "e"]:
-            requisite_exclusion_courses = get_required_by_courses(course_code, mode)
-
+        # Get courses that requires/excludes this course, and courses needing it through their pre-requisites
+        requisite_exclusion_fields = [
+            ("Required by", requisite_exclusion_dict['p']),
+            ("Eventually required by", get_eventually_required_by_courses(course_code)),
+            ("Excluded by", requisite_exclusion_dict['e'])
+        ]
+        for field_name, requisite_exclusion_courses in requisite_exclusion_fields:
             # Don't add field if the string is empty
             if requisite_exclusion_courses == "":
                 continue
 
-            mode_dict = {"p": "Required by", "e": "Excluded by"}
-
             # Split info into multiple fields
             for chunk in range(int(len(requisite_exclusion_courses) / 1024) + 1):
                 if chunk == 0:
-                    field_title = f"🍊 {mode_dict[mode]}"
+                    field_title = f"🍊 {field_name}"
                 else:
-                    field_title = f"🍊 {mode_dict[mode]} (cont.)"
+                    field_title = f"🍊 {field_name} (cont.)"
 
                 try:
                     embed_info.add_field(name=field_title, value=requisite_exclusion_courses[1024 * chunk: 1024 * (chunk + 1)], inline=False)
@@ -990,13 +848,10 @@ def compose_sections(course_code, page=0, semester=""):
         return "pmax"
     
     # Cut out one page of data
-    try:
-        sections_paged = list(course_dict['sections'].items())[page_size * page: page_size * (page + 1)]
-    except IndexError:
-        sections_paged = list(course_dict['sections'].items())[page_size * page: ]
+    sections_paged = list(section_model.get_sections(course_dict).items())[page_size * page: page_size * (page + 1)]
 
     # key: section number and class code
-    # value: list containing section schedule and quota
+    # value: parsed section schedule and quota
     for key, value in sections_paged:  # For each section
         # Format schedule of each section (pretty print)
         formatted_section = format_section(value)
@@ -1030,29 +885,21 @@ def compose_list(prefix, page=0, semester=""):
     if not check_quotas_validity(semester):
         return "unavailable"  # Error code: quotas file is unavailable
     
-    # Get list of common core areas and instructors
-    cc_areas = get_cc_areas(semester)
-    instructors = get_attribute_list(3, semester) + get_attribute_list(4, semester)  # Instructors and TAs
-
-    # Check if prefix is valid
-    prefix_list = get_prefix_list(semester)
-    if prefix not in prefix_list + cc_areas + instructors:
+    # Look up courses with prefix/CC area/instructor in search index
+    query_type, prefix_courses = search_index.search_courses(prefix, semester)
+    if query_type is None:
         return "key"  # Error code: prefix is invalid
     
     # Prepare embed header
     list_header = "🍊 Searching by "
     
-    # Get dict of all courses with prefix/CC area
-    if prefix in cc_areas:
-        prefix_courses = {k: v for k, v in quotas.items() if k != "time" and prefix in v.get('info').get('ATTRIBUTES', '')}
+    if query_type == "c":
         list_title = prefix.replace("Common Core", "")  # "Common Core" will be displayed in header (author)
         list_header += "Common Core area:"  # Embed header (author) text
-    elif prefix in instructors:
-        prefix_courses = {k: v for k, v in quotas.items() if k != "time" and prefix in (get_attributes_from_course(3, v) + get_attributes_from_course(4, v))}
+    elif query_type == "i":
         list_title = prefix  # Change nothing
         list_header += "instructor:"
     else:
-        prefix_courses = {k: v for k, v in quotas.items() if prefix in k}
         list_title = prefix  # Change nothing
         list_header += "prefix:"
 
@@ -1077,13 +924,11 @@ def compose_list(prefix, page=0, semester=""):
         return "pmax"  # Error code: last page reached
     
     # Cut out one page of data
-    try:
-        list_paged = list(prefix_courses.items())[page_size * page: page_size * (page + 1)]
-    except IndexError:
-        list_paged = list(prefix.items())[page_size * page: ]
+    list_paged = prefix_courses[page_size * page: page_size * (page + 1)]
     
     # Format the data into the embed
-    for key, value in list_paged:
+    for key in list_paged:
+        value = quotas[key]
         course_code = value['title'][0: 10]  # Course codes are max 9 chars long and followed by a space
         course_title = value['title'][12: ]  # Course titles have 1 leading space
 
@@ -1101,55 +946,34 @@ def compose_list(prefix, page=0, semester=""):
     return embed_list
 
 # Get class schedule of a room on a day
+# Returns (if the room is having class right now, list of classes sorted by time)
 def get_room_sections(room, weekday):
-    quotas = open_quotas()
-
     # Check if quotas file is available
     if not check_quotas_validity():
         return
 
-    # Remove update time entry
-    quota_time = quotas["time"]
-    quotas.pop("time")
-    
-    is_class_now = False  # Store if room is having class right now
-    room_sections = []
-
-    for course_code, course in quotas.items():
-        for section_title, section_list in course.get("sections", {}).items():
-            sect_room_list = get_attributes_from_section(2, section_list)
-            sect_time_list = get_attributes_from_section(1, section_list)
-
-            for i in range(len(sect_time_list)):
-                # Check if class takes place in parameter room, ignore TBA time
-                if sect_time_list[i] == "TBA" or sect_room_list[i] != room: 
-                    continue
-
-                # Check date
-                sect_time_lines = sect_time_list[i].split("\n")
-                if len(sect_time_lines) > 1:
-                    sect_date = sect_time_lines[0]
-                    sect_date_begin, sect_date_end = dates_from_website_format(sect_date)
-                    if not (sect_date_begin <= date_from_weekday(weekday) <= sect_date_end):
-                        continue
-                
-                # Check time
-                sect_time = sect_time_lines[-1]
-                sect_weekdays = re.findall("..", sect_time.split(" ")[0])
-                # Add to page if the section has class on the day
-                if weekday_list[weekday] in sect_weekdays:
-                    room_sections.append(
-                        {
-                            "title": course['title'],
-                            "code": course_code[0: 4] + " " + course_code[4: ],
-                            "section": section_title,
-                            "time": sect_time_list[i]
-                        }
-                    )
-                    # Check if class is happening right now
-                    sect_begin, sect_end = times_from_website_format(sect_time)
-                    is_class_now += sect_begin <= datetime.now().time() <= sect_end
-    
+    # Classes on the date of the weekday, sorted by time
+    day = date_from_weekday(weekday)
+    bookings = room_index.get_room_bookings(room, day)
+    if bookings is None:
+        return
+
+    # Check if room is having class right now
+    now = datetime.now()
+    now_minutes = now.hour * 60 + now.minute
+    is_class_now = room_index.get_room_bookings(room, day, now_minutes, now_minutes + 1) != []
+
+    room_sections = [
+        {
+            "title": b.title,
+            "code": b.course_code,
+            "section": b.section,
+            "time": b.time,
+            "begin": room_index.format_minutes(b.start),
+            "end": room_index.format_minutes(b.end)
+        }
+        for b in bookings
+    ]
     return is_class_now, room_sections
 
 # Compose room schedule for "room_schedule" command
@@ -1160,13 +984,11 @@ def compose_room_schedule(room, page=0):
     if not check_quotas_validity():
         return "unavailable"
     
-    # Remove update time entry
     quota_time = quotas["time"]
-    quotas.pop("time")
     
     # Check if room code is valid: TBA is not valid
-    rooms = get_attribute_list(2)
-    if room not in rooms or room == "TBA":
+    rooms = room_index.get_room_index()
+    if rooms is None or room not in rooms["rooms"]:
         return "key"
     
     original_page = page
@@ -1219,11 +1041,9 @@ def compose_room_schedule(room, page=0):
     #                 sect_begin, sect_end = times_from_website_format(sect_time)
     #                 is_class_now += sect_begin <= datetime.now().time() <= sect_end
 
+    # Schedule is sorted by time
     is_class_now, room_sections = get_room_sections(room, page)
 
-    # Sort the schedule by time
-    room_sections = sorted(room_sections, key=lambda d: times_from_website_format(d['time'].split("\n")[-1])[0])
-
     # Prepare room status message (only for current day)
     room_schedule_description = ""
     if page == datetime.now().weekday():
@@ -1250,9 +1070,7 @@ def compose_room_schedule(room, page=0):
     for section in room_sections:
         section_time_lines = section['time'].split("\n")
 
-        sect_times = times_from_website_format(section_time_lines[-1])
-        sect_times = [t.strftime("%H:%M") for t in sect_times]
-        room_schedule += "\u001b[1m" + f"> {' - '.join(sect_times)}" + "\u001b[0m"
+        room_schedule += "\u001b[1m" + f"> {section['begin']} - {section['end']}" + "\u001b[0m"
         
         if len(section_time_lines) > 1:
             room_schedule += f" ({section_time_lines[0]})"
@@ -1277,6 +1095,76 @@ def compose_room_schedule(room, page=0):
 
     return embed_room_schedule
 
+# Convert time typed by users (e.g. 14:00, 9:30) to minutes from midnight
+# Returns None if the time is invalid
+def minutes_from_input(time_string):
+    try:
+        parsed = datetime.strptime(time_string.strip(), "%H:%M")
+    except ValueError:
+        return None
+    return parsed.hour * 60 + parsed.minute
+
+# Compose list of free rooms for "room free" command
+# begin, end: time range in minutes from midnight
+def compose_free_rooms(weekday, begin, end, page=0):
+    quotas = open_quotas()
+
+    # Check if quotas file is available
+    if not check_quotas_validity():
+        return "unavailable"
+
+    # Check if time range is valid
+    if not 0 <= begin < end <= room_index.day_minutes:
+        return "time"
+
+    # Rooms free on the date of the weekday, longest free time first
+    day = date_from_weekday(weekday)
+    free_rooms = room_index.find_free_rooms(day, begin, end)
+    if free_rooms is None:
+        return "unavailable"
+
+    # Calculate max page index
+    page_size = 10
+    max_page = find_max_page(free_rooms, page_size)
+
+    # No room is free
+    if max_page == -1:
+        return "no_rooms"
+
+    # Check if page number is valid
+    if page < 0:
+        return "p0"
+    elif page > max_page:
+        return "pmax"
+
+    # Cut out one page of data
+    rooms_paged = free_rooms[page_size * page: page_size * (page + 1)]
+
+    day_name = "Today" if weekday == datetime.today().weekday() else f"This {full_weekday_list[weekday]}"
+    embed_free_rooms = discord.Embed(
+        title=f"{day_name}, {room_index.format_minutes(begin)} - {room_index.format_minutes(end)}",
+        description=f"ℹ️ {len(free_rooms)} rooms are free!",
+        color=config.color_success,
+        timestamp=time_from_stamp(quotas['time'])  # Quota update time
+    )
+    embed_free_rooms.set_author(name="🍊 Free rooms on")
+
+    # Rooms and how long they stay free
+    free_rooms_field = "```ansi\n"
+    for room, free_from, free_until in rooms_paged:
+        if free_from == 0 and free_until == room_index.day_minutes:
+            free_time = "All day"
+        else:
+            free_time = f"{room_index.format_minutes(free_from)} - {room_index.format_minutes(free_until)}"
+        free_rooms_field += "\u001b[1m" + f"> {free_time}" + "\u001b[0m" + f":\n{room}\n\n"
+    free_rooms_field += "```"
+
+    embed_free_rooms.add_field(name="🍊 Free rooms, longest free time first", value=free_rooms_field, inline=False)
+
+    embed_free_rooms.set_footer(text=f"📄 Page {page + 1} of {max_page + 1}, {datetime.strftime(day, '%A, %Y/%m/%d')}\n🕒 Last updated")
+
+    return embed_free_rooms
+
 # Functions and variables for "about" command start
 command_list = [
     ("/quota <course_code>", "Get quotas of a course!"),
@@ -1285,6 +1173,8 @@ command_list = [
     ("/search (<prefix>|<common_core_area>|<instructor>)", "Search courses by the given query!"),
     ("/history (quota|sections|info) <course_code>", "Get quotas/sections/information of a course offering in a previous semester!"),
     ("/history search (<prefix>|<common_core_area>|<instructor>)", "Search courses in a previous semester!"),
+    ("/room schedule <room>", "Get the class schedule of a room right now and this week!"),
+    ("/room free [<start_time>] [<end_time>] [<weekday>]", "Find rooms without classes right now or at a given time!"),
     ("/sub sub", "Subscribe to a course! You'll be notified of its changes via DM."),
     ("/sub unsub", "Unsubscribe from a course!"),
     ("/sub show", "Show all courses you're subscribed to!"),
@@ -1371,7 +1261,7 @@ def compose_about(guild_count, page=0):
 
 # Display user's subscriptions for "sub" group commands
 def display_subscriptions(id):
-    subs, entry = find_sub(id)
+    entry = find_sub(id)
 
     # Prepare string for list of subscribed courses
     subscriptions = "```\n"
@@ -1565,83 +1455,478 @@ def compose_new_sub_confirmation(mode):
 # Send confirmation DMs to new subscribers after every update loop
 # Unsubscribe users with 3 strikes (failed DMs)
 async def check_on_everyone(bot):
-    # Get subscribers file
-    subs = open_subs()
-
     # Scan all subscribers for new subscribers
-    for key, value in subs.items():
+    for key in subscriber_store.find_users(0):
         # New subscriber found: attempt to confirm them
-        if value['confirm'] == 0:  
-            # Get list of subscriptions of user
-            subscriptions = display_subscriptions(key)
-
-            # Prepare embed
-            embed_confirmation_dm = discord.Embed(
-                title="Verification complete! Your subscription is confirmed.",
-                color=config.color_success
-            )
+        # Get list of subscriptions of user
+        subscriptions = display_subscriptions(key)
 
-            # Set author
-            embed_confirmation_dm.set_author(name="🎏 Confirmation DM sent successfully!")
+        # Prepare embed
+        embed_confirmation_dm = discord.Embed(
+            title="Verification complete! Your subscription is confirmed.",
+            color=config.color_success
+        )
 
-            # Add subscription list to embed
-            embed_confirmation_dm.add_field(
-                name="🎏 Your subscriptions",
-                value=subscriptions,
-                inline=False
-            )
+        # Set author
+        embed_confirmation_dm.set_author(name="🎏 Confirmation DM sent successfully!")
 
-            # Set footer
-            embed_confirmation_dm.set_footer(text="🎏 Tab will notify you via DM when there are changes to the above courses!")
+        # Add subscription list to embed
+        embed_confirmation_dm.add_field(
+            name="🎏 Your subscriptions",
+            value=subscriptions,
+            inline=False
+        )
 
-            # Attempt to send the DM
-            try:
-                try:
-                    await bot.get_user(int(key)).send(embed=embed_confirmation_dm)
-                except AttributeError:  # If user not in member cache
-                    user = await bot.fetch_user(int(key))
-                    await user.send(embed=embed_confirmation_dm)
-            except discord.errors.Forbidden:  # Only strike when Discord blocked the DM
-                value['strikes'] += 1  # Failed to message once: Strike
-            except:  # Attempt to resend the DM if failure is due to other errors
-                pass
-            else:
-                value['confirm'] = 1  # DM success: confirm
-        
-        # Subscriber with 3 strikes found: unsubscribe them
-        if value['strikes'] >= 3:
-            value['courses'] = []  # Unsubscribe them
-            value['confirm'] = 2  # Set status to "unsubscribed"
-            value['strikes'] = 0  # Reset number of strikes
-    
-    save_subs(subs)
-
-# Send course changes to subscribers
-async def send_to_subscribers(bot, course_code, embed, view):
-    # Get subscribers file
-    subs = open_subs()
-
-    # Check all subscribers for subscribers to the course
-    # Must also be verified (confirmed)
-    for key, value in subs.items():
-        if course_code in value['courses'] and value['confirm'] == 1 and value['strikes'] < 3:
-            # Attempt to send the DM
+        # Set footer
+        embed_confirmation_dm.set_footer(text="🎏 Tab will notify you via DM when there are changes to the above courses!")
+
+        # Attempt to send the DM
+        try:
             try:
-                try:
-                    await bot.get_user(int(key)).send(embed=embed, view=view)
-                except AttributeError:  # If user not in member cache
-                    user = await bot.fetch_user(int(key))
-                    await user.send(embed=embed, view=view)
-            except discord.errors.Forbidden:
-                value['strikes'] += 1  # Failed to message once: Strike
-            except:  # Stop bot from freaking out over API issues and oversized embed (unlikely)
-                pass
+                await bot.get_user(int(key)).send(embed=embed_confirmation_dm)
+            except AttributeError:  # If user not in member cache
+                user = await bot.fetch_user(int(key))
+                await user.send(embed=embed_confirmation_dm)
+        except discord.errors.Forbidden:  # Only strike when Discord blocked the DM
+            subscriber_store.add_strikes({key: 1})  # Failed to message once: Strike
+        except:  # Attempt to resend the DM if failure is due to other errors
+            pass
+        else:
+            subscriber_store.set_confirm(key, 1)  # DM success: confirm
     
-    # Save subscribers file after striking users
-    save_subs(subs)
+    # Subscribers with 3 strikes: unsubscribe them
+    subscriber_store.unsubscribe_struck_users()
+
+# Queue course changes to subscribers
+# Must also be verified (confirmed)
+# Every subscriber gets the announcements of all their courses in as few DMs as possible
+# Strikes of users who blocked the DM are saved by save_strikes() once the dispatcher is done
+async def send_to_subscribers(bot, announcements):
+    # Get subscribers of every course from the subscriber index
+    user_announcements = {}
+    for announcement in announcements:
+        for key in subscriber_store.find_subscribers(announcement['course_code']):
+            user_announcements.setdefault(key, []).append(announcement)
+
+    for key, announcements_of_user in user_announcements.items():
+        for priority, embeds, view in pack_announcements(announcements_of_user):
+            notify_dispatcher.direct_message(priority, bot, int(key), on_forbidden=lambda key=key: pending_strikes.update([key]), embeds=embeds, view=view)
+
+# Number of failed DMs of every user since the last save_strikes()
+pending_strikes = collections.Counter()
+
+# Strike users whose DMs failed
+def save_strikes():
+    if not pending_strikes:
+        return
+
+    subscriber_store.add_strikes(pending_strikes)  # Failed to message once: Strike
+    pending_strikes.clear()
+
+# Split long text into embed fields, leaving room for MD codeblock characters
+def add_chunked_fields(embed, first_name, cont_name, text):
+    for v_chunk in range(int(len(text) / 1014) + 1):
+        embed.add_field(
+            name=first_name if v_chunk == 0 else cont_name,
+            value=f"```\n{text[1014 * v_chunk: 1014 * (v_chunk + 1)]}\n```",
+            inline=False
+        )
+
+# Format one reserved quota as a table row
+def format_reserved_quota(reserved):
+    return f"{'> Res.':<8}| {reserved.quota:<6}{reserved.enrol:<6}{reserved.avail:<6}For: {reserved.dept}"
+
+# Format total and reserved quotas of a section as a table
+# `section`: section_model.Section
+def format_section_quotas(section_code, section):
+    section_quotas = f"```\n{'Section':<8}| {'Quota':<6}{'Enrol':<6}{'Avail':<6}{'Wait':<6}\n"
+    section_quotas += f"{trim_section(section_code):<8}| "
+    for total in section.totals():
+        section_quotas += '{:<6}'.format(total)
+
+    for reserved in section.reserved:
+        section_quotas += "\n" + format_reserved_quota(reserved)
+
+    section_quotas += "\n```"
+    return section_quotas
+
+# Add schedule of a section as fields
+# `section`: section_model.Section
+def add_schedule_fields(embed, name, section):
+    # Format (pretty print) the schedule
+    formatted_section = format_section(section)
+
+    # Section can have multiple fields due to string length
+    for field_number in range(len(formatted_section)):
+        embed.add_field(
+            name=name if field_number == 0 else name + " (cont.)",  # Add (cont.) for sections occupying more than 1 field
+            value=formatted_section[field_number],
+            inline=False
+        )
+
+# 🥑 New course!
+def compose_new_course(event):
+    embed_new_course = discord.Embed(
+        title=f"{event.title}",
+        color=0x8bd5ca  # Teal
+    )
+    embed_new_course.set_author(name="🥑 New course!")
+
+    # Display list of sections
+    new_course_sections = "```\n"
+    new_course_sections += "\n".join(list(event.new['sections'].keys()))
+    new_course_sections += "\n```"
+
+    embed_new_course.add_field(
+        name=f"🥑 {len(event.new['sections'])} sections",
+        value=new_course_sections,
+        inline=False
+    )
+    return embed_new_course
+
+# 🥥 Course info changed!
+def compose_course_info_change(event):
+    embed_course_info_change = discord.Embed(
+        title=f"{event.title}",
+        color=0xcad3f5  # Text
+    )
+    embed_course_info_change.set_author(name="🥥 Course info changed!")
+
+    # Course title
+    if event.kind == "title":
+        embed_course_info_change.add_field(
+            name="🥥 Changed: Title\n⬅️ Old",
+            value=f"```\n{event.old}\n```",
+            inline=False
+        )
+        embed_course_info_change.add_field(
+            name="➡️ New",
+            value=f"```\n{event.new}\n```",
+            inline=False
+        )
+        return embed_course_info_change
+
+    heading = event.key.replace("\n", " ").title()
+    if event.kind == "info_new":
+        add_chunked_fields(embed_course_info_change, "🥥 New: " + heading, heading + " (cont.)", event.new)
+    elif event.kind == "info_removed":
+        add_chunked_fields(embed_course_info_change, "🥥 Removed: " + heading, heading + " (cont.)", event.old)
+    else:
+        # "Heading": Display part of course info changed
+        add_chunked_fields(embed_course_info_change, "🥥 Changed: " + heading + "\n⬅️ Old", "⬅️ Old (cont.)", event.old)
+        add_chunked_fields(embed_course_info_change, "➡️ New", "➡️ New (cont.)", event.new)
+    return embed_course_info_change
+
+# 🍅 New section!
+def compose_new_section(event):
+    embed_new_section = discord.Embed(
+        title=f"{event.title}: {event.section}",
+        color=0xed8796  # Red
+    )
+    embed_new_section.set_author(name="🍅 New section!")
+
+    section = event.new
+    add_schedule_fields(embed_new_section, "🍅 Schedule", section)
+    embed_new_section.add_field(
+        name="🍅 Quota",
+        value=format_section_quotas(event.section, section),
+        inline=False
+    )
+    return embed_new_section
+
+# 🍋 Quota changed!
+def compose_quota_change(event):
+    embed_quota_change = discord.Embed(
+        title=f"{event.title}: {event.section}",
+        color=0xeed49f  # Yellow
+    )
+    embed_quota_change.set_author(name="🍋 Quota changed!")
+
+    old = event.old
+    new = event.new
+
+    # Total quota
+    if new.quota > old.quota:
+        total_quota_change_name = f"🍋 Total: {old.quota} -> {new.quota} (+{new.quota - old.quota})"
+    elif new.quota < old.quota:
+        total_quota_change_name = f"🍋 Total: {old.quota} -> {new.quota} ({new.quota - old.quota})"
+    else:
+        total_quota_change_name = f"🍋 Total: {new.quota}"
+
+    # Reserved quota changes (adds and changes)
+    quota_res_old_dict = old.reserved_dict()
+    quota_res_new_dict = new.reserved_dict()
+    for k, v in quota_res_new_dict.items():
+        # New reserved quota
+        if k not in quota_res_old_dict:
+            total_quota_change_name += f"\n➡️ Reserved ({k}): {v.quota} (New)"
+        # Changed reserved quota
+        elif v.quota != quota_res_old_dict[k].quota:
+            # Determine sign of quota change
+            if v.quota >= quota_res_old_dict[k].quota:
+                res_change_sign = "+"
+            else:
+                res_change_sign = "-"
+            # Find magnitude of quota change
+            res_change = abs(v.quota - quota_res_old_dict[k].quota)
+
+            total_quota_change_name += f"\n↔️ Reserved ({k}): {quota_res_old_dict[k].quota} -> {v.quota} ({res_change_sign}{res_change})"
+
+    embed_quota_change.add_field(
+        name=total_quota_change_name,
+        value=format_section_quotas(event.section, new),
+        inline=False
+    )
+
+    # Reserved quota changes (removals)
+    for k, v in quota_res_old_dict.items():
+        if k not in quota_res_new_dict:
+            embed_quota_change.add_field(
+                name=f"⬅️ Reserved ({k}): {v.quota} (Removed)",
+                value=f"```\n{format_reserved_quota(v)}\n```",
+                inline=False
+            )
+    return embed_quota_change
+
+# Heading, color, emoji and column of list changes: 🥭 time, 🥝 venue, 🍇 instructor, 🍑 TA, 🫐 remarks
+list_change_styles = {
+    "time": ("🥭 Date & Time changed!", 0xee99a0, "🥭"),  # Maroon
+    "venue": ("🥝 Venue changed!", 0xa6da95, "🥝"),  # Green
+    "instructor": ("🍇 Instructor changed!", 0xc6a0f6, "🍇"),  # Mauve
+    "ta": ("🍑 TA/IA/GTA changed!", 0xf5bde6, "🍑"),  # Peach
+    "remarks": ("🫐 Remarks changed!", 0x8aadf4, "🫐")  # Blue
+}
+
+# Get the compared list of a time, venue, instructor, TA or remarks change
+# section: Section
+def get_change_list(kind, section):
+    if kind == "time":
+        return [m.time for m in section.meetings]  # Time list elements are guaranteed to be unique
+    elif kind == "remarks":
+        return diff_engine.remarks_list(section)
+    return diff_engine.meeting_names(section, kind)
+
+# Format one side of a list change as a diff code block
+def format_change_list(kind, lines):
+    separator = "\n\n" if kind == "time" else "\n"
+    # Remove "diff" from empty TA and remarks fields
+    if kind == "ta" and len(lines) == 0:
+        return "```\n```"
+    elif kind == "remarks" and len(lines) == 0:
+        return "```\n\n```"
+    return "```diff\n" + separator.join(lines) + "\n```"
+
+# 🥭 Date & Time / 🥝 Venue / 🍇 Instructor / 🍑 TA/IA/GTA / 🫐 Remarks changed!
+def compose_list_change(event):
+    heading, color, emoji = list_change_styles[event.kind]
+    list_new = get_change_list(event.kind, event.new)
+    list_old = get_change_list(event.kind, event.old)
+
+    embed_list_change = discord.Embed(
+        title=f"{event.title}: {event.section}",
+        color=color
+    )
+    embed_list_change.set_author(name=heading)
+
+    # Check additions and removals
+    deltas = list_diffs(list_new, list_old)
+    diffed = diff_highlight(list_new, list_old)
+
+    # Split view comparison
+    embed_list_change.add_field(
+        name=f"{emoji} Old",
+        value=format_change_list(event.kind, diffed[1]),
+        inline=True
+    )
+    embed_list_change.add_field(
+        name=f"{emoji} New",
+        value=format_change_list(event.kind, diffed[0]),
+        inline=True
+    )
+
+    # Display number of changes
+    embed_list_change.set_footer(text=f"{emoji} {len(deltas[0])} additions, {len(deltas[1])} removals")
+    return embed_list_change
+
+# ☕ Course deleted!
+def compose_course_deleted(event):
+    embed_delete_course = discord.Embed(
+        title=f"{event.title}",
+        color=0xf4dbd6  # Rosewater
+    )
+    embed_delete_course.set_author(name="☕ Course deleted!")
+
+    # Display list of sections
+    delete_course_sections = "```\n"
+    delete_course_sections += "\n".join(list(event.old['sections'].keys()))
+    delete_course_sections += "\n```"
+
+    embed_delete_course.add_field(
+        name=f"☕ {len(event.old['sections'])} sections",
+        value=delete_course_sections,
+        inline=False
+    )
+    return embed_delete_course
+
+# 🍹 Section deleted!
+def compose_section_deleted(event):
+    embed_delete_section = discord.Embed(
+        title=f"{event.title}: {event.section}",
+        color=0xf5a97f  # Peach
+    )
+    embed_delete_section.set_author(name="🍹 Section deleted!")
+
+    section = event.old
+    add_schedule_fields(embed_delete_section, "🍹 Schedule", section)
+    embed_delete_section.add_field(
+        name="🍹 Quota",
+        value=format_section_quotas(event.section, section),
+        inline=False
+    )
+    return embed_delete_section
+
+# Embed composer of every kind of diff_engine event
+diff_composers = {
+    "new_course": compose_new_course,
+    "title": compose_course_info_change,
+    "info_new": compose_course_info_change,
+    "info_changed": compose_course_info_change,
+    "info_removed": compose_course_info_change,
+    "new_section": compose_new_section,
+    "quota": compose_quota_change,
+    "time": compose_list_change,
+    "venue": compose_list_change,
+    "instructor": compose_list_change,
+    "ta": compose_list_change,
+    "remarks": compose_list_change,
+    "course_deleted": compose_course_deleted,
+    "section_deleted": compose_section_deleted
+}
+
+# Discord limits of embeds and messages
+embed_field_limit = 25
+embed_char_limit = 6000
+message_embed_limit = 10
+
+# Number of characters of an embed field counted by Discord
+def field_length(field):
+    return len(field.name) + len(field.value)
+
+# Split a list of field blocks into pages fitting in an embed
+# reserved: characters used by the embed outside of the fields
+# Blocks are kept in one page unless they are too long for a page on their own
+def paginate_fields(blocks, reserved):
+    pages = [[]]
+    page_length = 0
+    for block in blocks:
+        block_length = sum(field_length(f) for f in block)
+        # Block doesn't fit in the current page: start a new page
+        if pages[-1] and (len(pages[-1]) + len(block) > embed_field_limit or page_length + block_length > embed_char_limit - reserved):
+            pages.append([])
+            page_length = 0
+        for field in block:
+            # Block too long for a page on its own: continue it on the next page
+            if pages[-1] and (len(pages[-1]) >= embed_field_limit or page_length + field_length(field) > embed_char_limit - reserved):
+                pages.append([])
+                page_length = 0
+            pages[-1].append(field)
+            page_length += field_length(field)
+    return pages
+
+# Combine change announcements of one course into as few embeds as possible
+# Returns list of embeds
+def coalesce_course_embeds(events, embeds):
+    # One change: send the embed as is
+    if len(embeds) == 1:
+        return embeds
+
+    # Every change becomes a heading field followed by the fields of its embed
+    blocks = []
+    for event, embed in zip(events, embeds):
+        heading_value = f"**{event.section}**" if event.section is not None else "\u200b"  # Zero width space: field value can't be empty
+        if embed.footer.text:
+            heading_value += f"\n{embed.footer.text}"
+        heading = discord.embeds.EmbedProxy({"name": embed.author.name, "value": heading_value, "inline": False})
+        blocks.append([heading] + embed.fields)
+
+    title = events[0].title
+    author = f"🍊 {len(embeds)} changes!"
+    pages = paginate_fields(blocks, reserved=len(title) + len(author) + 32)  # Leave room for the page number in footer
+
+    # Embed color of the most important change
+    color = embeds[min(range(len(events)), key=lambda i: notify_dispatcher.priorities.get(events[i].kind, notify_dispatcher.default_priority))].color
+
+    coalesced = []
+    for page_number, page in enumerate(pages):
+        embed = discord.Embed(title=title, color=color)
+        embed.set_author(name=author)
+        for field in page:
+            embed.add_field(name=field.name, value=field.value, inline=field.inline)
+        if len(pages) > 1:
+            embed.set_footer(text=f"📄 Page {page_number + 1} of {len(pages)}")
+        coalesced.append(embed)
+    return coalesced
+
+# Compose change announcements of all courses
+# Returns list of dicts sorted by priority (quota changes first):
+# {"course_code", "priority", "embeds", "source": (course code or prefix, source url mode)}
+def compose_announcements(events):
+    course_events = {}
+    for event in events:
+        course_events.setdefault(event.course_code, []).append(event)
+
+    announcements = []
+    for course_code, events in course_events.items():
+        embeds = [diff_composers[event.kind](event) for event in events]
+
+        # Link to source in original quota website: subject page of deleted courses
+        if any(event.kind == "course_deleted" for event in events):
+            source = (course_code[0: 4], "l")  # Course code prefix
+        else:
+            source = (course_code, None)
+
+        announcements.append({
+            "course_code": course_code,
+            "priority": min(notify_dispatcher.priorities.get(event.kind, notify_dispatcher.default_priority) for event in events),
+            "embeds": coalesce_course_embeds(events, embeds),
+            "source": source
+        })
+
+    return sorted(announcements, key=lambda a: a['priority'])
+
+# Pack announcements into as few messages as possible
+# A message has max 10 embeds with max 6000 characters in total
+# Pages of an announcement can be split into multiple messages
+# Returns list of (priority, embeds, view)
+def pack_announcements(announcements):
+    messages = []
+    embeds, courses, length = [], [], 0
+
+    # Add links to source in original quota website, labelled by course if there are multiple courses
+    def add_message():
+        view = SubLinks()
+        for a in courses:
+            add_source_url(view, *a['source'], label="Source" if len(courses) == 1 else a['course_code'])
+        messages.append((min(a['priority'] for a in courses), embeds, view))
+
+    for announcement in announcements:
+        for embed in announcement['embeds']:
+            # Message full: start a new message
+            if embeds and (len(embeds) >= message_embed_limit or length + len(embed) > embed_char_limit):
+                add_message()
+                embeds, courses, length = [], [], 0
+            embeds.append(embed)
+            length += len(embed)
+            if announcement not in courses:
+                courses.append(announcement)
+    if embeds:
+        add_message()
+
+    return messages
 
 # Helper function to check if course/section/quota changed
-async def check_diffs(bot, new_quotas=None, old_quotas=None):
+# unchanged_courses: course codes whose subject page is identical to the last crawl, skipped
+async def check_diffs(bot, new_quotas=None, old_quotas=None, unchanged_courses=()):
     # Open quotas files
     if not new_quotas:
         new_quotas = open_quotas()
@@ -1661,839 +1946,39 @@ async def check_diffs(bot, new_quotas=None, old_quotas=None):
     # No comparison if current quotas file is empty
     if list(new_quotas.keys()) == ['time']:
         return
-    
-    changed = False
-    for key, value in new_quotas.items():
-        # Skip 'time' entry
-        if key == 'time':
-            continue
-            
-        # Add link to source in original quota website
-        view_new = SubLinks()
-        add_source_url(view_new, key)  # key: Course code
-
-        # 🥑 New course!
-        if key not in old_quotas:
-            # await channels.get(key[0: 4], channels['other']).send(f"🥑 **New course!**\n{value.get('title', 'Error')}\n{len(value['sections'])} sections")
-            # Prepare change announcement embed: course name
-            embed_new_course = discord.Embed(
-                title=f"{value.get('title', 'Error')}",
-                color=0x8bd5ca  # Teal
-            )
-            # Prepare header of change announcement
-            embed_new_course.set_author(name="🥑 New course!")
-
-            # Display list of sections
-            new_course_sections = "```\n"
-            new_course_sections += "\n".join(list(value['sections'].keys()))
-            new_course_sections += "\n```"
-
-            # Add field
-            embed_new_course.add_field(
-                name=f"🥑 {len(value['sections'])} sections",
-                value=new_course_sections,
-                inline=False
-            )
 
-            # Send the announcement
-            # Wrap in try except block to handle API issues
-            # May result in missed messages! Could use a better implementation in the future
-            try:
-                await channels.get(key[0: 4], channels['other']).send(embed=embed_new_course, view=view_new)
-                await send_to_subscribers(bot, key, embed_new_course, view_new)
-            except:
-                pass
+    # Find all changes first, then announce them
+    events = diff_engine.diff_quotas(new_quotas, old_quotas, skip=unchanged_courses)
 
-            changed = True
+    # Changes of a course are announced together
+    announcements = compose_announcements(events)
 
-        else:
-            # 🥥 Course info changed!
-            # Initialize course titles
-            title_old = old_quotas[key]['title']
-            title_new = new_quotas[key]['title']
-
-            # Send message for course title change
-            if title_old != title_new:
-                embed_course_info_change = discord.Embed(
-                    title=f"{value.get('title', 'Error')}",
-                    color=0xcad3f5  # Text
-                )
-                embed_course_info_change.set_author(name="🥥 Course info changed!")
-
-                embed_course_info_change.add_field(
-                    name="🥥 Changed: Title\n⬅️ Old",
-                    value=f"```\n{title_old}\n```",
-                    inline=False
-                )
-
-                embed_course_info_change.add_field(
-                    name="➡️ New",
-                    value=f"```\n{title_new}\n```",
-                    inline=False
-                )
-
-                # Send the message
-                # Wrapped to handle API issues
-                try:
-                    await channels.get(key[0: 4], channels['other']).send(embed=embed_course_info_change, view=view_new)
-                    await send_to_subscribers(bot, key, embed_course_info_change, view_new)
-                except:  # Stop bot from freaking out over oversized embed (unlikely)
-                    pass
-
-                changed = True
-
-            # Initialize dicts of course info
-            info_compare_old = old_quotas[key]['info']
-            info_compare_new = new_quotas[key]['info']
-
-            # Check course info additions and changes
-            for k, v in info_compare_new.items():
-                # Send 1 message for every change
-                embed_course_info_change = discord.Embed(
-                    title=f"{value.get('title', 'Error')}",
-                    color=0xcad3f5  # Text
-                )
-                embed_course_info_change.set_author(name="🥥 Course info changed!")
-
-                # Send message for new course info
-                if k not in info_compare_old:
-                    # Split info into multiple fields
-                    for v_chunk in range(int(len(v) / 1014) + 1):  # Leave room for MD codeblock characters
-                        if v_chunk == 0:
-                            k_name = "🥥 New: " + k.replace("\n", " ").title()
-                        else:
-                            k_name = k.replace("\n", " ").title() + " (cont.)"
-                        
-                        try:
-                            embed_course_info_change.add_field(
-                                name=k_name,
-                                value=f"```\n{v[1014 * v_chunk: 1014 * (v_chunk + 1)]}\n```",
-                                inline=False
-                            )
-                        except IndexError:
-                            embed_course_info_change.add_field(
-                                name=k_name,
-                                value=f"```\n{v[1014 * v_chunk: ]}\n```",
-                                inline=False
-                            )
-                    
-                    # Send the message
-                    # Wrapped to handle API issues
-                    try:
-                        await channels.get(key[0: 4], channels['other']).send(embed=embed_course_info_change, view=view_new)
-                        await send_to_subscribers(bot, key, embed_course_info_change, view_new)
-                    except:  # Stop bot from freaking out over oversized embed (unlikely)
-                        pass
-
-                    changed = True
-
-                # Send message for changed course info
-                elif v != info_compare_old[k]:
-                    # Split info into multiple fields
-                    for piece_k, piece_v in {"⬅️ Old": info_compare_old[k], "➡️ New": v}.items():
-                        for v_chunk in range(int(len(piece_v) / 1014) + 1):
-                            piece_k_name = ""
-                            # "Heading": Display part of course info changed
-                            if piece_k == "⬅️ Old" and v_chunk == 0:
-                                piece_k_name = "🥥 Changed: " + k.replace("\n", " ").title() + "\n"
-                            piece_k_name += piece_k
-                            if v_chunk > 0:
-                                piece_k_name += " (cont.)"
-                            
-                            try:
-                                embed_course_info_change.add_field(
-                                    name=piece_k_name,
-                                    value=f"```\n{piece_v[1014 * v_chunk: 1014 * (v_chunk + 1)]}\n```",
-                                    inline=False
-                                )
-                            except IndexError:
-                                embed_course_info_change.add_field(
-                                    name=piece_k_name,
-                                    value=f"```\n{piece_v[1014 * v_chunk: ]}\n```",
-                                    inline=False
-                                )
-                        
-                    # Send the message
-                    # Wrapped to handle API issues
-                    try:
-                        await channels.get(key[0: 4], channels['other']).send(embed=embed_course_info_change, view=view_new)
-                        await send_to_subscribers(bot, key, embed_course_info_change, view_new)
-                    except:  # Stop bot from freaking out over oversized embed (unlikely)
-                        pass
-                    
-                    changed = True
-                
-            # Check course info removals
-            for k, v in info_compare_old.items():
-                # Send 1 message for every removal
-                embed_course_info_change = discord.Embed(
-                    title=f"{value.get('title', 'Error')}",
-                    color=0xcad3f5  # Text
-                )
-                embed_course_info_change.set_author(name="🥥 Course info changed!")
-
-                # Send message for removed course info
-                if k not in info_compare_new:
-                    # Split info into multiple fields
-                    for v_chunk in range(int(len(v) / 1014) + 1):  # Leave room for MD codeblock characters
-                        if v_chunk == 0:
-                            k_name = "🥥 Removed: " + k.replace("\n", " ").title()
-                        else:
-                            k_name = k.replace("\n", " ").title() + " (cont.)"
-                        
-                        try:
-                            embed_course_info_change.add_field(
-                                name=k_name,
-                                value=f"```\n{v[1014 * v_chunk: 1014 * (v_chunk + 1)]}\n```",
-                                inline=False
-                            )
-                        except IndexError:
-                            embed_course_info_change.add_field(
-                                name=k_name,
-                                value=f"```\n{v[1014 * v_chunk: ]}\n```",
-                                inline=False
-                            )
-
-                    # Send the message
-                    # Wrapped to handle API issues
-                    try:
-                        await channels.get(key[0: 4], channels['other']).send(embed=embed_course_info_change, view=view_new)
-                        await send_to_subscribers(bot, key, embed_course_info_change, view=view_new)
-                    except:  # Stop bot from freaking out over oversized embed (unlikely)
-                        pass
-                    
-                    changed = True
-
-            # key2: Section code, class number
-            # value2: List containing schedule and quota
-            for key2, value2 in value['sections'].items():
-                # 🍅 New section!
-                if key2 not in old_quotas[key]['sections']:
-                    # Quota of the new section
-                    quota_new = value2[5].split("\n")
-                    # await channels.get(key[0: 4], channels['other']).send(f"🍅 **New section!**\n{value.get('title', 'Error')}: {key2}\nQuota: {quota_new}")
-                    
-                    # Prepare change announcement embed: course name, section name
-                    embed_new_section = discord.Embed(
-                        title=f"{value.get('title', 'Error')}: {key2}",
-                        color=0xed8796  # Red
-                    )
-                    # Prepare header of change announcement
-                    embed_new_section.set_author(name="🍅 New section!")
-
-                    # Display schedule of section
-                    # Format (pretty print) the schedule
-                    new_section_formatted_section = format_section(value2)
-
-                    # Section can have multiple fields due to string length
-                    # Using range for loop to get index of field
-                    for new_section_schedule_field_number in range(len(new_section_formatted_section)):
-                        # new_section_schedule_name: Schedule field name
-                        new_section_schedule_name = "🍅 Schedule"
-                        # Add (cont.) for sections occupying more than 1 field
-                        if new_section_schedule_field_number > 0:
-                            new_section_schedule_name += " (cont.)"
-                        
-                        # Add one field of a section
-                        embed_new_section.add_field(
-                            name=new_section_schedule_name,
-                            value=new_section_formatted_section[new_section_schedule_field_number],
-                            inline=False
-                        )
-
-                    # Display quota of section: Total
-                    new_section_quotas = f"```\n{'Section':<8}| {'Quota':<6}{'Enrol':<6}{'Avail':<6}{'Wait':<6}\n"
-                    new_section_quotas += f"{trim_section(key2):<8}| "
-                    for i in range(5, 9):
-                        new_section_quotas += '{:<6}'.format(value2[i].split("\n")[0])
-                    
-                    # Display quota of section: reserved
-                    new_res_dict = {}
-                    if len(quota_new) >= 3:
-                        # Dict to store dept names and numbers
-                        for i in range(2, len(quota_new)):
-                            # Split dept name from numbers
-                            quota_new_res = quota_new[i].split(": ")
-                            new_res_dict[quota_new_res[0]] = quota_new_res[1].split("/")
-                    
-                    for k, v in new_res_dict.items():
-                        new_section_quotas += f"\n{'> Res.':<8}| "
-                        # Quota/enrol/avail
-                        for i in range(3):
-                            new_section_quotas += f"{v[i]:<6}"
-                        # Dept
-                        new_section_quotas += f"For: {k}"
-
-                    new_section_quotas += "\n```"
-
-                    # Add field
-                    embed_new_section.add_field(
-                        name="🍅 Quota",
-                        value=new_section_quotas,
-                        inline=False
-                    )
-                    
-                    # Send the announcement
-                    # Wrapped to handle API issues
-                    try:
-                        await channels.get(key[0: 4], channels['other']).send(embed=embed_new_section, view=view_new)
-                        await send_to_subscribers(bot, key, embed_new_section, view_new)
-                    except:
-                        pass
-
-                    changed = True
-                
-                else:
-                    # 🍋 Quota changed!
-                    quota_section_old = old_quotas[key]['sections'][key2][5].split("\n")
-                    quota_section_new = value2[5].split("\n")
-
-                    # Total quota
-                    quota_old = quota_section_old[0]
-                    quota_new = quota_section_new[0]
-
-                    # Reserved quota (if exists)
-                    # Old
-                    quota_res_old_dict = {}
-                    if len(quota_section_old) >= 3:
-                        # Dict to store dept names and numbers
-                        for i in range(2, len(quota_section_old)):
-                            # Split dept name from numbers
-                            quota_res_old = quota_section_old[i].split(": ")
-                            quota_res_old_dict[quota_res_old[0]] = quota_res_old[1].split("/")
-                    
-                    # New
-                    quota_res_new_dict = {}
-                    if len(quota_section_new) >= 3:
-                        # Dict to store dept names and numbers
-                        for i in range(2, len(quota_section_new)):
-                            # Split dept name from numbers
-                            quota_res_new = quota_section_new[i].split(": ")
-                            quota_res_new_dict[quota_res_new[0]] = quota_res_new[1].split("/")
-
-                    # Check if reserved quotas changed
-                    quota_res_old_compare = {}
-                    quota_res_new_compare = {}
-                    for k, v in quota_res_old_dict.items():
-                        quota_res_old_compare[k] = v[0]
-                    for k, v in quota_res_new_dict.items():
-                        quota_res_new_compare[k] = v[0]
-                    
-                    if (quota_new != quota_old) or (quota_res_old_compare != quota_res_new_compare):
-                        # Prepare change announcement embed: course name, section name
-                        embed_quota_change = discord.Embed(
-                            title=f"{value.get('title', 'Error')}: {key2}",
-                            color=0xeed49f  # Yellow
-                        )
-                        # Prepare header of change announcement
-                        embed_quota_change.set_author(name="🍋 Quota changed!")
-
-                        # Display (total) quota change
-                        changed_section_quotas = f"```\n{'Section':<8}| {'Quota':<6}{'Enrol':<6}{'Avail':<6}{'Wait':<6}\n"
-                        changed_section_quotas += f"{trim_section(key2):<8}| "
-                        for i in range(5, 9):
-                            changed_section_quotas += '{:<6}'.format(value2[i].split("\n", 1)[0])
-
-                        # Add field (Total quotas)
-                        if int(quota_new) > int(quota_old):
-                            total_quota_change_name = f"🍋 Total: {quota_old} -> {quota_new} (+{int(quota_new) - int(quota_old)})"
-                        elif int(quota_new) < int(quota_old):
-                            total_quota_change_name = f"🍋 Total: {quota_old} -> {quota_new} ({int(quota_new) - int(quota_old)})"
-                        else:
-                            total_quota_change_name = f"🍋 Total: {quota_new}"
-
-                        # Display (reserved) quota change (adds and changes)
-                        for k, v in quota_res_new_dict.items():
-                            changed_section_quotas += f"\n{'> Res.':<8}| "
-                            # Quota/enrol/avail
-                            for i in range(3):
-                                changed_section_quotas += f"{v[i]:<6}"
-                            # Dept
-                            changed_section_quotas += f"For: {k}"
-
-                            # Add field (reserved quotas)
-                            # New reserved quota
-                            if k not in quota_res_old_dict:
-                                total_quota_change_name += f"\n➡️ Reserved ({k}): {v[0]} (New)"
-                            # Changed reserved quota
-                            elif int(v[0]) != int(quota_res_old_dict[k][0]): 
-                                # Determine sign of quota change
-                                if int(v[0]) >= int(quota_res_old_dict[k][0]):
-                                    res_change_sign = "+"
-                                else:
-                                    res_change_sign = "-"
-                                # Find magnitude of quota change
-                                res_change = abs(int(v[0]) - int(quota_res_old_dict[k][0]))
-
-                                total_quota_change_name += f"\n↔️ Reserved ({k}): {quota_res_old_dict[k][0]} -> {v[0]} ({res_change_sign}{res_change})"
-                        
-                        changed_section_quotas += "\n```"
-                        
-                        embed_quota_change.add_field(
-                            name=total_quota_change_name,
-                            value=changed_section_quotas,
-                            inline=False
-                        )
-                        
-                        # Display (reserved) quota change (removals)
-                        for k, v in quota_res_old_dict.items():
-                            if k not in quota_res_new_dict:
-                                res_field = f"```\n{'> Res.':<8}| "
-                                # Quota/enrol/avail
-                                for i in range(3):
-                                    res_field += f"{v[i]:<6}"
-                                # Dept
-                                res_field += f"For: {k}"
-                                res_field += "\n```"
-                            
-                                # Add field
-                                embed_quota_change.add_field(
-                                    name=f"⬅️ Reserved ({k}): {v[0]} (Removed)",
-                                    value=res_field,
-                                    inline=False
-                                )
-
-                        # Send the announcement
-                        # Wrapped to handle API issues
-                        try:
-                            await channels.get(key[0: 4], channels['other']).send(embed=embed_quota_change, view=view_new)
-                            await send_to_subscribers(bot, key, embed_quota_change, view_new)
-                        except:
-                            pass
-
-                        changed = True
-                    
-                    # 🥭 Date & Time changed!
-                    # Initialize list of values
-                    # Time list elements are guaranteed to be unique
-                    time_list_new = value2[1].split("\n\n\n")
-                    time_list_old = old_quotas[key]['sections'][key2][1].split("\n\n\n")
-
-                    # Prepare change announcement text: course name, section name, section ID
-                    embed_time_change = discord.Embed(
-                        title=f"{value.get('title', 'Error')}: {key2}",
-                        color=0xee99a0  # Maroon
-                    )
-                    # Prepare header of change announcement
-                    embed_time_change.set_author(name="🥭 Date & Time changed!")
-
-                    # Check additions and removals
-                    time_deltas = list_diffs(time_list_new, time_list_old)
-                    time_diffed = diff_highlight(time_list_new, time_list_old)
-
-                    # Add old date & time field
-                    time_old_field = "```diff\n"  # Diff syntax highlighting
-                    time_old_field += "\n\n".join(time_diffed[1])
-                    time_old_field += "\n```"
-                    # Add field to embed
-                    embed_time_change.add_field(
-                        name="🥭 Old",
-                        value=time_old_field,
-                        inline=True  # Split view comparison
-                    )
-
-                    # Add new date & time field
-                    time_new_field = "```diff\n"  # Diff syntax highlighting
-                    time_new_field += "\n\n".join(time_diffed[0])
-                    time_new_field += "\n```"
-                    # Add field to embed
-                    embed_time_change.add_field(
-                        name="🥭 New",
-                        value=time_new_field,
-                        inline=True  # Split view comparison
-                    )
-
-                    # Display number of changes
-                    embed_time_change.set_footer(text=f"🥭 {len(time_deltas[0])} additions, {len(time_deltas[1])} removals")
-
-                    # If there is time change, send the announcement
-                    if time_deltas != ([], []):
-                        # Wrapped to handle API issues
-                        try:
-                            await channels.get(key[0: 4], channels['other']).send(embed=embed_time_change, view=view_new)
-                            await send_to_subscribers(bot, key, embed_time_change, view_new)
-                        except:
-                            pass
-                        changed = True
-
-                    # 🥝 Venue changed!
-                    # Initialize list of values
-                    venue_list_new = value2[2].split("\n")
-                    venue_list_old = old_quotas[key]['sections'][key2][2].split("\n")
-                    # Remove empty list elements
-                    venue_list_new = [venue for venue in venue_list_new if venue != ""]
-                    venue_list_old = [venue for venue in venue_list_old if venue != ""]
-                    # Remove duplicates
-                    # Create a dict using the list items as keys to automatically remove any duplicates because dicts cannot have duplicate keys
-                    # Convert dict back into a list, assign it to the list of venues
-                    venue_list_new = list(dict.fromkeys(venue_list_new))
-                    venue_list_old = list(dict.fromkeys(venue_list_old))
-
-                    # Prepare change announcement text: Header, course name, section name, section ID
-                    embed_venue_change = discord.Embed(
-                        title=f"{value.get('title', 'Error')}: {key2}",
-                        color=0xa6da95  # Green
-                    )
-                    # Prepare header of change announcement
-                    embed_venue_change.set_author(name="🥝 Venue changed!")
-
-                    # Check additions and removals
-                    venue_deltas = list_diffs(venue_list_new, venue_list_old)
-                    venue_diffed = diff_highlight(venue_list_new, venue_list_old)
-
-                    # Add old venue field
-                    venue_old_field = "```diff\n"  # Diff syntax highlighting
-                    venue_old_field += "\n".join(venue_diffed[1])
-                    venue_old_field += "\n```"
-                    # Add field to embed
-                    embed_venue_change.add_field(
-                        name="🥝 Old",
-                        value=venue_old_field,
-                        inline=True  # Split view comparison
-                    )
-
-                    # Add new venue field
-                    venue_new_field = "```diff\n"  # Diff syntax highlighting
-                    venue_new_field += "\n".join(venue_diffed[0])
-                    venue_new_field += "\n```"
-                    # Add field to embed
-                    embed_venue_change.add_field(
-                        name="🥝 New",
-                        value=venue_new_field,
-                        inline=True  # Split view comparison
-                    )
-                    
-                    # Display number of changes
-                    embed_venue_change.set_footer(text=f"🥝 {len(venue_deltas[0])} additions, {len(venue_deltas[1])} removals")
-
-                    # If there is venue change, send the announcement
-                    if venue_deltas != ([], []):
-                        # Wrapped to handle API issues
-                        try:
-                            await channels.get(key[0: 4], channels['other']).send(embed=embed_venue_change, view=view_new)
-                            await send_to_subscribers(bot, key, embed_venue_change, view_new)
-                        except:
-                            pass
-                        changed = True
-                    
-                    # 🍇 Instructor changed!
-                    # Initialize list of values
-                    inst_list_new = value2[3].split("\n")
-                    inst_list_old = old_quotas[key]['sections'][key2][3].split("\n")
-                    # Remove empty list elements
-                    inst_list_new = [inst for inst in inst_list_new if inst != ""]
-                    inst_list_old = [inst for inst in inst_list_old if inst != ""]
-                    # Remove duplicates
-                    # Create a dict using the list items as keys to automatically remove any duplicates because dicts cannot have duplicate keys
-                    # Convert dict back into a list, assign it to the list of instructors
-                    inst_list_new = list(dict.fromkeys(inst_list_new))
-                    inst_list_old = list(dict.fromkeys(inst_list_old))
-
-                    # Prepare change announcement text: Header, course name, section name, section ID
-                    embed_inst_change = discord.Embed(
-                        title=f"{value.get('title', 'Error')}: {key2}",
-                        color=0xc6a0f6  # Mauve
-                    )
-                    # Prepare header of change announcement
-                    embed_inst_change.set_author(name="🍇 Instructor changed!")
-
-                    # Check additions and removals
-                    inst_deltas = list_diffs(inst_list_new, inst_list_old)
-                    inst_diffed = diff_highlight(inst_list_new, inst_list_old)
-
-                    # Add old instructor field
-                    inst_old_field = "```diff\n"  # Diff syntax highlighting
-                    inst_old_field += "\n".join(inst_diffed[1])
-                    inst_old_field += "\n```"
-                    # Add field to embed
-                    embed_inst_change.add_field(
-                        name="🍇 Old",
-                        value=inst_old_field,
-                        inline=True  # Split view comparison
-                    )
-
-                    # Add new instructor field
-                    inst_new_field = "```diff\n"  # Diff syntax highlighting
-                    inst_new_field += "\n".join(inst_diffed[0])
-                    inst_new_field += "\n```"
-                    # Add field to embed
-                    embed_inst_change.add_field(
-                        name="🍇 New",
-                        value=inst_new_field,
-                        inline=True  # Split view comparison
-                    )
-                    
-                    # Display number of changes
-                    embed_inst_change.set_footer(text=f"🍇 {len(inst_deltas[0])} additions, {len(inst_deltas[1])} removals")
-
-                    # If there is instructor change, send the announcement
-                    if inst_deltas != ([], []):
-                        # Wrapped to handle API issues
-                        try:
-                            await channels.get(key[0: 4], channels['other']).send(embed=embed_inst_change, view=view_new)
-                            await send_to_subscribers(bot, key, embed_inst_change, view_new)
-                        except:
-                            pass
-                        changed = True
-                    
-                    # 🍑 TA/IA/GTA changed!
-                    # Initialize list of values
-                    ta_list_new = value2[4].split("\n")
-                    ta_list_old = old_quotas[key]['sections'][key2][4].split("\n")
-                    # Remove empty list elements
-                    ta_list_new = [ta for ta in ta_list_new if ta != ""]
-                    ta_list_old = [ta for ta in ta_list_old if ta != ""]
-                    # Remove duplicates
-                    # Create a dict using the list items as keys to automatically remove any duplicates because dicts cannot have duplicate keys
-                    # Convert dict back into a list, assign it to the list of instructors
-                    ta_list_new = list(dict.fromkeys(ta_list_new))
-                    ta_list_old = list(dict.fromkeys(ta_list_old))
-
-                    # Prepare change announcement text: Header, course name, section name, section ID
-                    embed_ta_change = discord.Embed(
-                        title=f"{value.get('title', 'Error')}: {key2}",
-                        color=0xf5bde6  # Peach
-                    )
-                    # Prepare header of change announcement
-                    embed_ta_change.set_author(name="🍑 TA/IA/GTA changed!")
-
-                    # Check additions and removals
-                    ta_deltas = list_diffs(ta_list_new, ta_list_old)
-                    ta_diffed = diff_highlight(ta_list_new, ta_list_old)
-
-                    # Add old TA field
-                    # Remove "diff" if field is empty
-                    ta_old_field = "```"
-                    if len(ta_diffed[1]) > 0:
-                        ta_old_field += "diff\n"  # Diff syntax highlighting
-                        ta_old_field += "\n".join(ta_diffed[1])
-                    ta_old_field += "\n```"
-                    # Add field to embed
-                    embed_ta_change.add_field(
-                        name="🍑 Old",
-                        value=ta_old_field,
-                        inline=True  # Split view comparison
-                    )
-
-                    # Add new TA field
-                    ta_new_field = "```"
-                    if len(ta_diffed[0]) > 0:
-                        ta_new_field += "diff\n"  # Diff syntax highlighting
-                        ta_new_field += "\n".join(ta_diffed[0])
-                    ta_new_field += "\n```"
-                    # Add field to embed
-                    embed_ta_change.add_field(
-                        name="🍑 New",
-                        value=ta_new_field,
-                        inline=True  # Split view comparison
-                    )
-
-                    # Display number of changes
-                    embed_ta_change.set_footer(text=f"🍑 {len(ta_deltas[0])} additions, {len(ta_deltas[1])} removals")
-
-                    # If there is TA change, send the announcement
-                    if ta_deltas != ([], []):
-                        # Wrapped to handle API issues
-                        try:
-                            await channels.get(key[0: 4], channels['other']).send(embed=embed_ta_change, view=view_new)
-                            await send_to_subscribers(bot, key, embed_ta_change, view_new)
-                        except:
-                            pass
-                        changed = True
-
-                    # 🫐 Remarks changed!
-                    # Initialize list of values
-                    remarks_list_new = value2[9].split("\n")
-                    remarks_list_old = old_quotas[key]['sections'][key2][9].split("\n")
-                    # Remove empty list elements, including special space characters
-                    # Remove "> " from the beginning of line too
-                    remarks_list_new = [r.strip("> ") for r in remarks_list_new if r not in ['', '\xa0', '\u00a0']]
-                    remarks_list_old = [r.strip("> ") for r in remarks_list_old if r not in ['', '\xa0', '\u00a0']]
-
-                    # Prepare change announcement text: Header, course name, section name, section ID
-                    embed_remarks_change = discord.Embed(
-                        title=f"{value.get('title', 'Error')}: {key2}",
-                        color=0x8aadf4  # Blue
-                    )
-                    # Prepare header of change announcement
-                    embed_remarks_change.set_author(name="🫐 Remarks changed!")
-
-                    # Check additions and removals
-                    remarks_deltas = list_diffs(remarks_list_new, remarks_list_old)
-                    remarks_diffed = diff_highlight(remarks_list_new, remarks_list_old)
-
-                    # Add old remarks field
-                    remarks_old_field = "```\n"  # Field text becomes "diff" if there is no content
-                    if remarks_diffed[1] != []:
-                        remarks_old_field = "```diff\n"  # Diff syntax highlighting
-                    remarks_old_field += "\n".join(remarks_diffed[1])
-                    remarks_old_field += "\n```"
-                    # Add field to embed
-                    embed_remarks_change.add_field(
-                        name="🫐 Old",
-                        value=remarks_old_field,
-                        inline=True  # Split view comparison
-                    )
-
-                    # Add new remarks field
-                    remarks_new_field = "```\n"  # Field text becomes "diff" if there is no content
-                    if remarks_diffed[0] != []:
-                        remarks_new_field = "```diff\n"  # Diff syntax highlighting
-                    remarks_new_field += "\n".join(remarks_diffed[0])
-                    remarks_new_field += "\n```"
-                    # Add field to embed
-                    embed_remarks_change.add_field(
-                        name="🫐 New",
-                        value=remarks_new_field,
-                        inline=True  # Split view comparison
-                    )
-
-                    # Display number of changes
-                    embed_remarks_change.set_footer(text=f"🫐 {len(remarks_deltas[0])} additions, {len(remarks_deltas[1])} removals")
-
-                    # If there is remarks change, send the announcement
-                    if remarks_deltas != ([], []):
-                        # Wrapped to handle API issues
-                        try:
-                            await channels.get(key[0: 4], channels['other']).send(embed=embed_remarks_change, view=view_new)
-                            await send_to_subscribers(bot, key, embed_remarks_change, view_new)
-                        except:
-                            pass
-                        changed = True
-
-    for key3, value3 in old_quotas.items():
-        # Skip "time" entry
-        if key3 == "time":
-            continue
-
-        # ☕ Course deleted!
-        if key3 not in new_quotas:
-            # await channels.get(key3[0: 4], channels['other']).send(f"☕ **Course deleted!**\n{value3.get('title', 'Error')}\n{len(value3['sections'])} sections")
-            # Prepare change announcement embed: course name
-            embed_delete_course = discord.Embed(
-                title=f"{value3.get('title', 'Error')}",
-                color=0xf4dbd6  # Rosewater
-            )
-            # Prepare header of change announcement
-            embed_delete_course.set_author(name="☕ Course deleted!")
-
-            # Display list of sections
-            delete_course_sections = "```\n"
-            delete_course_sections += "\n".join(list(value3['sections'].keys()))
-            delete_course_sections += "\n```"
-
-            # Add field
-            embed_delete_course.add_field(
-                name=f"☕ {len(value3['sections'])} sections",
-                value=delete_course_sections,
-                inline=False
-            )
+    # Queue the announcements of every channel, quota changes are sent before other changes
+    # Failed sends are retried by the dispatcher
+    channel_announcements = {}
+    for announcement in announcements:
+        channel = channels.get(announcement['course_code'][0: 4], channels['other'])
+        channel_announcements.setdefault(channel, []).append(announcement)
+    for channel, announcements_of_channel in channel_announcements.items():
+        for priority, embeds, view in pack_announcements(announcements_of_channel):
+            notify_dispatcher.post(priority, channel, embeds=embeds, view=view)
 
-            # Add link to source in original quota website
-            view_course_deleted = SubLinks()
-            add_source_url(view_course_deleted, key3[0:4], "l")  # key: Course code prefix
+    await send_to_subscribers(bot, announcements)
 
-            # Send the announcement
-            # Wrapped to handle API issues
-            try:
-                await channels.get(key3[0: 4], channels['other']).send(embed=embed_delete_course, view=view_course_deleted)
-                await send_to_subscribers(bot, key3, embed_delete_course, view_course_deleted)
-            except:
-                pass
-            changed = True
+    # Wait for all announcements to be sent
+    await notify_dispatcher.join()
+    save_strikes()
 
-        else:
-            # key4: Section code, class number
-            # value4: List containin schedule and quota
-            for key4, value4 in value3['sections'].items():
-                # 🍹 Section deleted!
-                if key4 not in new_quotas[key3]['sections']:
-                    # await channels.get(key3[0: 4], channels['other']).send(f"🍹 **Section deleted!**\n{value3.get('title', 'Error')}: {key4}")
-                    # Prepare change announcement embed: course name, section name
-                    embed_delete_section = discord.Embed(
-                        title=f"{value3.get('title', 'Error')}: {key4}",
-                        color=0xf5a97f  # Peach
-                    )
-                    # Prepare header of change announcement
-                    embed_delete_section.set_author(name="🍹 Section deleted!")
-
-                    # Display schedule of section
-                    # Format (pretty print) the schedule
-                    old_section_formatted_section = format_section(value4)
-
-                    # Section can have multiple fields due to string length
-                    # Using range for loop to get index of field
-                    for old_section_schedule_field_number in range(len(old_section_formatted_section)):
-                        # old_section_schedule_name: Schedule field name
-                        old_section_schedule_name = "🍹 Schedule"
-                        # Add (cont.) for sections occupying more than 1 field
-                        if old_section_schedule_field_number > 0:
-                            old_section_schedule_name += " (cont.)"
-                        
-                        # Add one field of a section
-                        embed_delete_section.add_field(
-                            name=old_section_schedule_name,
-                            value=old_section_formatted_section[old_section_schedule_field_number],
-                            inline=False
-                        )
-
-                    # Display quota of section: total
-                    delete_section_quotas = f"```\n{'Section':<8}| {'Quota':<6}{'Enrol':<6}{'Avail':<6}{'Wait':<6}\n"
-                    delete_section_quotas += f"{trim_section(key4):<8}| "
-                    for i in range(5, 9):
-                        delete_section_quotas += '{:<6}'.format(value4[i].split("\n", 1)[0])
-                    
-                    # Display quota of section: reserved
-                    quota_delete = value4[5].split("\n")
-                    delete_res_dict = {}
-                    if len(quota_delete) >= 3:
-                        # Dict to store dept names and numbers
-                        for i in range(2, len(quota_delete)):
-                            # Split dept name from numbers
-                            quota_delete_res = quota_delete[i].split(": ")
-                            delete_res_dict[quota_delete_res[0]] = quota_delete_res[1].split("/")
-                    
-                    for k, v in delete_res_dict.items():
-                        delete_section_quotas += f"\n{'> Res.':<8}| "
-                        # Quota/enrol/avail
-                        for i in range(3):
-                            delete_section_quotas += f"{v[i]:<6}"
-                        # Dept
-                        delete_section_quotas += f"For: {k}"
-
-                    delete_section_quotas += "\n```"
-                    
-                    # Add field
-                    embed_delete_section.add_field(
-                        name="🍹 Quota",
-                        value=delete_section_quotas,
-                        inline=False
-                    )
-
-                    # Add link to source in original quota website
-                    view_section_deleted = SubLinks()
-                    add_source_url(view_section_deleted, key3)  # key: Course code
-                    
-                    # Send the announcement
-                    # Wrapped to handle API issues
-                    try:
-                        await channels.get(key3[0: 4], channels['other']).send(embed=embed_delete_section, view=view_section_deleted)
-                        await send_to_subscribers(bot, key3, embed_delete_section, view_section_deleted)
-                    except:
-                        pass
-                    changed = True
-
-    return changed
+    return len(events) > 0
 
 async def download_quotas(bot, current_loop):
-    url = f"https://w5.ab.ust.hk/wcq/cgi-bin/{semester_code}/"
-    
+    # Crawl hasn't seen any change yet: a failed crawl isn't mistaken for the last one
+    quota_fetcher.last_crawl_changed = None
+
     try:
-        page = requests.get(url)
+        index_page = await quota_fetcher.fetch_index(semester_code)
 
-        soup = bs4.BeautifulSoup(page.content, "html.parser")
-    
-        letters = soup.select('.depts > #subjectItems > a')
+        letters = quota_parser.parse_subject_list(index_page)
     except Exception as error:  # Failed to connect to server!
         # Print exception to console
         traceback.print_exc()
@@ -2503,150 +1988,55 @@ async def download_quotas(bot, current_loop):
 
         return update_time()
 
-    quotas = {}
-
-    for letter in letters:
-        sub_url = f"https://w5.ab.ust.hk/wcq/cgi-bin/{semester_code}/subject/{letter.get_text()}"
-
-        try:
-            sub_page = requests.get(sub_url, timeout=10)
-        except Exception as e:  # Timed out!
-            # Print exception to console
-            traceback.print_exc()
-
-            # Send exception to errors channel
-            await send_loop_exception(current_loop, "Timed out!", e)
-            
-            return update_time()
-
-        sub_soup = bs4.BeautifulSoup(sub_page.content, "html.parser")
-
-        classes = sub_soup.select('#classes > .course')
-
-        for course in classes:
-            try:
-                course_dict = {}
-
-                course_title = course.select(".courseinfo > .courseattrContainer > .subject")[0].get_text()
-            
-                course_code = course.select(".courseanchor > a")[0]["name"]
-            except:
-                continue
-            
-            # No more course info im lazy
-            # Course info start
-            course_info = course.select(".courseinfo > .courseattr > .popupdetail > table")[0]
-            course_info_rows = course_info.select('tr')
+    # Fetch all subject pages at once, hand each page to the parser pool as soon as it arrives
+    # Subjects unchanged since the last crawl reuse their parsed courses
+    subject_parses = {}
+    unchanged_subjects = []
+    try:
+        async for letter, sub_page in quota_fetcher.fetch_subjects(semester_code, letters):
+            if sub_page is None:
+                unchanged_subjects.append(letter)
+                subject_parses[letter] = asyncio.get_running_loop().create_future()
+                subject_parses[letter].set_result(quota_fetcher.cached_courses(letter))
+            else:
+                subject_parses[letter] = quota_parser.parse_subject_page_in_pool(sub_page)
+    except Exception as e:  # Timed out!
+        # Print exception to console
+        traceback.print_exc()
 
-            info_dict = {}
+        # Send exception to errors channel
+        await send_loop_exception(current_loop, "Timed out!", e)
 
-            # Special course info: matching
-            matching_info = course.find("div", {"class": "matching"})
-            if matching_info is not None:
-                matching_info = matching_info.get_text()
-                info_dict["MATCHING"] = matching_info
+        # Don't leave parse results behind
+        for parse in subject_parses.values():
+            parse.cancel()
 
-            for row in course_info_rows:
-                try:
-                    heading = row.find('th')
-                    heading = heading.get_text(" ")
+        return update_time()
 
-                    data = row.select('td')[0]
-                    data = data.get_text("\n")
+    # Wait for all subjects to be parsed
+    # Quotas are incomplete if any subject failed: its courses would be announced as deleted
+    parsed_subjects = await asyncio.gather(*subject_parses.values(), return_exceptions=True)
+    parse_errors = {letter: result for letter, result in zip(subject_parses.keys(), parsed_subjects) if isinstance(result, BaseException)}
+    if parse_errors:  # Failed to parse!
+        # Print exceptions to console
+        for error in parse_errors.values():
+            traceback.print_exception(error)
 
-                    info_dict[heading] = data
-                except:
-                    continue
-            # Course info end
-            
-            # Sections (code, schedule, venue, instructor, TA, quota, remarks) start
-
-            section_dict = {}
-            course_sections = course.select(".sections")[0]
-            course_sections = course_sections.find_all("tr", ["newsect secteven", "newsect sectodd", "secteven", "sectodd", "newsect secteven mainRow", "secteven otherRow", "newsect sectodd mainRow", "sectodd otherRow"])
-
-            for idx, section in enumerate(course_sections):
-                # Append extra section times/instructor information to section entry (1/2)
-                if section['class'][0] in ["secteven", "sectodd", "secteven otherRow", "sectodd otherRow"]:
-                    continue
-
-                section_data = section.select("td")
-                section_cols = []
-                for idx3, col in enumerate(section_data):
-                    # Instructors and TAs
-                    if col.select('.instructorList') != []:  # Instructors
-                        inst_list = [inst.get_text() for inst in col.select('.instructorList > a')]
-                        if inst_list == []:  # If instructor is TBA
-                            inst_list = [ins.get_text() for ins in col.select('.instructorList')]
-                        section_cols.append("\n".join(inst_list))
-                    elif col.select('.taListContainer > .taList') != []:  # TAs
-                        ta_list = [ta.get_text() for ta in col.select('.taListContainer > .taList > a')]
-                        section_cols.append("\n".join(ta_list))
-                    # Remarks
-                    elif idx3 == 9:
-                        if col.get_text("\n") == "":
-                            section_cols.append("\u00a0")
-                        else:
-                            section_cols.append(
-                            col.get_text("\n")
-                            .replace("\n>> Show more", "")  # Exclude "show more" button from the website (1/2)
-                        )
-                    # The rest
-                    else:
-                        section_cols.append(
-                            col.get_text("\n")
-                            .replace("\n>> Show more", "")  # Exclude "show more" button from the website (1/2)
-                        )
-                
-                # Append extra section times/instructor information to section entry (2/2)
-                # try:
-                #     next_section = course_sections[idx + 1]
-                #     if next_section['class'] in ["secteven", "sectodd"]:
-                #         extra_data = next_section.select("td")
-
-                #         for idx2, datum in enumerate(extra_data):
-                #             section_cols[idx2 + 1] += f"\n{datum}"
-                # except IndexError:
-                #     pass
-                    
-                section_dict[section_cols[0]] = section_cols
+        # Send exception to errors channel
+        await send_loop_exception(current_loop, f"Failed to parse {', '.join(parse_errors)}!", next(iter(parse_errors.values())))
 
-                try:
-                    next = 1
-                    while course_sections[idx + next]['class'][0] in ["secteven", "sectodd", "secteven otherRow", "sectodd otherRow"]:
-                        next_section = course_sections[idx + next]
-                        if next_section['class'][0] in ["secteven", "sectodd", "secteven otherRow", "sectodd otherRow"]:
-                            extra_data = next_section.select("td")
-
-                            for idx2, datum in enumerate(extra_data):
-                                # Instructors and TAs
-                                if datum.select('.instructorList') != []:  # Instructors
-                                    inst_list = [inst.get_text() for inst in datum.select('.instructorList > a')]
-                                    if inst_list == []:  # If instructor is TBA
-                                        inst_list = [ins.get_text() for ins in datum.select('.instructorList')]
-                                    section_dict[section_cols[0]][idx2] += "\n\n\n" + "\n".join(inst_list)
-                                elif datum.select('.taListContainer > .taList') != []:  # TAs
-                                    ta_list = [ta.get_text() for ta in datum.select('.taListContainer > .taList > a')]
-                                    section_dict[section_cols[0]][idx2] += "\n\n\n" + "\n".join(ta_list)
-                                # TAs (empty)
-                                if idx2 == 4 and datum.get_text("\n") == "":
-                                    section_dict[section_cols[0]][idx2] += "\n\n\n"
-                                # The rest
-                                elif datum.get_text("\n") != "":
-                                    section_dict[section_cols[0]][idx2] += "\n\n\n" + datum.get_text("\n").replace("\n>> Show more", "")  # Exclude "show more" button from the website (2/2)
-                        
-                        next += 1
-                except IndexError:
-                    pass
-            
-            # Sections (code, schedule, venue, instructor, TA, quota, remarks) end
+        return update_time()
+    subject_quotas = dict(zip(subject_parses.keys(), parsed_subjects))
 
-            # Add data to dictionary for course
-            course_dict['title'] = course_title
-            course_dict['sections'] = section_dict
-            course_dict['info'] = info_dict
+    # Combine subjects in the order of the website
+    quotas = {}
+    for letter in letters:
+        quotas.update(subject_quotas.get(letter, {}))
 
-            quotas[course_code] = course_dict
+    # Courses of unchanged subjects don't need to be diffed
+    unchanged_courses = set()
+    for letter in unchanged_subjects:
+        unchanged_courses.update(subject_quotas[letter].keys())
     
     quotas['time'] = update_time()
     
@@ -2658,21 +2048,14 @@ async def download_quotas(bot, current_loop):
     # # Make old quotas file empty if quota file is corrupted
     # else:
     #     json.dump({}, oldfile, indent = 4)
+    old_save_error = None
     if current_loop == 0:
-        oldfile = open('quotas_old.json', 'w', encoding='utf-8')
-        try:
-            json.dump(quotas, oldfile, indent=4)
-        except:
-            json.dump({}, oldfile, indent=4)
+        old_save_error = save_quotas('quotas_old.json', quotas)
     else:
         try:
-            diff_found = await check_diffs(bot=bot, new_quotas=quotas, old_quotas=open_old_quotas())
+            diff_found = await check_diffs(bot=bot, new_quotas=quotas, old_quotas=open_old_quotas(), unchanged_courses=unchanged_courses)
             if diff_found == True:
-                oldfile = open('quotas_old.json', 'w', encoding='utf-8')
-                try:
-                    json.dump(quotas, oldfile, indent=4)
-                except:
-                    json.dump({}, oldfile, indent=4)
+                old_save_error = save_quotas('quotas_old.json', quotas)
         except Exception as e:  # Error when checking diffs!
             # Print exception to console
             traceback.print_exc()
@@ -2681,12 +2064,33 @@ async def download_quotas(bot, current_loop):
             await send_loop_exception(current_loop, "Diff check error!", e)
             
             return update_time()
+    if old_save_error is not None:  # Error when saving old quotas!
+        # Send exception to errors channel
+        await send_loop_exception(current_loop, "Failed to save old quotas!", old_save_error)
 
     # Save quotas to json file
-    outfile = open('quotas.json', 'w', encoding='utf-8')
-    try:
-        json.dump(quotas, outfile, indent = 4)
-    except:
-        json.dump({}, outfile, indent=4)
+    save_error = save_quotas('quotas.json', quotas)
+    if save_error is not None:  # Error when saving quotas!
+        # Send exception to errors channel
+        # Subjects are parsed again next time
+        await send_loop_exception(current_loop, "Failed to save quotas!", save_error)
+
+        return update_time()
+
+    # Record trends of changed sections
+    if config.trend_capture:
+        try:
+            capture_trends(quotas)
+        except Exception as e:  # Error when recording trends!
+            # Print exception to console
+            traceback.print_exc()
+
+            # Send exception to errors channel
+            await send_loop_exception(current_loop, "Trend capture error!", e)
+
+    # Crawl succeeded: skip unchanged subjects next time
+    # Unless old quotas weren't saved: courses of skipped subjects would not be diffed against the outdated file
+    if old_save_error is None:
+        quota_fetcher.commit_subject_cache(subject_quotas)
 
     return update_time() 
@@ -0,0 +1,119 @@
+# graph_cache.py
+# Rendered enrollment graphs (PNG bytes), kept in memory and on disk
+# A graph is keyed by (semester, course code, section, last trend loop): graphs change only when trends are updated
+# Graphs of older loops of a section are never shown again: they are dropped when a newer one is stored
+# Both caches have a size budget, least recently used graphs are evicted first
+import collections
+import os
+import re
+
+import config
+
+# Recently used graphs in memory: {key: PNG bytes}, least recently used first
+memory_cache = collections.OrderedDict()
+memory_size = 0
+
+# Graphs on disk: {filename: size}, least recently used first, None until the directory is scanned
+disk_files = None
+disk_size = 0
+
+# Filename of a graph: "{semester}_{course code}_{section}_{loop}.png"
+# Keys are made of letters and digits only, anything else is removed to keep "_" a separator
+def graph_filename(key):
+    return "_".join(re.sub(r"[^0-9A-Za-z]", "", str(k)) for k in key) + ".png"
+
+# Filename prefix of all graphs of a section
+def section_prefix(key):
+    return graph_filename(key[0: 3] + ("", ))[0: -len(".png")]
+
+# Scan the cache directory on first use, oldest access first
+def load_disk_files():
+    global disk_files, disk_size
+    if disk_files is not None:
+        return
+    disk_files = collections.OrderedDict()
+    disk_size = 0
+    try:
+        entries = [e for e in os.scandir(config.graph_cache_dir) if e.is_file() and e.name.endswith(".png")]
+    except FileNotFoundError:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries:
+        disk_files[entry.name] = entry.stat().st_size
+        disk_size += entry.stat().st_size
+
+def remove_disk_file(filename):
+    global disk_size
+    disk_size -= disk_files.pop(filename)
+    try:
+        os.remove(os.path.join(config.graph_cache_dir, filename))
+    except FileNotFoundError:
+        pass
+
+def remember(key, png):
+    global memory_size
+    if key in memory_cache:
+        memory_cache.move_to_end(key)
+        return
+    memory_cache[key] = png
+    memory_size += len(png)
+    while memory_size > config.graph_cache_memory and memory_cache:
+        memory_size -= len(memory_cache.popitem(last=False)[1])  # Least recently used
+
+# Get a rendered graph
+# Returns PNG bytes, None if the graph is not cached
+def get(key):
+    if key in memory_cache:
+        memory_cache.move_to_end(key)
+        return memory_cache[key]
+
+    if config.graph_cache_disk <= 0:
+        return None
+    load_disk_files()
+    filename = graph_filename(key)
+    if filename not in disk_files:
+        return None
+    path = os.path.join(config.graph_cache_dir, filename)
+    try:
+        with open(path, 'rb') as graph_file:
+            png = graph_file.read()
+        os.utime(path)  # Keep the order of use after a restart
+    except OSError:
+        remove_disk_file(filename)
+        return None
+    disk_files.move_to_end(filename)
+    remember(key, png)
+    return png
+
+# Store a rendered graph, replacing graphs of older loops of the section
+def put(key, png):
+    global memory_size, disk_size
+    for old_key in [k for k in memory_cache if k[0: 3] == key[0: 3] and k != key]:
+        memory_size -= len(memory_cache.pop(old_key))
+    remember(key, png)
+
+    if config.graph_cache_disk <= 0 or len(png) > config.graph_cache_disk:
+        return
+    load_disk_files()
+    filename = graph_filename(key)
+    prefix = section_prefix(key)
+    for old_filename in [f for f in disk_files if f.startswith(prefix) and f != filename]:
+        remove_disk_file(old_filename)
+
+    # Written to a temporary file and renamed: a half-written graph is never read
+    # The cache is optional: graphs are still sent if they can't be written
+    path = os.path.join(config.graph_cache_dir, filename)
+    try:
+        os.makedirs(config.graph_cache_dir, exist_ok=True)
+        with open(path + ".tmp", 'wb') as graph_file:
+            graph_file.write(png)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        return
+    if filename in disk_files:
+        disk_size -= disk_files.pop(filename)
+    disk_files[filename] = len(png)
+    disk_size += len(png)
+
+    while disk_size > config.graph_cache_disk:
+        remove_disk_file(next(iter(disk_files)))  # Least recently used
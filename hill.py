@@ -4,15 +4,17 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from tinydb import TinyDB, Query
-
 import os
 from dotenv import load_dotenv
 import typing
 import re
 from datetime import datetime
 
+import autocomplete_index
 import get_quota
+import search_index
+import subscriber_store
+import trend_store
 import plot_quota  # v3.0 features are hidden until hardware incompatibility is resolved! 1/3
 import config
 
@@ -65,13 +67,14 @@ async def on_guild_join(guild):
 # Slash commands start
 # Compose page flip buttons for all commands
 class QuotaPage(discord.ui.View):
-    def __init__(self, *, timeout=180, mode="q", course_code="", page=0, semester="", room=""):
+    def __init__(self, *, timeout=180, mode="q", course_code="", page=0, semester="", room="", time_range=None):
         super().__init__(timeout=timeout)
         self.mode = mode
         self.course_code = course_code
         self.page = page
         self.semester = semester
         self.room = room
+        self.time_range = time_range  # (weekday, begin, end) of free rooms
 
     @discord.ui.button(label="Previous page", style=discord.ButtonStyle.gray, emoji="⬅️")
     async def previous_button(self,interaction:discord.Interaction, button:discord.ui.Button):
@@ -87,6 +90,8 @@ class QuotaPage(discord.ui.View):
             embed_quota_pageflip = get_quota.compose_about(len(bot.guilds), self.page - 1)
         elif self.mode == "r":
             embed_quota_pageflip = get_quota.compose_room_schedule(self.room, self.page - 1)
+        elif self.mode == "f":
+            embed_quota_pageflip = get_quota.compose_free_rooms(*self.time_range, self.page - 1)
         
         if embed_quota_pageflip == "p0":
             await interaction.response.send_message("🚫 You're already at the first page!", ephemeral=True)
@@ -112,6 +117,8 @@ class QuotaPage(discord.ui.View):
             embed_quota_pageflip = get_quota.compose_about(len(bot.guilds), self.page + 1)
         elif self.mode == "r":
             embed_quota_pageflip = get_quota.compose_room_schedule(self.room, self.page + 1)
+        elif self.mode == "f":
+            embed_quota_pageflip = get_quota.compose_free_rooms(*self.time_range, self.page + 1)
 
         if embed_quota_pageflip == "pmax":
             await interaction.response.send_message("🚫 You're already at the last page!", ephemeral=True)
@@ -255,9 +262,6 @@ async def search(interaction: discord.Interaction, query: str, semester_name: ty
         await interaction.edit_original_response(content="⚠️ Invalid semester! Pick a semester from the autocomplete menu.")
         return
 
-    cc_areas = get_quota.get_cc_areas(semester)
-    instructors = get_quota.get_attribute_list(3, semester) + get_quota.get_attribute_list(4, semester)
-
     # Submit query to search function
     embed_list = get_quota.compose_list(query, semester=semester)
 
@@ -272,10 +276,9 @@ async def search(interaction: discord.Interaction, query: str, semester_name: ty
         # Add source button linking to course entry in original course quota website
         # Only add source URL for prefix and instructor searches
         if not semester:
-            if query in instructors:
-                get_quota.add_source_url(view, query, "i")
-            elif query not in cc_areas + instructors:
-                get_quota.add_source_url(view, query, "l")
+            query_type, query_courses = search_index.search_courses(query, semester)
+            if query_type in ["i", "l"]:
+                get_quota.add_source_url(view, query, query_type)
         await interaction.edit_original_response(embed=embed_list, view=view)
 
 # "graph" command (hidden until hardware incompatibility resolved! 2/3)
@@ -309,6 +312,9 @@ async def graph(interaction: discord.Interaction, course_code: str, section: str
     # Error: invalid section code
     elif embed_plot == "section_code":
         await interaction.edit_original_response(content="⚠️ Check your section code!")
+    # Error: no trends recorded for the section yet
+    elif embed_plot == "no_trends":
+        await interaction.edit_original_response(content="⚠️ No enrollment statistics are recorded for this section yet! Try again after the next update.")
     else:
         view = QuotaPage(mode="p", course_code=course_code)
         view.clear_items()
@@ -339,6 +345,41 @@ async def room_schedule(interaction: discord.Interaction, room: str) -> None:
         view = QuotaPage(mode="r", room=room)
         await interaction.edit_original_response(embed=embed_room_schedule, view=view)
 
+# "room free" command
+# Lists rooms without classes during a time range, longest free time first
+@room_group.command(name="free", description="Find rooms without classes right now or at a given time!")
+@app_commands.describe(start_time="Start of the time range in 24-hour format, e.g. 14:00. Leave empty for now!")
+@app_commands.describe(end_time="End of the time range in 24-hour format, e.g. 15:30. Leave empty for 1 hour after the start!")
+@app_commands.describe(weekday="Day of the week. Leave empty for today!")
+@app_commands.choices(weekday=[app_commands.Choice(name=day, value=i) for i, day in enumerate(get_quota.full_weekday_list)])
+async def room_free(interaction: discord.Interaction, start_time: typing.Optional[str], end_time: typing.Optional[str], weekday: typing.Optional[app_commands.Choice[int]]) -> None:
+    await interaction.response.defer(thinking=True)
+
+    now = datetime.now()
+    weekday = now.weekday() if weekday is None else weekday.value
+    begin = now.hour * 60 + now.minute if not start_time else get_quota.minutes_from_input(start_time)
+    if end_time:
+        end = get_quota.minutes_from_input(end_time)
+    elif begin is not None:
+        end = min(begin + 60, 24 * 60)  # Time range ends at midnight
+    else:
+        end = None
+
+    embed_free_rooms = "time" if begin is None or end is None else get_quota.compose_free_rooms(weekday, begin, end)
+
+    # Error: Course data unavailable
+    if embed_free_rooms == "unavailable":
+        await interaction.edit_original_response(embed=get_quota.embed_quota_unavailable)
+    # Error: invalid time range
+    elif embed_free_rooms == "time":
+        await interaction.edit_original_response(content="⚠️ Check your time range! Use 24-hour format like 14:00, and end after the start.")
+    # Every room has class
+    elif embed_free_rooms == "no_rooms":
+        await interaction.edit_original_response(content="ℹ️ No rooms are free during this time!")
+    else:
+        view = QuotaPage(mode="f", time_range=(weekday, begin, end))
+        await interaction.edit_original_response(embed=embed_free_rooms, view=view)
+
 # "room" command group end
 bot.tree.add_command(room_group)
 
@@ -472,18 +513,13 @@ async def section_param_autocomplete(
     interaction: discord.Interaction,
     current: str
 ) -> typing.List[app_commands.Choice[str]]:
-    trend_db = TinyDB(f'tabtrend{get_quota.semester_code}.json', indent=4)  # Get database on demand to prevent outdated data
-    data = []  # Return empty list if inputted course code doesn't match anything
     course_input = interaction.namespace.course_code  # Get current value in course_code field
 
-    if course_input in trend_db.tables():  # Prevent creation of tables
-        course_table = trend_db.table(course_input, cache_size=0)
-        all_sections = course_table.all()
-        all_sections = get_quota.get_field_data("section_code", all_sections)  # Extract section code
-        all_sections = list(dict.fromkeys(all_sections))  # Remove duplicates
-        data = [app_commands.Choice(name=section, value=section)
-                for section in all_sections if current.replace(" ", "").upper() in section.upper()
-                ][0: 25]
+    # Empty list if inputted course code doesn't match anything
+    all_sections = trend_store.get_section_codes(get_quota.semester_code, course_input or "")
+    data = [app_commands.Choice(name=section, value=section)
+            for section in all_sections if current.replace(" ", "").upper() in section.upper()
+            ][0: 25]
     
     return data
 
@@ -495,17 +531,10 @@ async def history_course_code_autocomplete(
     interaction: discord.Interaction,
     current: str
 ) -> typing.List[app_commands.Choice[str]]:
-    semester_list = get_quota.find_historical_data()
-
-    courses = []
-    for s in semester_list:  # Get previous semesters
-        courses += get_quota.get_course_list(s)
-    courses += get_quota.get_course_list()  # Get current semester
-    courses = sorted(list(dict.fromkeys(courses)))  # Remove duplicates
+    # Course codes of previous semesters + current semester, sorted
+    courses = autocomplete_index.match_course_codes(current, 25)
 
-    data = [app_commands.Choice(name=course, value=course)
-            for course in courses if current.replace(" ", "").upper() in course.upper()
-            ][0: 25]
+    data = [app_commands.Choice(name=course, value=course) for course in courses]
     
     return data
 
@@ -522,13 +551,11 @@ async def history_semester_string_autocomplete(
 
     # Filter available semesters using the input query (course code or search query)
     if interaction.namespace.course_code:
-        semester_list = [s for s in semester_list if interaction.namespace.course_code in get_quota.get_course_list(s)]
+        code_semesters = autocomplete_index.find_term_semesters(autocomplete_index.course_code_index, interaction.namespace.course_code)
+        semester_list = [s for s in semester_list if s in code_semesters]
     elif interaction.namespace.query:
-        semester_list = [s for s in semester_list if interaction.namespace.query in 
-                           get_quota.get_prefix_list(s) 
-                         + get_quota.get_attribute_list(3, s) 
-                         + get_quota.get_attribute_list(4, s) 
-                         + get_quota.get_cc_areas(s)]
+        query_semesters = autocomplete_index.find_term_semesters(autocomplete_index.search_query_index, interaction.namespace.query)
+        semester_list = [s for s in semester_list if s in query_semesters]
     else:
         semester_list = []
 
@@ -563,9 +590,8 @@ async def unsub_autocomplete(
     current: str
 ) -> typing.List[app_commands.Choice[str]]:
     # Get subscription list of current user
-    subs, entry = get_quota.find_sub(interaction.user.id)
-    courses = entry['courses']
-    courses.append("All courses") # Add option to unsub from all courses
+    entry = get_quota.find_sub(interaction.user.id)
+    courses = entry['courses'] + ["All courses"]  # Add option to unsub from all courses
     # Turn them into command autocomplete options
     data = [app_commands.Choice(name=course, value=course)
     for course in courses if current.replace(" ", "").upper() in course.upper()
@@ -599,20 +625,10 @@ async def history_query_autocomplete(
     interaction: discord.Interaction,
     current: str
 ) -> typing.List[app_commands.Choice[str]]:
-    semester_list = get_quota.find_historical_data()
-    semester_list.append("")  # Include current semester
+    # Queries of previous semesters + current semester, queries starting with the input first
+    queries = autocomplete_index.match_search_queries(current, 25)
 
-    queries = []
-    for s in semester_list:  # Previous semesters + current semester
-        queries.extend(get_quota.get_prefix_list(s))
-        queries.extend(get_quota.get_attribute_list(3, s) + get_quota.get_attribute_list(4, s))
-        queries.extend(get_quota.get_cc_areas(s))
-    queries = list(dict.fromkeys(queries))  # Remove duplicates
-
-    data = [
-        app_commands.Choice(name=query, value=query)
-        for query in queries if current.replace(" ", "").upper() in query.replace(" ", "").upper()
-    ][0: 25]
+    data = [app_commands.Choice(name=query, value=query) for query in queries]
     return data
 
 # Autocomplete for `room` of "room schedule" command
@@ -661,12 +677,24 @@ async def debug(interaction: discord.Interaction, file: str) -> None:
     
     # Send quotas file scraped by the bot
     else:
-        # Send trends file
+        # Export trends database in the old trends file format
+        # Not named like a trends file: trends files are imported into the database on startup
         if file == "tabtrend":
-            file = f"{file}{get_quota.semester_code}"
+            file = f"{file}{get_quota.semester_code}_export"
+            trend_store.export_json(get_quota.semester_code, f"{file}.json")
+        # Export subscribers database in the old subscribers file format
+        elif file == "subscribers":
+            subscriber_store.export_json("subscribers.json")
         await interaction.edit_original_response(content=f"🎏 Quotas file: `{file}.json`")
         await interaction.channel.send(file=discord.File(f"{file}.json"))
 
+        # Delete the exported trends file
+        if file.endswith("_export"):
+            try:
+                os.remove(f"{file}.json")
+            except:
+                pass
+
 @debug.autocomplete('file')
 async def debug_autocomplete(
     interaction: discord.Interaction,
@@ -0,0 +1,149 @@
+# notify_dispatcher.py
+# Sends channel posts and DMs concurrently, most important changes first
+# discord.py waits out rate limits of every route, the dispatcher keeps sends to one route in order
+# and limits how many sends are in flight so the global rate limit is not hit
+# Workers only take routes with nothing in flight: a burst to one route doesn't hold up the others
+import asyncio
+import collections
+import itertools
+import traceback
+
+import discord
+
+import config
+
+# Priorities of diff_engine event kinds, smaller is sent first
+priorities = {
+    "quota": 0,
+    "new_section": 1,
+    "section_deleted": 1,
+    "new_course": 2,
+    "course_deleted": 2,
+    "time": 2,
+    "venue": 2,
+    "instructor": 3,
+    "ta": 3,
+    "remarks": 3,
+    "title": 4,
+    "info_new": 4,
+    "info_changed": 4,
+    "info_removed": 4
+}
+default_priority = 4
+
+# Jobs of every route with unsent jobs, in the order they were queued: {route: deque of jobs}
+# A route is in the dict from its first queued job until its last job is sent or dropped
+routes = {}
+# Routes whose first job can be sent now: (priority, sequence number of the first job, route)
+# A route is in this queue at most once and never while its first job is being sent or waits for a retry,
+# so a route never occupies more than one worker and its jobs are sent one by one in order
+ready = None
+sequence = itertools.count()
+workers = []
+# Tasks waiting to make routes with failed sends ready again
+retry_tasks = set()
+
+# Number of jobs not sent or dropped yet, and event set when it is 0
+unfinished = 0
+all_done = None
+
+# Start the workers in the running event loop, if they are not running yet
+def start_workers():
+    global ready, all_done
+    if ready is None:
+        ready = asyncio.PriorityQueue()
+        all_done = asyncio.Event()
+        all_done.set()
+    workers[: ] = [w for w in workers if not w.done()]
+    while len(workers) < config.dispatch_workers:
+        workers.append(asyncio.create_task(worker()))
+
+# Queue a send
+# route: channel or user the message is sent to
+# send: coroutine function doing the send
+# on_forbidden: called if Discord refused the send, e.g. user blocked DMs
+def dispatch(priority, route, send, on_forbidden=None):
+    global unfinished
+    start_workers()
+    job = {"priority": priority, "number": next(sequence), "send": send, "on_forbidden": on_forbidden, "attempts": 0}
+    unfinished += 1
+    all_done.clear()
+    if route not in routes:  # Nothing queued for the route: it is ready
+        routes[route] = collections.deque()
+        ready.put_nowait((priority, job["number"], route))
+    routes[route].append(job)
+
+# Queue a channel post
+def post(priority, channel, **message):
+    dispatch(priority, ("channel", channel.id), lambda: channel.send(**message))
+
+# Queue a DM
+# on_forbidden: called if the DM was blocked
+def direct_message(priority, bot, user_id, on_forbidden=None, **message):
+    async def send():
+        user = bot.get_user(user_id)
+        if user is None:  # If user not in member cache
+            user = await bot.fetch_user(user_id)
+        await user.send(**message)
+
+    dispatch(priority, ("user", user_id), send, on_forbidden)
+
+# Send the first job of a ready route
+async def worker():
+    while True:
+        priority, number, route = await ready.get()
+        job = routes[route][0]
+        try:
+            await job["send"]()
+        except discord.errors.Forbidden:  # Don't retry sends Discord refused
+            if job["on_forbidden"] is not None:
+                job["on_forbidden"]()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            job["attempts"] += 1
+            if job["attempts"] <= config.dispatch_retries:
+                # Send failed sends again after a delay instead of dropping them
+                # The job stays first in its route: later jobs of the route wait for it
+                task = asyncio.create_task(retry_later(route, job))
+                retry_tasks.add(task)
+                task.add_done_callback(retry_tasks.discard)
+                continue
+            print(f"Dropped message to {route} after {job['attempts']} attempts")
+            traceback.print_exc()
+        finish_job(route)
+
+# Remove the first job of a route, the route is ready again if it has more jobs
+def finish_job(route):
+    global unfinished
+    jobs = routes[route]
+    jobs.popleft()
+    if jobs:
+        ready.put_nowait((jobs[0]["priority"], jobs[0]["number"], route))
+    else:
+        del routes[route]
+    unfinished -= 1
+    if unfinished == 0:
+        all_done.set()
+
+# Make the route of a failed send ready again after a delay, doubled after every attempt
+async def retry_later(route, job):
+    await asyncio.sleep(config.dispatch_retry_delay * 2 ** (job["attempts"] - 1))
+    ready.put_nowait((job["priority"], job["number"], route))
+
+# Wait until all queued sends are done or dropped
+async def join():
+    if all_done is not None:
+        await all_done.wait()
+
+# Stop the workers when the bot shuts down
+# Unsent messages are dropped
+def stop_workers():
+    global ready, unfinished, all_done
+    for task in workers + list(retry_tasks):
+        task.cancel()
+    workers.clear()
+    routes.clear()
+    ready = None
+    unfinished = 0
+    all_done = None
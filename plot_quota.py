@@ -1,13 +1,10 @@
 # import pymongo
-from tinydb import TinyDB, Query
 import discord
 
 import io
-import base64
+import collections
 import datetime
 from zoneinfo import ZoneInfo
-import os
-import re
 
 import mplcatppuccin
 from mplcatppuccin.palette import load_color
@@ -17,6 +14,8 @@ import numpy as np
 
 import config
 import get_quota
+import graph_cache
+import trend_store
 
 # Configure plot theme
 plt.style.use(["ggplot", "latte"])
@@ -38,6 +37,50 @@ axis_line_color = load_color("latte", "text")
 # Get default fig size to enlarge for reserved quota subplots
 figsize = plt.rcParams.get('figure.figsize')
 
+# Data points of a section's graph
+# time: datetime64 array
+# totals: quota/enrol/avail/wait arrays, shape (4, points)
+# depts: reserved departments, in the order they first appear
+# reserved: quota/enrol/avail arrays of every department, shape (depts, 3, points), 0 when the department has no reserved quota
+Series = collections.namedtuple("Series", ["time", "totals", "depts", "reserved"])
+
+# Build the data points of a section's graph from its snapshots (oldest first, see trend_store.get_section_snapshots)
+# loop_times: {loop: time} of loops before the snapshots, see trend_store.get_loop_times
+# update_time, update_loop: last update of the trends, the graph is extended to it
+def build_series(section_snapshots, loop_times, update_time, update_loop):
+    loops = np.array([s["loop"] for s in section_snapshots], dtype=np.int64)
+    times = np.array([s["time"] for s in section_snapshots], dtype=np.int64)
+    depts = list(dict.fromkeys(r[0] for s in section_snapshots for r in s["reserved"]))
+    dept_index = {dept: i for i, dept in enumerate(depts)}
+
+    # One row per snapshot: quota/enrol/avail/wait, then quota/enrol/avail of every department
+    values = np.zeros((len(section_snapshots), 4 + 3 * len(depts)), dtype=np.int64)
+    values[:, 0: 4] = [s["total"] for s in section_snapshots]
+    reserved = np.array(
+        [(i, dept_index[r[0]], *r[1: 4]) for i, s in enumerate(section_snapshots) for r in s["reserved"]],
+        dtype=np.int64
+    ).reshape(-1, 5)
+    values[reserved[:, 0: 1], 4 + 3 * reserved[:, 1: 2] + np.arange(3)] = reserved[:, 2: 5]
+
+    # Step before every change recorded after unchanged loops: values stayed the same until the loop before the change
+    # Loops recorded without a time were 1 trendsetter interval apart
+    steps = np.flatnonzero(np.diff(loops) > 1) + 1
+    step_times = [loop_times.get(loop - 1, time - get_quota.trendsetter_interval) for loop, time in zip(loops[steps].tolist(), times[steps].tolist())]
+    times = np.insert(times, steps, step_times)
+    values = np.insert(values, steps, values[steps - 1], axis=0)
+
+    # Extend to the last update if no change was recorded at that time
+    if len(loops) > 0 and loops[-1] < update_loop:
+        times = np.append(times, update_time)
+        values = np.append(values, values[-1: ], axis=0)
+
+    return Series(
+        times.astype("datetime64[s]"),
+        values[:, 0: 4].T,
+        depts,
+        values[:, 4: ].reshape(len(times), len(depts), 3).transpose(1, 2, 0)
+    )
+
 def compose_plot(course_code: str, section: str, page=0, sem=""):
     if sem == "":
         sem = get_quota.semester_code
@@ -48,79 +91,22 @@ def compose_plot(course_code: str, section: str, page=0, sem=""):
     # return fig
 
     # Find all snapshots of specified section
-    # course_col = get_quota.trend_db[course_code]
-    trend_db = TinyDB(f'tabtrend{sem}.json', indent=4)  # Get database on demand to prevent outdated data
-    course_col = trend_db.table(course_code, cache_size=0)
-    section_query = { "section_code": section }
-    # section_snapshots = list(course_col.find(section_query, sort=[('time', 1)]))
-    section_snapshots = sorted(course_col.search(Query().fragment(section_query)), key=lambda k: k['time'])
-
-    # Add intermediate data points at 1 interval before recorded change if needed
-    for i in section_snapshots:
-        i_idx = section_snapshots.index(i)
-        if section_snapshots[i_idx]["loop"] - section_snapshots[i_idx - 1]["loop"] > 1:
-            section_snapshots.insert(
-                i_idx,
-                {
-                    "section_code": section,
-                    "class_nbr": section_snapshots[i_idx]["class_nbr"],
-                    "time": section_snapshots[i_idx]["time"] - get_quota.trend_snapshot_interval,
-                    "loop": section_snapshots[i_idx]["loop"] - 1,
-                    "total": section_snapshots[i_idx - 1]["total"],  # Should have the same quotas as the last snapshot before recorded change
-                    "reserved": section_snapshots[i_idx - 1]["reserved"]
-                }
-            )
-    
-    # Set latest data point at last update time if no change recorded at that time
-    if section_snapshots[-1]["loop"] < get_quota.get_trend_update_time(True):
-        section_snapshots.append(
-            {
-                "section_code": section,
-                "class_nbr": section_snapshots[-1]["class_nbr"],
-                "time": get_quota.get_trend_update_time(sem=sem),
-                "loop": get_quota.get_trend_update_time(True, sem=sem),
-                "total": section_snapshots[-1]["total"],  # Should have the same quotas as the last snapshot before recorded change
-                "reserved": section_snapshots[-1]["reserved"]
-            }
-        )
+    section_snapshots = trend_store.get_section_snapshots(sem, course_code, section)
+    loop_times = trend_store.get_loop_times(sem, [s["loop"] - 1 for s in section_snapshots])
+    series = build_series(
+        section_snapshots, loop_times,
+        get_quota.get_trend_update_time(sem=sem), get_quota.get_trend_update_time(True, sem=sem)
+    )
 
     # (Total) Format data into lines
-    time_xpoints = np.array([get_quota.time_from_stamp(d.get('time', 0)) for d in section_snapshots])
-    total_quota_ypoints = np.array([d.get('total', [0, 0, 0, 0])[0] for d in section_snapshots])
-    total_enrol_ypoints = np.array([d.get('total', [0, 0, 0, 0])[1] for d in section_snapshots])
-    total_avail_ypoints = np.array([d.get('total', [0, 0, 0, 0])[2] for d in section_snapshots])
-    total_wait_ypoints = np.array([0 - d.get('total', [0, 0, 0, 0])[3] for d in section_snapshots])  # Display waitlist in negative Y axis
+    time_xpoints = series.time
+    total_quota_ypoints, total_enrol_ypoints, total_avail_ypoints, total_wait_ypoints = series.totals
+    total_wait_ypoints = 0 - total_wait_ypoints  # Display waitlist in negative Y axis
     total_wait_ypoints_ma = np.ma.masked_where(total_wait_ypoints >= 0, total_wait_ypoints)  # Don't display waitlist line when waitlist is 0
 
-    # (Reserved) Format data into lines
-    # Find list of reserved departments
-    reserved_depts_list = []
-    for snapshot in section_snapshots:
-        reserved_quotas = snapshot.get("reserved", [])
-        if reserved_quotas == []:
-            continue
-        else:
-            for quota in reserved_quotas:
-                try:
-                    reserved_depts_list.append(quota[0])
-                    reserved_depts_list = list(set(reserved_depts_list))  # Remove duplicates
-                except KeyError:
-                    continue
-
-    # Get snapshots of reserved quotas for each department
-    reserved_depts_dict = {}
-    for dept in reserved_depts_list:
-        # Prepare array for dept
-        reserved_depts_dict[dept] = np.empty((0, 3))
-        # Look through all snapshots to find reserved quota for dept
-        for snapshot in section_snapshots:
-            snapshot_reserved_list = snapshot.get("reserved", [])
-            snapshot_reserved_quota_of_dept = [i[1: 4] for i in snapshot_reserved_list if i[0] == dept]
-            if len(snapshot_reserved_quota_of_dept) <= 0:
-                snapshot_reserved_quota_of_dept = [[0, 0, 0]]
-            reserved_depts_dict[dept] = np.append(reserved_depts_dict[dept], snapshot_reserved_quota_of_dept, 0)
-        # Store all snapshots of quota/enrol/avail in each row
-        reserved_depts_dict[dept] = np.transpose(reserved_depts_dict[dept])
+    # (Reserved) Snapshots of quota/enrol/avail of each department in each row
+    reserved_depts_list = series.depts
+    reserved_depts_dict = dict(zip(series.depts, series.reserved))
 
     # Create subplots for total and reserved quotas
     fig, axes = plt.subplots(len(reserved_depts_list) + 1, figsize=(figsize[0], figsize[1] * (len(reserved_depts_list) + 1)))
@@ -177,9 +163,9 @@ def compose_plot(course_code: str, section: str, page=0, sem=""):
 
     # Highlight the x-axis
     # Total
-    ax.plot(time_xpoints, np.zeros_like(time_xpoints), color=axis_line_color)
+    ax.plot(time_xpoints, np.zeros(len(time_xpoints)), color=axis_line_color)
     # Reserved
-    [rax.plot(time_xpoints, np.zeros_like(time_xpoints), color=axis_line_color) for rax in res_axes]
+    [rax.plot(time_xpoints, np.zeros(len(time_xpoints)), color=axis_line_color) for rax in res_axes]
 
     # Rotate x-axis labels for date and time display
     fig.autofmt_xdate()
@@ -206,6 +192,17 @@ def compose_plot(course_code: str, section: str, page=0, sem=""):
     # Finish
     return fig
 
+# Render the graph of a section as PNG bytes
+# The figure is closed after rendering: pyplot keeps every open figure alive
+def render_plot(course_code: str, section: str, sem=""):
+    section_plot_fig = compose_plot(course_code, section, sem=sem)
+    try:
+        section_plot_bytes = io.BytesIO()
+        section_plot_fig.savefig(section_plot_bytes, format='png')
+    finally:
+        plt.close(section_plot_fig)
+    return section_plot_bytes.getvalue()
+
 def compose_embed_with_plot(course_code: str, section: str, page=0, sem=""):
     # Placeholder course code and section code
     # course_title = "COMP 4521 - Mobile Application Development (3 units)"
@@ -238,6 +235,12 @@ def compose_embed_with_plot(course_code: str, section: str, page=0, sem=""):
     # Get the full section code from the input
     section_name = list(course_dict["sections"].keys())[section_idx]
 
+    # Check if the section has trends: sections added since the last trend update have none
+    # Loop of its latest snapshot also keys the rendered graph (see below)
+    section_loop = trend_store.get_section_loop(sem or get_quota.semester_code, course_code, section)
+    if section_loop is None:
+        return "no_trends", None
+
     # Use alternate color and heading for historical semesters
     graph_color = config.color_success if sem == "" else config.color_history
     graph_heading = "🍊 Enrollment graph of"
@@ -255,15 +258,17 @@ def compose_embed_with_plot(course_code: str, section: str, page=0, sem=""):
     embed_plot.set_author(name=graph_heading)
     embed_plot.set_footer(text="🕒 Last updated")
 
-    # Plot the section's statistics
-    section_plot_fig = compose_plot(course_code, section, sem=sem)
-    section_plot_stringIObytes = io.BytesIO()
+    # Plot the section's statistics, or reuse the graph rendered since the section's trend last changed
+    # Keyed on the section's own latest snapshot: trends are updated every loop, most sections don't change
+    # A reused graph ends at the update it was rendered after, the section was unchanged since
+    graph_key = (sem or get_quota.semester_code, course_code, section, section_loop)
+    section_plot_png = graph_cache.get(graph_key)
+    if section_plot_png is None:
+        section_plot_png = render_plot(course_code, section, sem=sem)
+        graph_cache.put(graph_key, section_plot_png)
 
     # Export image of plot to discord
-    section_plot_fig.savefig(section_plot_stringIObytes, format='png')
-    section_plot_stringIObytes.seek(0)
-    section_plot_png_data = base64.b64encode(section_plot_stringIObytes.read()).decode()
-    section_plot_image_file = discord.File(io.BytesIO(base64.b64decode(section_plot_png_data)), filename="section_plot.png")
+    section_plot_image_file = discord.File(io.BytesIO(section_plot_png), filename="section_plot.png")
     embed_plot.set_image(url="attachment://section_plot.png")
 
     return embed_plot, section_plot_image_file
@@ -308,9 +313,4 @@ def find_historical_trends() -> list[str]:
         List of semesters sorted in descending chronological order.
     """
 
-    semester_list = os.listdir()
-    history_files_regex = re.compile("tabtrend\d{4}\.json")
-    semester_list = list(filter(history_files_regex.match, semester_list))
-    semester_list = [s[8: 12] for s in semester_list]
-
-    return sorted(semester_list, reverse=True)
\ No newline at end of file
+    return trend_store.list_semesters()
\ No newline at end of file
@@ -0,0 +1,140 @@
+# quota_fetcher.py
+# Async crawler for the Class Schedule & Quota website
+import asyncio
+import hashlib
+
+import aiohttp
+
+import config
+
+# Root URL of the Class Schedule & Quota website
+base_url = "https://w5.ab.ust.hk/wcq/cgi-bin/"
+
+# Validators, body hash and parsed courses of every subject page in the last successful crawl
+# {subject: {"etag": str, "last_modified": str, "hash": str, "courses": dict}}
+subject_cache = {}
+# Validators and hashes of the crawl in progress, moved to subject_cache by commit_subject_cache()
+pending_subject_cache = {}
+# If any subject changed in the last crawl
+# None if the last crawl failed or there was no earlier crawl to compare with, reset at the start of every crawl
+last_crawl_changed = None
+
+# Keep-alive session shared by every crawl
+# Created on demand because it must be created inside the running event loop
+session = None
+
+# Get the pooled session, (re)create it if it doesn't exist or is closed
+def get_session():
+    global session
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=config.fetch_connection_limit,
+            limit_per_host=config.fetch_concurrency  # Don't hammer the quota website
+        )
+        session = aiohttp.ClientSession(connector=connector)
+    return session
+
+# Close the pooled session when the bot shuts down
+async def close_session():
+    global session
+    if session is not None and not session.closed:
+        await session.close()
+    session = None
+
+# Fetch a page
+# validators: ETag and Last-Modified of the last fetch, sent as a conditional request
+# Returns (body, validators), body is None if the page is not modified
+# Retry with exponential backoff on network errors, timeouts and server errors
+# Raises the last error if all retries failed
+async def fetch_page(url, retries=None, validators=None):
+    if retries is None:
+        retries = config.fetch_retries
+    # Timeout applies to each attempt, not to the time spent waiting for a free connection
+    timeout = aiohttp.ClientTimeout(total=config.fetch_timeout)
+
+    # Conditional request headers
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    for attempt in range(retries + 1):
+        try:
+            async with get_session().get(url, timeout=timeout, headers=headers) as response:
+                new_validators = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified")
+                }
+                if response.status == 304:  # Not modified
+                    return None, validators
+                response.raise_for_status()
+                return await response.read(), new_validators
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt >= retries:
+                raise
+            await asyncio.sleep(config.fetch_backoff * 2 ** attempt)
+
+# Fetch the index page of a semester
+async def fetch_index(semester):
+    body, validators = await fetch_page(f"{base_url}{semester}/")
+    return body
+
+# Fetch all subject pages of a semester concurrently
+# Yields (subject, body) in the order the pages arrive
+# body is None if the subject is unchanged since the last successful crawl: use cached_courses() instead
+# Pending requests are cancelled if the caller stops early or a request fails
+async def fetch_subjects(semester, subjects):
+    # Limit requests in flight so queued requests don't eat into their own timeout
+    limiter = asyncio.Semaphore(config.fetch_concurrency)
+
+    async def fetch_subject(subject):
+        async with limiter:
+            cached = subject_cache.get(subject, {})
+            cached_validators = {"etag": cached.get("etag"), "last_modified": cached.get("last_modified")}
+            body, validators = await fetch_page(f"{base_url}{semester}/subject/{subject}", validators=cached_validators)
+            return subject, body, validators
+
+    pending_subject_cache.clear()
+    tasks = [asyncio.create_task(fetch_subject(s)) for s in subjects]
+    try:
+        for next_page in asyncio.as_completed(tasks):
+            subject, body, validators = await next_page
+            cached = subject_cache.get(subject)
+
+            # Not modified: reuse the hash of the last crawl
+            if body is None:
+                pending_subject_cache[subject] = {**validators, "hash": cached["hash"]}
+                yield subject, None
+                continue
+
+            # Modified or unconditional response: compare contents
+            body_hash = hashlib.sha1(body).hexdigest()
+            pending_subject_cache[subject] = {**validators, "hash": body_hash}
+            if cached is not None and cached["hash"] == body_hash:
+                yield subject, None
+            else:
+                yield subject, body
+    finally:
+        for task in tasks:
+            task.cancel()
+
+# Get courses of a subject parsed in the last successful crawl
+def cached_courses(subject):
+    return subject_cache[subject]["courses"]
+
+# Remember validators, hashes and parsed courses of a successful crawl
+# subject_quotas: {subject: courses dict} of all subjects in the crawl
+def commit_subject_cache(subject_quotas):
+    global last_crawl_changed
+    old_hashes = {k: v["hash"] for k, v in subject_cache.items()}
+    new_hashes = {k: v["hash"] for k, v in pending_subject_cache.items() if k in subject_quotas}
+    # Nothing to compare with on the first crawl after a start
+    last_crawl_changed = (old_hashes != new_hashes) if subject_cache else None
+
+    subject_cache.clear()
+    for subject, courses in subject_quotas.items():
+        if subject in pending_subject_cache:
+            subject_cache[subject] = {**pending_subject_cache[subject], "courses": courses}
+    pending_subject_cache.clear()
@@ -0,0 +1,234 @@
+# quota_parser.py
+# Turns pages of the Class Schedule & Quota website into course dicts
+import asyncio
+import concurrent.futures
+import multiprocessing
+
+import bs4
+
+import config
+import section_model
+
+# Faster parser backend, optional
+try:
+    import quota_parser_lxml
+except ImportError:
+    quota_parser_lxml = None
+
+# Worker processes parsing subject pages, off the bot's event loop
+parser_pool = None
+
+# Get the parser pool, create it on first use
+# Returns None if parsing should stay in the bot's process
+def get_parser_pool():
+    global parser_pool
+    if config.parser_workers <= 0:
+        return None
+    if parser_pool is None:
+        # Workers are spawned, not forked: forking the bot's process while its threads hold locks can deadlock the workers
+        # Spawned workers import the bot script again: it must only start the bot under `if __name__ == "__main__"`
+        parser_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=config.parser_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return parser_pool
+
+# Stop the worker processes when the bot shuts down
+def shutdown_parser_pool():
+    global parser_pool
+    if parser_pool is not None:
+        parser_pool.shutdown(cancel_futures=True)
+    parser_pool = None
+
+# Drop a broken parser pool (a worker died), a new one is created on next use
+def reset_parser_pool(pool):
+    global parser_pool
+    if parser_pool is pool:
+        parser_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+async def parse_in_pool(pool, content):
+    try:
+        courses, sections = await asyncio.get_running_loop().run_in_executor(pool, parse_subject_page_sections, content)
+    except concurrent.futures.process.BrokenProcessPool:
+        reset_parser_pool(pool)
+        raise
+    # Sections come back parsed: the diff and trend capture don't parse them again
+    for course_code, course in courses.items():
+        section_model.set_sections(course, sections[course_code])
+    return courses
+
+# Parse one subject page and all of its sections, in a parser worker
+# Returns (course dict as parse_subject_page(), {course code: {section code: Section}})
+# Section records are slotted: they are sent back to the bot's process in less space than the section lists
+def parse_subject_page_sections(content):
+    courses = parse_subject_page(content)
+    return courses, {course_code: section_model.parse_sections(course) for course_code, course in courses.items()}
+
+# Parse one subject page in the parser pool
+# Returns a future of the same course dict as parse_subject_page(), or of the parsing error
+def parse_subject_page_in_pool(content):
+    pool = get_parser_pool()
+    if pool is None:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            future.set_result(parse_subject_page(content))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+    return asyncio.ensure_future(parse_in_pool(pool, content))
+
+# Get list of subject prefixes from the index page of a semester
+def parse_subject_list(content):
+    soup = bs4.BeautifulSoup(content, "html.parser")
+    letters = soup.select('.depts > #subjectItems > a')
+    return [letter.get_text() for letter in letters]
+
+# Parse one subject page into a dict of courses with the backend chosen in config
+# Falls back to bs4 if the chosen backend is not installed
+# Returns {course_code: {'title': str, 'sections': dict, 'info': dict}}
+def parse_subject_page(content):
+    return parser_backends.get(config.parser_backend, parse_subject_page_bs4)(content)
+
+# Parse the subject pages with all installed backends
+# Returns list of (backend, course code) where a backend disagrees with bs4, for checking a backend against saved pages
+def compare_parser_backends(content):
+    reference = parse_subject_page_bs4(content)
+    mismatches = []
+    for backend, parse in parser_backends.items():
+        result = parse(content)
+        for course_code in dict.fromkeys(list(reference) + list(result)):
+            if reference.get(course_code) != result.get(course_code):
+                mismatches.append((backend, course_code))
+    return mismatches
+
+# Reference backend: BeautifulSoup with html.parser
+# Parse one subject page into a dict of courses
+def parse_subject_page_bs4(content):
+    sub_soup = bs4.BeautifulSoup(content, "html.parser")
+
+    classes = sub_soup.select('#classes > .course')
+
+    quotas = {}
+
+    for course in classes:
+        try:
+            course_dict = {}
+
+            course_title = course.select(".courseinfo > .courseattrContainer > .subject")[0].get_text()
+
+            course_code = course.select(".courseanchor > a")[0]["name"]
+        except:
+            continue
+
+        # No more course info im lazy
+        # Course info start
+        course_info = course.select(".courseinfo > .courseattr > .popupdetail > table")[0]
+        course_info_rows = course_info.select('tr')
+
+        info_dict = {}
+
+        # Special course info: matching
+        matching_info = course.find("div", {"class": "matching"})
+        if matching_info is not None:
+            matching_info = matching_info.get_text()
+            info_dict["MATCHING"] = matching_info
+
+        for row in course_info_rows:
+            try:
+                heading = row.find('th')
+                heading = heading.get_text(" ")
+
+                data = row.select('td')[0]
+                data = data.get_text("\n")
+
+                info_dict[heading] = data
+            except:
+                continue
+        # Course info end
+
+        # Sections (code, schedule, venue, instructor, TA, quota, remarks) start
+
+        section_dict = {}
+        course_sections = course.select(".sections")[0]
+        course_sections = course_sections.find_all("tr", ["newsect secteven", "newsect sectodd", "secteven", "sectodd", "newsect secteven mainRow", "secteven otherRow", "newsect sectodd mainRow", "sectodd otherRow"])
+
+        for idx, section in enumerate(course_sections):
+            # Append extra section times/instructor information to section entry (1/2)
+            if section['class'][0] in ["secteven", "sectodd", "secteven otherRow", "sectodd otherRow"]:
+                continue
+
+            section_data = section.select("td")
+            section_cols = []
+            for idx3, col in enumerate(section_data):
+                # Instructors and TAs
+                if col.select('.instructorList') != []:  # Instructors
+                    inst_list = [inst.get_text() for inst in col.select('.instructorList > a')]
+                    if inst_list == []:  # If instructor is TBA
+                        inst_list = [ins.get_text() for ins in col.select('.instructorList')]
+                    section_cols.append("\n".join(inst_list))
+                elif col.select('.taListContainer > .taList') != []:  # TAs
+                    ta_list = [ta.get_text() for ta in col.select('.taListContainer > .taList > a')]
+                    section_cols.append("\n".join(ta_list))
+                # Remarks
+                elif idx3 == 9:
+                    if col.get_text("\n") == "":
+                        section_cols.append("\u00a0")
+                    else:
+                        section_cols.append(
+                        col.get_text("\n")
+                        .replace("\n>> Show more", "")  # Exclude "show more" button from the website (1/2)
+                    )
+                # The rest
+                else:
+                    section_cols.append(
+                        col.get_text("\n")
+                        .replace("\n>> Show more", "")  # Exclude "show more" button from the website (1/2)
+                    )
+
+            section_dict[section_cols[0]] = section_cols
+
+            # Append extra section times/instructor information to section entry (2/2)
+            try:
+                next = 1
+                while course_sections[idx + next]['class'][0] in ["secteven", "sectodd", "secteven otherRow", "sectodd otherRow"]:
+                    next_section = course_sections[idx + next]
+                    if next_section['class'][0] in ["secteven", "sectodd", "secteven otherRow", "sectodd otherRow"]:
+                        extra_data = next_section.select("td")
+
+                        for idx2, datum in enumerate(extra_data):
+                            # Instructors and TAs
+                            if datum.select('.instructorList') != []:  # Instructors
+                                inst_list = [inst.get_text() for inst in datum.select('.instructorList > a')]
+                                if inst_list == []:  # If instructor is TBA
+                                    inst_list = [ins.get_text() for ins in datum.select('.instructorList')]
+                                section_dict[section_cols[0]][idx2] += "\n\n\n" + "\n".join(inst_list)
+                            elif datum.select('.taListContainer > .taList') != []:  # TAs
+                                ta_list = [ta.get_text() for ta in datum.select('.taListContainer > .taList > a')]
+                                section_dict[section_cols[0]][idx2] += "\n\n\n" + "\n".join(ta_list)
+                            # TAs (empty)
+                            if idx2 == 4 and datum.get_text("\n") == "":
+                                section_dict[section_cols[0]][idx2] += "\n\n\n"
+                            # The rest
+                            elif datum.get_text("\n") != "":
+                                section_dict[section_cols[0]][idx2] += "\n\n\n" + datum.get_text("\n").replace("\n>> Show more", "")  # Exclude "show more" button from the website (2/2)
+
+                    next += 1
+            except IndexError:
+                pass
+
+        # Sections (code, schedule, venue, instructor, TA, quota, remarks) end
+
+        # Add data to dictionary for course
+        course_dict['title'] = course_title
+        course_dict['sections'] = section_dict
+        course_dict['info'] = info_dict
+
+        quotas[course_code] = course_dict
+
+    return quotas
+
+# Available parser backends, selected by config.parser_backend
+parser_backends = {"bs4": parse_subject_page_bs4}
+if quota_parser_lxml is not None:
+    parser_backends["lxml"] = quota_parser_lxml.parse_subject_page
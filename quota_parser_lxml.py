@@ -0,0 +1,146 @@
+# quota_parser_lxml.py
+# lxml backend of quota_parser, must produce the same course dicts as the bs4 backend
+import lxml.etree
+import lxml.html
+
+# Rows of the sections table which continue the section above them
+continuation_classes = ["secteven", "sectodd", "secteven otherRow", "sectodd otherRow"]
+
+# XPath condition matching an element having a class
+def has_class(class_name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+# Precompiled queries mirroring the CSS selectors of the bs4 backend
+find_courses = lxml.etree.XPath(f"//*[@id='classes']/*[{has_class('course')}]")
+find_course_title = lxml.etree.XPath(f".//*[{has_class('courseinfo')}]/*[{has_class('courseattrContainer')}]/*[{has_class('subject')}]")
+find_course_anchor = lxml.etree.XPath(f".//*[{has_class('courseanchor')}]/a")
+find_course_info = lxml.etree.XPath(f".//*[{has_class('courseinfo')}]/*[{has_class('courseattr')}]/*[{has_class('popupdetail')}]/table")
+find_matching = lxml.etree.XPath(f".//div[{has_class('matching')}]")
+find_sections = lxml.etree.XPath(f".//*[{has_class('sections')}]")
+find_section_rows = lxml.etree.XPath(f".//tr[{has_class('secteven')} or {has_class('sectodd')}]")
+find_rows = lxml.etree.XPath(".//tr")
+find_th = lxml.etree.XPath(".//th")
+find_td = lxml.etree.XPath(".//td")
+find_instructor_list = lxml.etree.XPath(f".//*[{has_class('instructorList')}]")
+find_instructors = lxml.etree.XPath(f".//*[{has_class('instructorList')}]/a")
+find_ta_list = lxml.etree.XPath(f".//*[{has_class('taListContainer')}]/*[{has_class('taList')}]")
+find_tas = lxml.etree.XPath(f".//*[{has_class('taListContainer')}]/*[{has_class('taList')}]/a")
+# bs4 leaves out the contents of scripts and stylesheets in get_text()
+find_text = lxml.etree.XPath(".//text()[not(ancestor::script) and not(ancestor::style)]", smart_strings=False)
+
+# Equivalent of bs4's Tag.get_text(separator)
+def get_text(element, separator=""):
+    return separator.join(find_text(element))
+
+# First class of an element, like bs4's tag['class'][0]
+def first_class(element):
+    return element.get("class", "").split()[0]
+
+# Decode the page the same way bs4 does for pages declared or guessed as UTF-8
+def decode_page(content):
+    if isinstance(content, str):
+        return content
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode("windows-1252", errors="replace")
+
+# Get the text of an instructor cell
+def get_instructors(col):
+    inst_list = [get_text(inst) for inst in find_instructors(col)]
+    if inst_list == []:  # If instructor is TBA
+        inst_list = [get_text(ins) for ins in find_instructor_list(col)]
+    return "\n".join(inst_list)
+
+# Get the text of a TA cell
+def get_tas(col):
+    return "\n".join([get_text(ta) for ta in find_tas(col)])
+
+# Parse one subject page into a dict of courses
+# Returns {course_code: {'title': str, 'sections': dict, 'info': dict}}
+def parse_subject_page(content):
+    root = lxml.html.document_fromstring(decode_page(content))
+
+    quotas = {}
+
+    for course in find_courses(root):
+        try:
+            course_title = get_text(find_course_title(course)[0])
+
+            course_code = find_course_anchor(course)[0].attrib["name"]
+        except:
+            continue
+
+        # Course info start
+        info_dict = {}
+
+        # Special course info: matching
+        matching_info = find_matching(course)
+        if matching_info:
+            info_dict["MATCHING"] = get_text(matching_info[0])
+
+        for row in find_rows(find_course_info(course)[0]):
+            heading = find_th(row)
+            data = find_td(row)
+            if not heading or not data:
+                continue
+            info_dict[get_text(heading[0], " ")] = get_text(data[0], "\n")
+        # Course info end
+
+        # Sections (code, schedule, venue, instructor, TA, quota, remarks) start
+        section_dict = {}
+        course_sections = find_section_rows(find_sections(course)[0])
+
+        for idx, section in enumerate(course_sections):
+            # Append extra section times/instructor information to section entry (1/2)
+            if first_class(section) in continuation_classes:
+                continue
+
+            section_cols = []
+            for idx3, col in enumerate(find_td(section)):
+                # Instructors and TAs
+                if find_instructor_list(col):
+                    section_cols.append(get_instructors(col))
+                elif find_ta_list(col):
+                    section_cols.append(get_tas(col))
+                # Remarks
+                elif idx3 == 9 and get_text(col, "\n") == "":
+                    section_cols.append("\u00a0")
+                # The rest
+                else:
+                    section_cols.append(get_text(col, "\n").replace("\n>> Show more", ""))
+
+            section_dict[section_cols[0]] = section_cols
+
+            # Append extra section times/instructor information to section entry (2/2)
+            # A row with more columns than the section stops the merging, like the bs4 backend
+            try:
+                next = idx + 1
+                while next < len(course_sections) and first_class(course_sections[next]) in continuation_classes:
+                    for idx2, datum in enumerate(find_td(course_sections[next])):
+                        # Instructors and TAs
+                        if find_instructor_list(datum):
+                            section_cols[idx2] += "\n\n\n" + get_instructors(datum)
+                        elif find_ta_list(datum):
+                            section_cols[idx2] += "\n\n\n" + get_tas(datum)
+                        datum_text = get_text(datum, "\n")
+                        # TAs (empty)
+                        if idx2 == 4 and datum_text == "":
+                            section_cols[idx2] += "\n\n\n"
+                        # The rest
+                        elif datum_text != "":
+                            section_cols[idx2] += "\n\n\n" + datum_text.replace("\n>> Show more", "")
+
+                    next += 1
+            except IndexError:
+                pass
+        # Sections (code, schedule, venue, instructor, TA, quota, remarks) end
+
+        # Add data to dictionary for course
+        quotas[course_code] = {
+            'title': course_title,
+            'sections': section_dict,
+            'info': info_dict
+        }
+
+    return quotas
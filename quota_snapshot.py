@@ -0,0 +1,149 @@
+# quota_snapshot.py
+# Compact binary copy of a quotas file, written next to it (quotas.json -> quotas.snap)
+# Courses are stored as separate orjson blobs behind an index of offsets,
+# so a reader only decodes the courses it looks at
+#
+# Layout:
+#   magic (8 bytes) | index length (8 bytes, little endian) | index | course blobs
+#   index: orjson {"time": int, "courses": {course_code: [offset, length]}, "source": [mtime_ns, size]}
+#   offsets are relative to the first blob, source is the version of the quotas file the snapshot was written after
+#
+# Convert existing quotas files and compare their size and load time:
+#   python quota_snapshot.py quotas.json quotas2310.json
+import collections.abc
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import orjson
+
+magic = b"TABSNAP1"
+header = struct.Struct("<8sQ")
+
+# Get filename of the snapshot of a quotas file
+def snapshot_filename(filename):
+    return os.path.splitext(filename)[0] + ".snap"
+
+# Encode quotas into snapshot bytes
+# source: [mtime_ns, size] of the quotas file holding the same quotas
+def encode_snapshot(quotas, source=None):
+    blobs = []
+    offsets = {}
+    position = 0
+    for course_code, course in quotas.items():
+        if course_code == 'time':
+            continue
+        blob = orjson.dumps(course)
+        offsets[course_code] = [position, len(blob)]
+        blobs.append(blob)
+        position += len(blob)
+
+    index = orjson.dumps({"time": quotas.get('time'), "courses": offsets, "source": source})
+    return header.pack(magic, len(index)) + index + b"".join(blobs)
+
+# Read-only quotas dict backed by a snapshot file
+# Courses are decoded on first access and kept
+class LazyQuotas(collections.abc.Mapping):
+    def __init__(self, buffer):
+        file_magic, index_length = header.unpack_from(buffer, 0)
+        if file_magic != magic:
+            raise ValueError("Not a quotas snapshot")
+        index = orjson.loads(buffer[header.size: header.size + index_length])
+
+        self.buffer = buffer
+        self.blobs_start = header.size + index_length
+        self.offsets = index['courses']
+        self.time = index['time']
+        self.source = index.get('source')
+        self.decoded = {}
+
+    def __getitem__(self, key):
+        if key == 'time' and self.time is not None:
+            return self.time
+        course = self.decoded.get(key)
+        if course is None:
+            offset, length = self.offsets[key]  # Raises KeyError for unknown courses
+            start = self.blobs_start + offset
+            course = orjson.loads(self.buffer[start: start + length])
+            self.decoded[key] = course
+        return course
+
+    def __contains__(self, key):
+        return key in self.offsets or (key == 'time' and self.time is not None)
+
+    # Courses in the order of the quotas file, then "time" like the JSON file
+    def __iter__(self):
+        yield from self.offsets
+        if self.time is not None:
+            yield 'time'
+
+    def __len__(self):
+        return len(self.offsets) + (self.time is not None)
+
+    # Compare sizes first: comparing with {} shouldn't decode every course
+    def __eq__(self, other):
+        if isinstance(other, collections.abc.Mapping) and len(self) != len(other):
+            return False
+        return super().__eq__(other)
+
+    __hash__ = None
+
+# Write the snapshot of a quotas file, after the quotas file is written
+# The version of the quotas file is stored: the snapshot is only read while the quotas file is the same
+# Written to a temporary file and renamed like the quotas file
+def write_snapshot(filename, quotas):
+    snapshot = snapshot_filename(filename)
+    temp_path = snapshot + ".tmp"
+    stat = os.stat(filename)
+    data = encode_snapshot(quotas, [stat.st_mtime_ns, stat.st_size])  # Encoding errors leave no file behind
+    try:
+        with open(temp_path, 'wb') as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, snapshot)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+# Open the snapshot of a quotas file
+# The file is memory-mapped: it stays readable after being replaced by a newer snapshot
+# Read at once on Windows, where a mapped file can't be replaced
+def open_snapshot(filename):
+    with open(snapshot_filename(filename), 'rb') as snapshot_file:
+        if os.name == "nt":
+            buffer = snapshot_file.read()
+        else:
+            buffer = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return LazyQuotas(buffer)
+
+# Convert quotas files and print size and load time of both formats
+def main(filenames):
+    for filename in filenames:
+        with open(filename, encoding='utf-8') as quotas_file:
+            quotas = json.load(quotas_file)
+        write_snapshot(filename, quotas)
+        course_code = next(k for k in quotas if k != 'time')
+
+        start = time.perf_counter()
+        with open(filename, encoding='utf-8') as quotas_file:
+            json.load(quotas_file)[course_code]
+        json_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        open_snapshot(filename)[course_code]
+        snapshot_time = time.perf_counter() - start
+
+        json_size = os.path.getsize(filename)
+        snapshot_size = os.path.getsize(snapshot_filename(filename))
+        print(f"{filename}: {json_size} -> {snapshot_size} bytes ({snapshot_size / json_size:.0%}), "
+              f"one course: {json_time * 1000:.1f} -> {snapshot_time * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main(sys.argv[1: ])
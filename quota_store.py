@@ -0,0 +1,134 @@
+# quota_store.py
+# Process-wide cache of quotas files
+# Every file is parsed once and kept in memory until it is modified on disk
+# Quotas files are saved as JSON and as a compact snapshot (see quota_snapshot)
+import os
+import json
+import tempfile
+import traceback
+import types
+
+import quota_snapshot
+
+# Change working directory to wherever this is in
+abspath = os.path.abspath(__file__)
+dname = os.path.dirname(abspath)
+os.chdir(dname)
+
+# {filename: (file versions, quotas)}
+loaded_quotas = {}
+
+# Get (mtime, size) of a file, None if it doesn't exist
+def get_file_version(filename):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Get contents of a quotas file
+# Returns a read-only view of the quotas dict, shared by all callers
+# Course dicts inside the view are shared too: don't edit them
+# Returns False if the file is missing or corrupted
+# The binary snapshot is read instead of the JSON file if it was written after this version of the JSON file:
+# courses are only decoded when used
+def load_quotas(filename):
+    json_version = get_file_version(filename)
+    snapshot_version = get_file_version(quota_snapshot.snapshot_filename(filename))
+    if json_version is None and snapshot_version is None:
+        loaded_quotas.pop(filename, None)
+        return False
+
+    # File is reloaded when it is modified (or replaced) on disk
+    file_version = (json_version, snapshot_version)
+    cached = loaded_quotas.get(filename)
+    if cached is not None and cached[0] == file_version:
+        return cached[1]
+
+    quotas = False  # Also cached: don't parse a corrupted file again until it changes
+    # Snapshot stores the version of the JSON file it was written after, mtimes alone can tie
+    if snapshot_version is not None:
+        try:
+            quotas = quota_snapshot.open_snapshot(filename)
+        except:
+            pass
+        if quotas is not False and json_version is not None and quotas.source != list(json_version):
+            quotas = False  # Outdated
+    if quotas is False and json_version is not None:
+        try:
+            with open(filename, encoding='utf-8') as quotas_file:
+                quotas = json.load(quotas_file)
+            quotas = types.MappingProxyType(quotas)  # Callers must not edit the shared dict
+        except:
+            pass
+
+    loaded_quotas[filename] = (file_version, quotas)
+    return quotas
+
+# Write a quotas file atomically
+# Written to a temporary file, flushed to disk and renamed over the old file:
+# readers see either the old or the new file, never a half-written one
+# Raises if the JSON file couldn't be written
+# Returns the error if only the snapshot couldn't be written, None if both are saved
+def save_quotas(filename, quotas):
+    directory = os.path.dirname(os.path.abspath(filename))
+    temp_fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(filename)}.", suffix=".tmp")
+    try:
+        with os.fdopen(temp_fd, 'w', encoding='utf-8') as temp_file:
+            json.dump(quotas, temp_file, indent=4)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.chmod(temp_path, 0o644)  # mkstemp only allows the owner to read
+        os.replace(temp_path, filename)
+    except BaseException:  # Also clean up when interrupted
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    # Make the rename itself survive a crash (not supported on Windows)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+    # Compact snapshot for readers, written last so it is never older than the JSON file
+    # The JSON file is already saved: a failed snapshot is removed and readers fall back to the JSON file
+    snapshot_error = None
+    try:
+        quota_snapshot.write_snapshot(filename, quotas)
+    except (OSError, TypeError) as error:  # orjson.JSONEncodeError is a TypeError
+        traceback.print_exc()
+        snapshot_error = error
+        try:
+            os.remove(quota_snapshot.snapshot_filename(filename))
+        except OSError:
+            pass
+
+    # Readers in this process get the saved quotas without parsing the file again
+    file_version = (get_file_version(filename), get_file_version(quota_snapshot.snapshot_filename(filename)))
+    loaded_quotas[filename] = (file_version, types.MappingProxyType(quotas))
+    return snapshot_error
+
+# {filename: {name: (quotas, derived data)}}
+derived_data = {}
+
+# Get data derived from a quotas file, e.g. search indexes
+# build(quotas) is only called again when the file is reloaded
+# Returns None if the file is missing or corrupted
+def load_derived(filename, name, build):
+    quotas = load_quotas(filename)
+    if quotas is False:
+        return None
+
+    file_derived = derived_data.setdefault(filename, {})
+    cached = file_derived.get(name)
+    if cached is None or cached[0] is not quotas:
+        cached = (quotas, build(quotas))
+        file_derived[name] = cached
+    return cached[1]
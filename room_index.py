@@ -0,0 +1,173 @@
+# room_index.py
+# Occupancy index of rooms, built once per quotas file
+# Meeting times are parsed once: room schedules, "is this room free" checks and free room searches are binary searches
+import bisect
+import collections
+import itertools
+from datetime import datetime
+
+import quota_store
+import section_model
+
+weekday_list = ["Mo", "Tu", "We", "Th", "Fr", "Sa", "Su"]
+
+# Minutes in a day, end of the last possible class
+day_minutes = 24 * 60
+
+# One class in a room
+# start, end: minutes from midnight
+# date_begin, date_end: dates the class is held between, None if it is held every week
+# time: time row of the section, e.g. "01-FEB-2024 - 10-MAR-2024\nMoWe 09:00AM - 10:20AM"
+Booking = collections.namedtuple("Booking", ["start", "end", "date_begin", "date_end", "course_code", "title", "section", "time"])
+
+# Classes of a room on one weekday, sorted by start time
+# starts: start time of every booking, for binary search
+# max_ends: latest end time of bookings[0: i + 1]: no booking before i + 1 ends after max_ends[i]
+RoomDay = collections.namedtuple("RoomDay", ["bookings", "starts", "max_ends"])
+
+# Convert Class Schedule & Quota format time to minutes from midnight
+def minutes_from_website_format(time_string):
+    parsed = datetime.strptime(time_string, "%I:%M%p")
+    return parsed.hour * 60 + parsed.minute
+
+# Format minutes from midnight as HH:MM
+def format_minutes(minutes):
+    return f"{minutes // 60:02}:{minutes % 60:02}"
+
+# Parse a time row of a section
+# Returns (weekday numbers, start, end, date_begin, date_end)
+# Raises ValueError or IndexError if the row is not in the format of the website
+def parse_meeting_time(time_row):
+    time_lines = time_row.split("\n")
+
+    # Date range (optional) on the first line
+    date_begin = date_end = None
+    if len(time_lines) > 1:
+        dates = time_lines[0].split(" ")
+        date_begin = datetime.strptime(dates[0], "%d-%b-%Y").date()
+        date_end = datetime.strptime(dates[2], "%d-%b-%Y").date()
+
+    # Weekdays and time on the last line, e.g. "MoWe 09:00AM - 10:20AM"
+    weekdays, begin, separator, end = time_lines[-1].split(" ")[0: 4]
+    weekdays = [weekday_list.index(d) for d in [weekdays[i: i + 2] for i in range(0, len(weekdays), 2)] if d in weekday_list]
+    return weekdays, minutes_from_website_format(begin), minutes_from_website_format(end), date_begin, date_end
+
+# Sort bookings of a room on one weekday into a RoomDay
+def new_room_day(bookings):
+    bookings = sorted(bookings, key=lambda b: b.start)  # Stable: classes starting together stay in course order
+    return RoomDay(bookings, [b.start for b in bookings], list(itertools.accumulate([b.end for b in bookings], max)))
+
+# Build the occupancy index from a quotas dict
+# Returns {"rooms": {room: None} of every venue, "days": {room: {weekday number: RoomDay}}}
+def build_room_index(quotas):
+    rooms = {}
+    bookings = collections.defaultdict(lambda: collections.defaultdict(list))
+
+    for course_code, course in quotas.items():
+        # Skip update time entry
+        if course_code == 'time':
+            continue
+
+        for section_code, section in section_model.get_sections(course).items():
+            for meeting in section.meetings:
+                venues = [v for v in meeting.venue.split("\n") if v != ""]
+                rooms.update(dict.fromkeys(venues))
+
+                # Ignore TBA time
+                if meeting.time == "TBA":
+                    continue
+                try:
+                    weekdays, start, end, date_begin, date_end = parse_meeting_time(meeting.time)
+                except (ValueError, IndexError):
+                    continue
+
+                booking = Booking(
+                    start, end, date_begin, date_end,
+                    course_code[0: 4] + " " + course_code[4: ], course['title'], section_code, meeting.time
+                )
+                for venue in venues:
+                    for weekday in weekdays:
+                        bookings[venue][weekday].append(booking)
+
+    rooms.pop("TBA", None)  # TBA is not a room
+    days = {
+        room: {weekday: new_room_day(day_bookings) for weekday, day_bookings in room_bookings.items()}
+        for room, room_bookings in bookings.items()
+    }
+    return {"rooms": rooms, "days": days}
+
+# Get the occupancy index of a semester
+# Returns None if the quotas file is unavailable
+def get_room_index(semester=""):
+    return quota_store.load_derived(f'quotas{semester}.json', "rooms", build_room_index)
+
+# Check if a class is held on a date
+def is_held_on(booking, day):
+    return booking.date_begin is None or booking.date_begin <= day <= booking.date_end
+
+# Find classes of a RoomDay on a date overlapping minutes [begin, end)
+# Returns list of Booking sorted by start time
+def find_overlapping(room_day, day, begin=0, end=day_minutes):
+    found = []
+    # Only bookings starting before the end can overlap, walk back while any of them ends after the beginning
+    i = bisect.bisect_left(room_day.starts, end) - 1
+    while i >= 0 and room_day.max_ends[i] > begin:
+        booking = room_day.bookings[i]
+        if booking.end > begin and is_held_on(booking, day):
+            found.append(booking)
+        i -= 1
+    found.reverse()
+    return found
+
+# Get classes in a room on a date, optionally only the ones overlapping minutes [begin, end)
+# Returns list of Booking sorted by start time, None if the quotas file is unavailable
+def get_room_bookings(room, day, begin=0, end=day_minutes, semester=""):
+    index = get_room_index(semester)
+    if index is None:
+        return None
+    room_day = index["days"].get(room, {}).get(day.weekday())
+    if room_day is None:
+        return []
+    return find_overlapping(room_day, day, begin, end)
+
+# Get the free time around minutes [begin, end) of a RoomDay on a date
+# Returns (free from, free until) in minutes, None if a class overlaps the time range
+def find_free_stretch(room_day, day, begin, end):
+    if room_day is None:  # No classes on this weekday
+        return 0, day_minutes
+    if find_overlapping(room_day, day, begin, end):
+        return None
+
+    # Free from the end of the last class before the time range
+    free_from = 0
+    i = bisect.bisect_left(room_day.starts, begin) - 1
+    while i >= 0 and room_day.max_ends[i] > free_from:
+        booking = room_day.bookings[i]
+        if is_held_on(booking, day):
+            free_from = max(free_from, booking.end)
+        i -= 1
+
+    # Until the start of the next class
+    free_until = day_minutes
+    for booking in room_day.bookings[bisect.bisect_left(room_day.starts, end): ]:
+        if is_held_on(booking, day):
+            free_until = booking.start
+            break
+
+    return free_from, free_until
+
+# Find rooms without classes during minutes [begin, end) on a date
+# Returns list of (room, free from, free until), longest free time first, None if the quotas file is unavailable
+def find_free_rooms(day, begin, end, semester=""):
+    index = get_room_index(semester)
+    if index is None:
+        return None
+
+    free_rooms = []
+    for room in index["rooms"]:
+        stretch = find_free_stretch(index["days"].get(room, {}).get(day.weekday()), day, begin, end)
+        if stretch is not None:
+            free_rooms.append((room, *stretch))
+
+    free_rooms.sort(key=lambda r: r[1] - r[2])  # Stable: rooms with the same free time stay in the order of the website
+    return free_rooms
@@ -0,0 +1,63 @@
+# search_index.py
+# Indexes for /search, built once per version of a quotas file
+import quota_store
+
+# Build lists of search queries and the courses matching them
+# Course codes of every query are sorted when the index is built, the order of the website isn't relied on
+def build_search_index(quotas):
+    prefixes = {}  # Course code prefix: course codes
+    instructors = {}  # Instructor or TA name: course codes
+    attributes = {}  # Course attributes: course codes
+
+    for course_code, course in quotas.items():
+        # Skip update time entry
+        if course_code == "time":
+            continue
+
+        prefixes.setdefault(course_code[0: 4], []).append(course_code)  # All prefixes are 4 letters long
+
+        # Instructors and TAs
+        for section in course['sections'].values():
+            for name in section[3].split("\n") + section[4].split("\n"):
+                if name == "":
+                    continue
+                instructors.setdefault(name, set()).add(course_code)  # Remove duplicates
+
+        if 'ATTRIBUTES' in course['info']:
+            attributes[course_code] = course['info']['ATTRIBUTES']
+
+    # List of common core areas
+    cc_areas = [a for text in attributes.values() for a in text.split("\n")]
+    cc_areas = list(dict.fromkeys(cc_areas))  # Remove duplicates
+    cc_areas = [a for a in cc_areas if "Common Core" in a]  # Remove non CC attributes
+
+    # Courses of common core areas: area can appear anywhere in the attributes
+    cc_area_courses = {area: [k for k, v in attributes.items() if area in v] for area in cc_areas}
+
+    return {
+        "prefixes": {k: sorted(v) for k, v in prefixes.items()},
+        "cc_areas": {k: sorted(v) for k, v in cc_area_courses.items()},
+        "instructors": {k: sorted(v) for k, v in instructors.items()}
+    }
+
+# Get search indexes of a semester
+# Returns None if the quotas file is unavailable
+def get_search_index(semester=""):
+    return quota_store.load_derived(f'quotas{semester}.json', "search", build_search_index)
+
+# Find courses matching a search query
+# Query is tried as a common core area, then an instructor, then a course code prefix
+# Returns (query type, list of course codes)
+# Query types: "c" for common core area, "i" for instructor, "l" for prefix, None if nothing matches
+def search_courses(query, semester=""):
+    search_index = get_search_index(semester)
+    if search_index is None:
+        return None, []
+
+    if query in search_index["cc_areas"]:
+        return "c", search_index["cc_areas"][query]
+    elif query in search_index["instructors"]:
+        return "i", search_index["instructors"][query]
+    elif query in search_index["prefixes"]:
+        return "l", search_index["prefixes"][query]
+    return None, []
@@ -0,0 +1,105 @@
+# section_model.py
+# Parsed sections of a course
+# Sections are stored as lists of 10 newline-joined strings (see quota_parser):
+#   0 code, 1 time, 2 venue, 3 instructor, 4 TA, 5 quota, 6 enrol, 7 avail, 8 wait, 9 remarks
+# The strings are parsed once into Section records instead of being split again by every reader
+import collections
+
+# One row of the schedule: time, venue, instructor and TA of a meeting, lines joined with "\n"
+Meeting = collections.namedtuple("Meeting", ["time", "venue", "instructor", "ta"])
+
+# Reserved quota of a department
+Reserved = collections.namedtuple("Reserved", ["dept", "quota", "enrol", "avail"])
+
+class Section:
+    __slots__ = ("code", "meetings", "quota", "enrol", "avail", "wait", "reserved", "remarks")
+
+    def __init__(self, code, meetings, quota, enrol, avail, wait, reserved, remarks):
+        self.code = code
+        self.meetings = meetings  # Tuple of Meeting
+        self.quota = quota
+        self.enrol = enrol
+        self.avail = avail
+        self.wait = wait
+        self.reserved = reserved  # Tuple of Reserved, in the order of the website
+        self.remarks = remarks  # Tuple of remarks lines, without empty lines
+
+    def __repr__(self):
+        return f"Section({self.code!r}, quota={self.quota}, enrol={self.enrol}, avail={self.avail}, wait={self.wait})"
+
+    # Total quota/enrol/avail/wait
+    def totals(self):
+        return [self.quota, self.enrol, self.avail, self.wait]
+
+    # Reserved quotas: {dept: Reserved}
+    def reserved_dict(self):
+        return {r.dept: r for r in self.reserved}
+
+# Parse a reserved quota line, e.g. "MATH: 25/24/1"
+# Returns None if the line is not in this format: one odd line must not fail the whole subject
+def parse_reserved(line):
+    dept, separator, numbers = line.partition(": ")
+    numbers = numbers.split("/")
+    if separator == "" or len(numbers) < 3:
+        return None
+    try:
+        return Reserved(dept, *[int(n) for n in numbers[0: 3]])
+    except ValueError:
+        return None
+
+# Parse a section list into a Section
+def parse_section(section):
+    # Schedule rows are separated by 2 empty lines
+    # Columns can have less rows than the time column if the website left them empty
+    rows = [section[i].split("\n\n\n") for i in range(1, 5)]
+    meetings = tuple(
+        Meeting(*[column[i] if i < len(column) else "" for column in rows])
+        for i in range(len(rows[0]))
+    )
+
+    # First line is the total, reserved quotas ("DEPT: quota/enrol/avail") start from the third line
+    quota_lines = section[5].split("\n")
+    reserved = [r for r in map(parse_reserved, quota_lines[2: ]) if r is not None]
+
+    remarks = tuple(r for r in section[9].split("\n") if r not in ['', '\xa0'])
+
+    return Section(
+        section[0],
+        meetings,
+        int(quota_lines[0]),
+        *[int(section[i].split("\n", 1)[0]) for i in range(6, 9)],
+        tuple(reserved),
+        remarks
+    )
+
+# Parsed sections of recently used courses: {id(sections dict): (sections dict, {section code: Section})}
+# Course dicts of loaded quotas files are shared (see quota_store): their sections are parsed once per file version
+section_cache = collections.OrderedDict()
+max_cached_courses = 5000
+
+# Get parsed sections of a course dict
+# Returns {section code: Section} in the order of the course dict, shared by all callers: don't edit it
+def get_sections(course):
+    sections = course['sections']
+    cached = section_cache.get(id(sections))
+    # Cache holds the sections dict: its id can't be reused by another dict while cached
+    if cached is not None and cached[0] is sections:
+        section_cache.move_to_end(id(sections))
+        return cached[1]
+
+    parsed = parse_sections(course)
+    set_sections(course, parsed)
+    return parsed
+
+# Parse all sections of a course dict
+# Returns {section code: Section} in the order of the course dict
+def parse_sections(course):
+    return {k: parse_section(v) for k, v in course['sections'].items()}
+
+# Keep sections of a course dict parsed elsewhere (see quota_parser), returned by get_sections() from now on
+def set_sections(course, parsed):
+    sections = course['sections']
+    section_cache[id(sections)] = (sections, parsed)
+    section_cache.move_to_end(id(sections))
+    if len(section_cache) > max_cached_courses:
+        section_cache.popitem(last=False)  # Least recently used
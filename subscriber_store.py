@@ -0,0 +1,204 @@
+# subscriber_store.py
+# Subscribers database shared by Tab and Hill
+# SQLite in WAL mode: both bots read while the other writes, every edit is its own transaction
+# Subscribers of every course are also kept in memory, rebuilt only when the database was changed
+import contextlib
+import os
+import json
+import sqlite3
+
+subs_database = 'subscribers.db'
+# Subscribers file used before the database, imported by the first bot to open the database
+subs_json = 'subscribers.json'
+
+# Max number of courses a user can subscribe to
+max_courses = 10
+
+connection = None
+
+# {course code: set of user ids} of confirmed subscribers with less than 3 strikes
+course_index = {}
+# data_version of the database when the index was built, None if it must be rebuilt
+index_version = None
+
+# Get the database connection, create and migrate the database on first use
+def get_connection():
+    global connection, index_version
+    if connection is None:
+        index_version = None  # data_version is only comparable on the same connection
+        # Autocommit: transactions are opened explicitly by transaction()
+        connection = sqlite3.connect(subs_database, timeout=10, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        create_tables(connection)
+        try:
+            # Import is retried until it completes: it is recorded in the same transaction as the imported subscribers
+            if os.path.exists(subs_json) and get_meta(connection, "json_migrated") is None:
+                migrate_from_json(subs_json)
+        except:
+            # Set up again on next use
+            connection.close()
+            connection = None
+            raise
+    return connection
+
+def create_tables(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            confirm INTEGER NOT NULL DEFAULT 0,
+            strikes INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            user_id TEXT NOT NULL REFERENCES users(user_id),
+            course_code TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (user_id, course_code)
+        );
+        CREATE INDEX IF NOT EXISTS subscriptions_course ON subscriptions(course_code);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """)
+
+# Run statements in one write transaction
+# Taking the write lock up front: checks and writes of a transaction see the same data
+# Commits of this connection don't change data_version: the index is rebuilt after every transaction
+@contextlib.contextmanager
+def transaction():
+    global index_version
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+        index_version = None
+    except:
+        # Also when COMMIT fails (e.g. database is busy): the connection must not stay in the transaction
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+def get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key, )).fetchone()
+    return None if row is None else row[0]
+
+# Import subscribers of the JSON layout: {user id: {"confirm": int, "strikes": int, "courses": list}}
+# Imported and recorded as imported in one transaction: an interrupted import leaves nothing behind and is retried
+def migrate_from_json(filename):
+    with open(filename, encoding='utf-8') as subs_file:
+        subs = json.load(subs_file)
+
+    with transaction() as conn:
+        if get_meta(conn, "json_migrated") is not None:  # Imported by the other bot meanwhile
+            return
+        # Databases imported before imports were recorded: edits made since must not be overwritten
+        if conn.execute("SELECT 1 FROM users").fetchone() is not None:
+            subs = {}
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('json_migrated', ?)", (filename, ))
+        for user_id, entry in subs.items():
+            conn.execute("INSERT OR REPLACE INTO users VALUES (?, ?, ?)", (str(user_id), entry['confirm'], entry['strikes']))
+            conn.execute("DELETE FROM subscriptions WHERE user_id = ?", (str(user_id), ))
+            conn.executemany(
+                "INSERT OR IGNORE INTO subscriptions VALUES (?, ?, ?)",
+                [(str(user_id), course_code, position) for position, course_code in enumerate(entry['courses'])]
+            )
+
+# Export all subscribers in the JSON layout, e.g. for debugging
+def export_json(filename):
+    subs = {}
+    for user_id, confirm, strikes in get_connection().execute("SELECT user_id, confirm, strikes FROM users"):
+        subs[user_id] = {"confirm": confirm, "strikes": strikes, "courses": get_courses(user_id)}
+    with open(filename, 'w', encoding='utf-8') as outfile:
+        json.dump(subs, outfile, indent=4)
+
+# Get courses of a user in the order they subscribed
+def get_courses(user_id):
+    rows = get_connection().execute(
+        "SELECT course_code FROM subscriptions WHERE user_id = ? ORDER BY position", (str(user_id), )
+    )
+    return [row[0] for row in rows]
+
+# Get entry of a user, create it if the user is not found
+# Returns {"confirm": int, "strikes": int, "courses": list}, edits must be saved with the functions below
+def get_user(user_id):
+    conn = get_connection()
+    conn.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (str(user_id), ))
+    confirm, strikes = conn.execute("SELECT confirm, strikes FROM users WHERE user_id = ?", (str(user_id), )).fetchone()
+    return {"confirm": confirm, "strikes": strikes, "courses": get_courses(user_id)}
+
+# Subscribe a user to a course
+# Returns 0 if subscribed, 1 if the user has too many courses, 3 if already subscribed
+def add_course(user_id, course_code):
+    with transaction() as conn:
+        conn.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (str(user_id), ))
+        count, last = conn.execute(
+            "SELECT COUNT(*), MAX(position) FROM subscriptions WHERE user_id = ?", (str(user_id), )
+        ).fetchone()
+        if count >= max_courses:
+            return 1
+        if conn.execute("SELECT 1 FROM subscriptions WHERE user_id = ? AND course_code = ?", (str(user_id), course_code)).fetchone():
+            return 3
+        conn.execute("INSERT INTO subscriptions VALUES (?, ?, ?)", (str(user_id), course_code, (last or 0) + 1))
+    return 0
+
+# Unsubscribe a user from a course
+# Returns False if the user wasn't subscribed to it
+def remove_course(user_id, course_code):
+    with transaction() as conn:
+        removed = conn.execute(
+            "DELETE FROM subscriptions WHERE user_id = ? AND course_code = ?", (str(user_id), course_code)
+        ).rowcount
+    return removed > 0
+
+# Unsubscribe a user from all courses
+def clear_courses(user_id):
+    with transaction() as conn:
+        conn.execute("DELETE FROM subscriptions WHERE user_id = ?", (str(user_id), ))
+
+# Set subscription status of a user: 0 new, 1 confirmed, 2 unsubscribed
+def set_confirm(user_id, confirm):
+    with transaction() as conn:
+        conn.execute("UPDATE users SET confirm = ? WHERE user_id = ?", (confirm, str(user_id)))
+
+# Add strikes (failed DMs) to users
+# strikes: {user id: number of strikes}
+def add_strikes(strikes):
+    with transaction() as conn:
+        conn.executemany(
+            "UPDATE users SET strikes = strikes + ? WHERE user_id = ?",
+            [(n, str(user_id)) for user_id, n in strikes.items()]
+        )
+
+# Get ids of users with a subscription status
+def find_users(confirm):
+    return [row[0] for row in get_connection().execute("SELECT user_id FROM users WHERE confirm = ?", (confirm, ))]
+
+# Unsubscribe users with 3 strikes from all courses
+def unsubscribe_struck_users():
+    with transaction() as conn:
+        conn.execute("DELETE FROM subscriptions WHERE user_id IN (SELECT user_id FROM users WHERE strikes >= 3)")
+        conn.execute("UPDATE users SET confirm = 2, strikes = 0 WHERE strikes >= 3")  # Set status to "unsubscribed", reset strikes
+
+# Get the index of subscribers of every course
+# Rebuilt if the database was changed by the other bot (data_version) or by this one (transaction())
+def get_course_index():
+    global index_version
+    conn = get_connection()
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if version != index_version:
+        course_index.clear()
+        rows = conn.execute(
+            "SELECT s.user_id, s.course_code FROM subscriptions s JOIN users u ON u.user_id = s.user_id "
+            "WHERE u.confirm = 1 AND u.strikes < 3"  # Must be verified (confirmed)
+        )
+        for user_id, course_code in rows:
+            course_index.setdefault(course_code, set()).add(user_id)
+        index_version = version
+    return course_index
+
+# Get ids of users to notify about a course
+# Must also be verified (confirmed) with less than 3 strikes
+def find_subscribers(course_code):
+    return set(get_course_index().get(course_code, ()))
@@ -0,0 +1,58 @@
+# test_diff_engine.py
+# Changes between quotas dicts, sections of events are the parsed sections of the quotas
+import copy
+import os
+
+import pytest
+
+import diff_engine
+import quota_parser
+import section_model
+
+@pytest.fixture
+def quotas():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "subject_MATH.html"), 'rb') as page:
+        return quota_parser.parse_subject_page_bs4(page.read())
+
+def test_unchanged(quotas):
+    assert diff_engine.diff_quotas(copy.deepcopy(quotas), quotas) == []
+
+def test_section_changes(quotas):
+    new_quotas = copy.deepcopy(quotas)
+    section = new_quotas["MATH1013"]["sections"]["L01 (1100)"]
+    section[2] = "Rm 2407\n\n\nTBA"  # Venue of first meeting
+    section[5] = "210"  # Total quota
+    section[9] = "> Moved"
+
+    events = diff_engine.diff_quotas(new_quotas, quotas)
+    assert [(e.kind, e.course_code, e.section) for e in events] == [
+        ("quota", "MATH1013", "L01 (1100)"),
+        ("venue", "MATH1013", "L01 (1100)"),
+        ("remarks", "MATH1013", "L01 (1100)")
+    ]
+    # Parsed once: events carry the sections of the quotas
+    assert events[0].new is section_model.get_sections(new_quotas["MATH1013"])["L01 (1100)"]
+    assert events[0].old is section_model.get_sections(quotas["MATH1013"])["L01 (1100)"]
+    assert events[0].new.quota == 210
+
+def test_new_and_deleted_sections(quotas):
+    new_quotas = copy.deepcopy(quotas)
+    sections = new_quotas["MATH1013"]["sections"]
+    sections["L02 (1102)"] = sections.pop("L01 (1100)")[:]
+    sections["L02 (1102)"][0] = "L02 (1102)"
+
+    events = diff_engine.diff_quotas(new_quotas, quotas)
+    assert [(e.kind, e.section) for e in events] == [("new_section", "L02 (1102)"), ("section_deleted", "L01 (1100)")]
+    assert isinstance(events[0].new, section_model.Section) and events[0].old is None
+    assert isinstance(events[1].old, section_model.Section) and events[1].new is None
+
+def test_malformed_reserved_quotas(quotas):
+    new_quotas = copy.deepcopy(quotas)
+    section = new_quotas["MATH1013"]["sections"]["T01A (1101)"]
+    section[5] = "50\nQuota/Enrol/Avail\nMATH: 25/24/1\nReserved for exchange students\nSSCI 10/10/0\nUG: 15/x/0"
+
+    # Odd lines are skipped instead of failing the comparison
+    events = diff_engine.diff_quotas(new_quotas, quotas)
+    assert [(e.kind, e.section) for e in events] == [("quota", "T01A (1101)")]
+    assert events[0].new.quota == 50
+    assert events[0].new.reserved == (section_model.Reserved("MATH", 25, 24, 1), )
@@ -0,0 +1,90 @@
+# test_notify_dispatcher.py
+# Notification dispatcher: sends to one route stay in order, a busy route doesn't hold up the others
+import asyncio
+
+import pytest
+
+import config
+import notify_dispatcher
+
+@pytest.fixture(autouse=True)
+def dispatcher(monkeypatch):
+    monkeypatch.setattr(config, "dispatch_workers", 2)
+    monkeypatch.setattr(config, "dispatch_retries", 3)
+    monkeypatch.setattr(config, "dispatch_retry_delay", 0.01)
+    yield
+    notify_dispatcher.stop_workers()
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 5))
+
+def test_burst_to_one_route_doesnt_block_others():
+    sent = []
+
+    async def main():
+        release = asyncio.Event()
+
+        def slow_send(n):
+            async def send():
+                await release.wait()
+                sent.append(("slow", n))
+            return send
+
+        def fast_send(n):
+            async def send():
+                sent.append(("fast", n))
+                if n == 2:
+                    release.set()
+            return send
+
+        for n in range(5):
+            notify_dispatcher.dispatch(0, "slow", slow_send(n))
+        for n in range(3):
+            notify_dispatcher.dispatch(1, ("fast", n), fast_send(n))
+        await notify_dispatcher.join()
+        notify_dispatcher.stop_workers()
+
+    run(main())
+    # All fast routes were sent while the first slow send waited
+    assert sent[0: 3] == [("fast", 0), ("fast", 1), ("fast", 2)]
+    assert sent[3: ] == [("slow", n) for n in range(5)]
+
+def test_retries_keep_route_order():
+    sent = []
+    failures = {1: 2}  # Second send fails twice
+
+    async def main():
+        def send(n):
+            async def send():
+                if failures.get(n, 0) > 0:
+                    failures[n] -= 1
+                    raise ConnectionError
+                sent.append(n)
+            return send
+
+        for n in range(4):
+            notify_dispatcher.dispatch(3 - n, "route", send(n))  # Later sends are more important
+        await notify_dispatcher.join()
+        notify_dispatcher.stop_workers()
+
+    run(main())
+    assert sent == [0, 1, 2, 3]
+
+def test_dropped_and_forbidden_sends_finish():
+    forbidden = []
+
+    async def main():
+        async def fail():
+            raise ConnectionError
+
+        async def refuse():
+            raise notify_dispatcher.discord.errors.Forbidden(type("Response", (), {"status": 403, "reason": "Forbidden"})(), "Cannot send messages to this user")
+
+        notify_dispatcher.dispatch(0, "a", fail)
+        notify_dispatcher.dispatch(0, "b", refuse, on_forbidden=lambda: forbidden.append("b"))
+        await notify_dispatcher.join()
+        assert notify_dispatcher.routes == {}
+        notify_dispatcher.stop_workers()
+
+    run(main())
+    assert forbidden == ["b"]
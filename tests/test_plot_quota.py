@@ -0,0 +1,74 @@
+# test_plot_quota.py
+# /graph: rendered graphs are reused until the section's trend changes
+import json
+import os
+
+import pytest
+
+import get_quota
+import graph_cache
+import plot_quota
+import trend_store
+
+semester = str(get_quota.semester_code)
+
+@pytest.fixture(autouse=True)
+def graph_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    graph_cache.memory_cache.clear()
+    graph_cache.memory_size = 0
+    graph_cache.disk_files = None
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "subject_MATH.json"), encoding='utf-8') as expected:
+        quotas = json.load(expected)
+    quotas['time'] = 1000
+    with open('quotas.json', 'w', encoding='utf-8') as quotas_file:
+        json.dump(quotas, quotas_file)
+    yield tmp_path
+    for conn in list(trend_store.connections.values()) + list(trend_store.read_connections.values()):
+        conn.close()
+    trend_store.connections.clear()
+    trend_store.read_connections.clear()
+
+@pytest.fixture
+def renders(monkeypatch):
+    rendered = []
+    render_plot = plot_quota.render_plot
+    def counting_render_plot(course_code, section, sem=""):
+        rendered.append((course_code, section))
+        return render_plot(course_code, section, sem=sem)
+    monkeypatch.setattr(plot_quota, "render_plot", counting_render_plot)
+    return rendered
+
+def snapshot(section_code, loop, enrol):
+    return {
+        "course_code": "MATH1013", "section_code": section_code, "class_nbr": 1100, "time": 1000 + loop * 900, "loop": loop,
+        "total": [200, enrol, 200 - enrol, 0], "reserved": []
+    }
+
+def append(snapshots, loop):
+    trend_store.append_snapshots(semester, snapshots, 1000 + loop * 900, loop)
+
+def test_graph_reused_across_unrelated_loops(renders):
+    append([snapshot("L01", 1, 190), snapshot("T01A", 1, 40)], 1)
+    embed, image = plot_quota.compose_embed_with_plot("MATH1013", "L01")
+    assert embed not in ["unavailable", "course_code", "section_code", "no_trends"]
+    assert renders == [("MATH1013", "L01")]
+
+    # Another section changed: the loop of the trends moved on, the graph of L01 is the same
+    append([snapshot("T01A", 2, 45)], 2)
+    plot_quota.compose_embed_with_plot("MATH1013", "L01")
+    assert renders == [("MATH1013", "L01")]
+
+    # L01 changed: rendered again
+    append([snapshot("L01", 3, 195)], 3)
+    plot_quota.compose_embed_with_plot("MATH1013", "L01")
+    assert renders == [("MATH1013", "L01")] * 2
+
+def test_section_without_trends(renders):
+    # No trends database yet
+    assert plot_quota.compose_embed_with_plot("MATH1013", "L01") == ("no_trends", None)
+
+    # Trends of other sections only, e.g. L01 was just added
+    append([snapshot("T01A", 1, 40)], 1)
+    assert plot_quota.compose_embed_with_plot("MATH1013", "L01") == ("no_trends", None)
+    assert renders == []
@@ -0,0 +1,116 @@
+# test_quota_parser.py
+# Golden-file tests of the subject page parsers
+# Fixtures reproduce the markup of the Class Schedule & Quota website, subject_*.json are the expected course dicts
+# Both backends must produce exactly the expected dicts
+import asyncio
+import concurrent.futures
+import json
+import os
+
+import pytest
+
+import quota_parser
+import section_model
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+subjects = ["COMP", "MATH"]
+
+def read_page(name):
+    with open(os.path.join(fixtures, name), 'rb') as page:
+        return page.read()
+
+def read_expected(subject):
+    with open(os.path.join(fixtures, f"subject_{subject}.json"), encoding='utf-8') as expected:
+        return json.load(expected)
+
+@pytest.mark.parametrize("subject", subjects)
+def test_bs4_matches_golden_file(subject):
+    assert quota_parser.parse_subject_page_bs4(read_page(f"subject_{subject}.html")) == read_expected(subject)
+
+@pytest.mark.parametrize("subject", subjects)
+def test_lxml_matches_bs4(subject):
+    quota_parser_lxml = pytest.importorskip("quota_parser_lxml")
+    page = read_page(f"subject_{subject}.html")
+    assert quota_parser_lxml.parse_subject_page(page) == quota_parser.parse_subject_page_bs4(page)
+    # Same result from decoded text
+    assert quota_parser_lxml.parse_subject_page(page.decode("utf-8")) == read_expected(subject)
+
+@pytest.mark.parametrize("subject", subjects)
+def test_backends_agree(subject):
+    assert quota_parser.compare_parser_backends(read_page(f"subject_{subject}.html")) == []
+
+def test_subject_list():
+    assert quota_parser.parse_subject_list(read_page("index.html")) == ["ACCT", "COMP", "MATH"]
+
+# Edge cases, checked on the output of every backend
+@pytest.fixture(params=sorted(quota_parser.parser_backends))
+def parse(request):
+    return quota_parser.parser_backends[request.param]
+
+def test_courses_without_code_are_skipped(parse):
+    assert list(parse(read_page("subject_COMP.html"))) == ["COMP1021", "COMP4521"]
+
+def test_empty_ta_cells(parse):
+    sections = parse(read_page("subject_MATH.html"))["MATH1013"]["sections"]
+    # Empty cell of the main row, then one empty meeting per continuation row
+    assert sections["L01 (1100)"][4] == "\n\n\n"
+    assert sections["T01A (1101)"][4] == "\n\n\n\n\n\n"
+    # Empty TA list of a single meeting section
+    assert parse(read_page("subject_COMP.html"))["COMP4521"]["sections"]["L1 (2131)"][4] == ""
+
+def test_multi_meeting_sections(parse):
+    section = parse(read_page("subject_COMP.html"))["COMP1021"]["sections"]["L1 (1234)"]
+    assert section[1].split("\n\n\n") == [
+        "Mo 09:00AM - 10:20AM",
+        "We 09:00AM - 10:20AM",
+        "01-MAR-2024 - 15-MAR-2024\nFr 06:00PM - 08:50PM"
+    ]
+    assert section[2].split("\n\n\n") == ["Rm 2465, Lift 25-26 (122)", "Rm 1001, Lift 19 (98)", "LTA"]
+    # Empty venue of a continuation row isn't appended
+    math_section = parse(read_page("subject_MATH.html"))["MATH1013"]["sections"]["T01A (1101)"]
+    assert math_section[2] == "Rm 5508, Lift 25-26 (112)\n\n\nRm 5508, Lift 25-26 (112)"
+
+def test_reserved_quotas(parse):
+    sections = parse(read_page("subject_MATH.html"))["MATH1013"]["sections"]
+    # Total, heading of the reserved quotas popup, then one line per department
+    assert sections["T01A (1101)"][5] == "50\nQuota/Enrol/Avail\nMATH: 25/24/1\nSSCI: 10/10/0\nUG: 15/15/0"
+    assert sections["L01 (1100)"][5] == "200"
+
+    # Every department is parsed, none is taken for the heading
+    section = section_model.parse_section(sections["T01A (1101)"])
+    assert section.quota == 50
+    assert section.reserved == (
+        section_model.Reserved("MATH", 25, 24, 1),
+        section_model.Reserved("SSCI", 10, 10, 0),
+        section_model.Reserved("UG", 15, 15, 0)
+    )
+    assert section_model.parse_section(sections["L01 (1100)"]).reserved == ()
+
+def test_remarks(parse):
+    sections = parse(read_page("subject_COMP.html"))["COMP1021"]["sections"]
+    assert sections["L1 (1234)"][9] == "> Instructor consent required\n> For COMP students only"  # Without "show more"
+    assert sections["T1 (1235)"][9] == "\u00a0"  # Empty remarks
+    assert sections["LA1 (1236)"][9] == "\u00a0"  # &nbsp;
+
+def test_info_headings(parse):
+    info = parse(read_page("subject_COMP.html"))["COMP1021"]["info"]
+    assert list(info) == ["MATCHING", "ATTRIBUTES", "PRE- REQUISITE", "EXCLUSION", "DESCRIPTION"]
+    assert info["MATCHING"] == "[Matching between Lecture & Lab required]"
+    assert info["ATTRIBUTES"] == "Common Core (S&T) for 2022 & after\nCommon Core (SA) for 2025 & after"
+    # Nested tables in the info popup
+    math_info = parse(read_page("subject_MATH.html"))["MATH1013"]["info"]
+    assert math_info["INTENDED LEARNING OUTCOMES"] == "1.\nUnderstand limits\n2.\nApply derivatives"
+
+# Sections parsed by the parser pool are used by get_sections() without parsing them again
+def test_pool_returns_parsed_sections(monkeypatch):
+    with concurrent.futures.ThreadPoolExecutor(1) as pool:
+        courses = asyncio.run(quota_parser.parse_in_pool(pool, read_page("subject_MATH.html")))
+    assert courses == read_expected("MATH")
+
+    def parse_section(section):
+        raise AssertionError("parsed again")
+    monkeypatch.setattr(section_model, "parse_section", parse_section)
+    sections = section_model.get_sections(courses["MATH1013"])
+    assert list(sections) == list(courses["MATH1013"]["sections"])
+    assert sections["L01 (1100)"].quota == 200
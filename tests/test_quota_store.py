@@ -0,0 +1,52 @@
+# test_quota_store.py
+# Quotas files: the snapshot is only read while it holds the same quotas as the JSON file
+import json
+import os
+
+import pytest
+
+import quota_snapshot
+import quota_store
+
+@pytest.fixture(autouse=True)
+def quotas_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    quota_store.loaded_quotas.clear()
+    yield tmp_path
+    quota_store.loaded_quotas.clear()
+
+def make_quotas(title, time):
+    return {"MATH1013": {"title": title, "sections": {}, "info": {}}, "time": time}
+
+def test_snapshot_is_read():
+    assert quota_store.save_quotas("quotas.json", make_quotas("Calculus IB", 1000)) is None
+    quota_store.loaded_quotas.clear()
+    quotas = quota_store.load_quotas("quotas.json")
+    assert isinstance(quotas, quota_snapshot.LazyQuotas)
+    assert quotas["MATH1013"]["title"] == "Calculus IB"
+
+def test_stale_snapshot_with_same_mtime_is_ignored():
+    quota_store.save_quotas("quotas.json", make_quotas("Calculus IB", 1000))
+    snapshot_mtime = os.stat(quota_snapshot.snapshot_filename("quotas.json")).st_mtime_ns
+
+    # JSON file replaced without a new snapshot within the same mtime tick
+    with open("quotas.json", 'w', encoding='utf-8') as quotas_file:
+        json.dump(make_quotas("Calculus IA", 1900), quotas_file)
+    os.utime("quotas.json", ns=(snapshot_mtime, snapshot_mtime))
+
+    quotas = quota_store.load_quotas("quotas.json")
+    assert quotas["MATH1013"]["title"] == "Calculus IA"
+    assert quotas["time"] == 1900
+
+def test_failed_snapshot_is_returned(monkeypatch):
+    def fail(filename, quotas):
+        raise OSError("disk full")
+    quota_store.save_quotas("quotas.json", make_quotas("Calculus IB", 1000))
+    monkeypatch.setattr(quota_snapshot, "write_snapshot", fail)
+
+    error = quota_store.save_quotas("quotas.json", make_quotas("Calculus IA", 1900))
+    assert isinstance(error, OSError)
+    # JSON file is saved, the old snapshot is removed
+    assert not os.path.exists(quota_snapshot.snapshot_filename("quotas.json"))
+    quota_store.loaded_quotas.clear()
+    assert quota_store.load_quotas("quotas.json")["MATH1013"]["title"] == "Calculus IA"
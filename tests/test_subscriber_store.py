@@ -0,0 +1,90 @@
+# test_subscriber_store.py
+# Subscribers database: the subscribers file is imported once and completely, failed transactions leave no changes
+import json
+import sqlite3
+
+import pytest
+
+import subscriber_store
+
+@pytest.fixture(autouse=True)
+def subscriber_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    if subscriber_store.connection is not None:
+        subscriber_store.connection.close()
+    subscriber_store.connection = None
+
+def write_subs_file(subs):
+    with open(subscriber_store.subs_json, 'w', encoding='utf-8') as subs_file:
+        json.dump(subs, subs_file)
+
+def test_import_subscribers_file():
+    write_subs_file({
+        "1": {"confirm": 1, "strikes": 0, "courses": ["COMP1021", "MATH1013"]},
+        "2": {"confirm": 0, "strikes": 2, "courses": []}
+    })
+    assert subscriber_store.get_courses("1") == ["COMP1021", "MATH1013"]
+    assert subscriber_store.get_user("2") == {"confirm": 0, "strikes": 2, "courses": []}
+    assert subscriber_store.find_subscribers("COMP1021") == {"1"}
+
+def test_import_once():
+    write_subs_file({"1": {"confirm": 1, "strikes": 0, "courses": ["COMP1021"]}})
+    subscriber_store.remove_course("1", "COMP1021")
+
+    # Reopened (e.g. bot restarted): the file is not imported again
+    subscriber_store.connection.close()
+    subscriber_store.connection = None
+    assert subscriber_store.get_courses("1") == []
+
+def test_interrupted_import_is_retried():
+    with open(subscriber_store.subs_json, 'w', encoding='utf-8') as subs_file:
+        subs_file.write('{"1": {"confirm": 1, ')  # Half-written file
+    with pytest.raises(json.JSONDecodeError):
+        subscriber_store.get_connection()
+    assert subscriber_store.connection is None
+
+    write_subs_file({"1": {"confirm": 1, "strikes": 0, "courses": ["COMP1021"]}})
+    assert subscriber_store.get_courses("1") == ["COMP1021"]
+
+def test_database_imported_before_imports_were_recorded():
+    conn = sqlite3.connect(subscriber_store.subs_database)
+    subscriber_store.create_tables(conn)
+    conn.execute("DROP TABLE meta")
+    conn.execute("INSERT INTO users VALUES ('1', 1, 0)")
+    conn.commit()
+    conn.close()
+    write_subs_file({"1": {"confirm": 1, "strikes": 0, "courses": ["COMP1021"]}})
+
+    # Edits made since the import are kept
+    assert subscriber_store.get_courses("1") == []
+    assert subscriber_store.get_meta(subscriber_store.get_connection(), "json_migrated") == subscriber_store.subs_json
+
+def test_failed_transaction_is_rolled_back():
+    subscriber_store.add_course("1", "COMP1021")
+    with pytest.raises(RuntimeError):
+        with subscriber_store.transaction() as conn:
+            conn.execute("DELETE FROM subscriptions")
+            raise RuntimeError
+    assert not subscriber_store.get_connection().in_transaction
+    assert subscriber_store.get_courses("1") == ["COMP1021"]
+
+def test_index_follows_edits():
+    subscriber_store.add_course("1", "COMP1021")
+    assert subscriber_store.find_subscribers("COMP1021") == set()  # Not confirmed yet
+    subscriber_store.set_confirm("1", 1)
+    assert subscriber_store.find_subscribers("COMP1021") == {"1"}
+    subscriber_store.add_strikes({"1": 3})
+    assert subscriber_store.find_subscribers("COMP1021") == set()
+
+def test_index_follows_other_bot():
+    subscriber_store.add_course("1", "COMP1021")
+    subscriber_store.set_confirm("1", 1)
+    assert subscriber_store.find_subscribers("MATH1013") == set()
+
+    # Edited by the other bot's connection
+    conn = sqlite3.connect(subscriber_store.subs_database)
+    conn.execute("INSERT INTO subscriptions VALUES ('1', 'MATH1013', 2)")
+    conn.commit()
+    conn.close()
+    assert subscriber_store.find_subscribers("MATH1013") == {"1"}
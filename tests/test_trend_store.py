@@ -0,0 +1,92 @@
+# test_trend_store.py
+# Trends databases: readers never create databases, trends files are imported once and completely
+import json
+import os
+
+import pytest
+
+import trend_store
+
+@pytest.fixture(autouse=True)
+def trend_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    for conn in list(trend_store.connections.values()) + list(trend_store.read_connections.values()):
+        conn.close()
+    trend_store.connections.clear()
+    trend_store.read_connections.clear()
+
+def snapshot(course_code, loop, quota):
+    return {
+        "course_code": course_code, "section_code": "L1", "class_nbr": 1000, "time": 1000 + loop * 900, "loop": loop,
+        "total": [quota, 0, quota, 0], "reserved": []
+    }
+
+def write_trends_file(semester, snapshots, update_loop):
+    trends = {"_default": {"1": {"last_update_time": 1000 + update_loop * 900, "last_update_loop": update_loop}}}
+    for i, s in enumerate(snapshots):
+        document = {k: v for k, v in s.items() if k != "course_code"}
+        trends.setdefault(s["course_code"], {})[str(i + 1)] = document
+    with open(trend_store.json_filename(semester), 'w', encoding='utf-8') as trend_file:
+        json.dump(trends, trend_file)
+
+def test_readers_dont_create_databases():
+    assert trend_store.get_update_time("2330") == 0
+    assert trend_store.get_section_snapshots("2330", "COMP1021", "L1") == []
+    assert trend_store.get_section_codes("2330", "COMP1021") == []
+    assert trend_store.get_loop_times("2330", [1, 2]) == {}
+    assert not os.path.exists(trend_store.database_filename("2330"))
+    assert trend_store.list_semesters() == []
+
+def test_readers_see_writes():
+    assert trend_store.get_update_time("2330") == 0
+    trend_store.append_snapshots("2330", [snapshot("COMP1021", 1, 10)], 1900, 1)
+    trend_store.connections.clear()  # Read like another process
+    assert trend_store.get_update_time("2330", True) == 1
+    assert [s["total"][0] for s in trend_store.get_section_snapshots("2330", "COMP1021", "L1")] == [10]
+    assert trend_store.list_semesters() == ["2330"]
+
+def test_empty_database_is_not_listed():
+    trend_store.get_connection("2330")
+    assert trend_store.list_semesters() == []
+
+def test_trends_file_is_imported_by_writers():
+    write_trends_file("2330", [snapshot("COMP1021", 1, 10), snapshot("COMP1021", 3, 20)], 5)
+    assert trend_store.list_semesters() == []  # Readers don't import
+    assert trend_store.list_semesters(include_json=True) == ["2330"]
+
+    trend_store.prepare_databases()
+    assert trend_store.list_semesters() == ["2330"]
+    assert trend_store.get_update_time("2330", True) == 5
+    assert [s["loop"] for s in trend_store.get_section_snapshots("2330", "COMP1021", "L1")] == [1, 3]
+
+def test_failed_import_is_retried(monkeypatch):
+    write_trends_file("2330", [snapshot("COMP1021", 1, 10), snapshot("COMP1022", 2, 20)], 2)
+
+    # Fail after some snapshots are written
+    write_snapshots = trend_store.write_snapshots
+    def failing_write_snapshots(conn, snapshots):
+        write_snapshots(conn, snapshots[0: 1])
+        raise OSError("disk full")
+    monkeypatch.setattr(trend_store, "write_snapshots", failing_write_snapshots)
+    with pytest.raises(OSError):
+        trend_store.get_connection("2330")
+    monkeypatch.setattr(trend_store, "write_snapshots", write_snapshots)
+
+    # Nothing was kept, the import runs again on next use
+    assert trend_store.get_section_codes("2330", "COMP1021") == []
+    trend_store.get_connection("2330")
+    assert trend_store.get_section_codes("2330", "COMP1022") == ["L1"]
+    assert trend_store.get_update_time("2330", True) == 2
+
+def test_import_again_keeps_newer_trends():
+    write_trends_file("2330", [snapshot("COMP1021", 1, 10)], 1)
+    trend_store.get_connection("2330")
+    trend_store.append_snapshots("2330", [snapshot("COMP1021", 2, 20)], 2800, 2)
+
+    # Database imported before the import was recorded
+    trend_store.get_connection("2330").execute("DELETE FROM meta")
+    trend_store.connections.clear()
+    trend_store.get_connection("2330")
+    assert trend_store.get_update_time("2330", True) == 2
+    assert trend_store.get_latest_states("2330") == {("COMP1021", "L1"): trend_store.section_state([20, 0, 20, 0], [])}
@@ -0,0 +1,112 @@
+# test_update_schedule.py
+# Update schedule: bursts after refreshes, backs off in between, learns the refresh delay, stays in the hourly budget
+import importlib
+
+import pytest
+
+import config
+import update_schedule
+
+# Start of an hour, nominal refresh minutes are config.publish_minutes after it
+hour = 1700000000 - 1700000000 % 3600
+
+@pytest.fixture(autouse=True)
+def schedule():
+    importlib.reload(update_schedule)  # Forget observed delays and crawls
+    yield update_schedule
+
+def refresh(minute):
+    return hour + config.publish_minutes[minute] * 60
+
+def test_burst_then_back_off():
+    window = refresh(1)
+    start = window - config.schedule_burst_lead
+    update_schedule.observed_delays.append(0)
+    update_schedule.last_changed_window = update_schedule.previous_window(window)  # Previous refresh was seen
+
+    # No change yet: burst, crawls of the budget spread over the burst
+    update_schedule.record_crawl(start, False)
+    burst_length = config.schedule_burst_length  # Learned delay is 0
+    assert update_schedule.next_interval(start) == max(
+        config.schedule_burst_interval, burst_length / (update_schedule.window_budget() - 1)
+    )
+
+    # Change seen: back off until the next window
+    crawl = start + 60
+    update_schedule.record_crawl(crawl, True)
+    assert update_schedule.next_interval(crawl) == min(refresh(2) - config.schedule_burst_lead - crawl, config.schedule_idle_interval)
+
+def test_burst_runs_out():
+    window = refresh(1)
+    update_schedule.observed_delays.append(0)
+    update_schedule.last_changed_window = update_schedule.previous_window(window)
+    crawl = window - config.schedule_burst_lead + config.schedule_burst_length + 1
+    update_schedule.record_crawl(crawl, False)
+    assert update_schedule.next_interval(crawl) == refresh(2) - config.schedule_burst_lead - crawl
+
+def test_unseen_refresh_bursts_longer():
+    window = refresh(1)
+    crawl = window - config.schedule_burst_lead + config.schedule_burst_length + 1
+    update_schedule.record_crawl(crawl, False)
+    # Previous refresh wasn't seen: the refresh can still be up to schedule_max_delay late
+    assert update_schedule.next_interval(crawl) < refresh(2) - config.schedule_burst_lead - crawl
+
+def test_learn_delay_from_bracketed_change():
+    window = refresh(1)
+    update_schedule.record_crawl(window - 5, False)
+    update_schedule.record_crawl(window + 25, True)
+    assert list(update_schedule.observed_delays) == [10]
+    assert update_schedule.last_changed_window == window
+
+    # Later changes of the same window are not learned again
+    update_schedule.record_crawl(window + 55, True)
+    assert list(update_schedule.observed_delays) == [10]
+
+def test_first_and_failed_crawls_are_not_learned():
+    window = refresh(1)
+    update_schedule.record_crawl(window - 5, None)  # First crawl after a start
+    update_schedule.record_crawl(window + 25, True)
+    assert list(update_schedule.observed_delays) == []
+
+    update_schedule.record_crawl(refresh(2) - 5, False)
+    update_schedule.record_crawl(refresh(2) + 25, None)  # Failed crawl
+    update_schedule.record_crawl(refresh(2) + 55, True)
+    assert list(update_schedule.observed_delays) == [25]  # Bracketed by the last successful crawl
+
+def test_learned_delay_is_clamped():
+    window = refresh(1)
+    update_schedule.record_crawl(window, False)
+    update_schedule.record_crawl(window + 800, True)  # Refreshed 400 seconds late
+    assert update_schedule.learned_delay() == config.schedule_max_delay
+
+# Crawl for hours against a website refreshing `delay` seconds after the nominal minutes
+# Returns (start times of crawls, seconds from every refresh to the crawl seeing it)
+def simulate(delay, hours=12):
+    refreshes = [hour + h * 3600 + m * 60 + delay for h in range(hours + 1) for m in config.publish_minutes]
+    crawl = hour + 600
+    crawls = []
+    latencies = []
+    seen = None
+    while crawl < hour + hours * 3600:
+        crawls.append(crawl)
+        version = sum(1 for r in refreshes if r <= crawl)
+        changed = None if seen is None else version != seen
+        if changed:
+            latencies.append(crawl - refreshes[version - 1])
+        seen = version
+        update_schedule.record_crawl(crawl, changed)
+        crawl += update_schedule.next_interval(crawl)
+    return crawls, latencies
+
+@pytest.mark.parametrize("delay", [0, 60, 200, 290, 400])
+def test_hourly_budget(delay):
+    crawls, latencies = simulate(delay)
+    # Any hour, not only hours starting on the hour
+    assert max(sum(1 for c in crawls if start <= c < start + 3600) for start in crawls) <= config.schedule_max_crawls
+    # Refreshes are still seen within a burst
+    assert max(latencies[4: ]) <= 2 * config.schedule_burst_interval + config.schedule_max_delay
+
+def test_hourly_budget_with_small_budget(monkeypatch):
+    monkeypatch.setattr(config, "schedule_max_crawls", 12)
+    crawls, latencies = simulate(290)
+    assert max(sum(1 for c in crawls if start <= c < start + 3600) for start in crawls) <= 12
@@ -0,0 +1,343 @@
+# trend_store.py
+# Enrollment trends of every section, one database per semester: tabtrend{semester}.db
+# Trends are append-only: one row per section and update loop, written in one transaction per snapshot
+# Rows are clustered by (course, section, loop): the history of a section is stored together and read with one range scan
+# Latest state of every section is kept in its own table, updated with every append: changes are found without reading the history
+# Time of every loop is kept too: a section was unchanged until the loop before its next snapshot
+# SQLite in WAL mode: Hill reads while trends are written
+# Only writers (Tab, trendsetter) create databases, readers open them read-only and see no trends until they exist
+import contextlib
+import json
+import os
+import re
+import sqlite3
+
+# Trends databases, and trends files used before the database (imported by the first writer, see prepare_databases())
+trend_database_regex = re.compile(r"tabtrend(\d{4})\.db")
+trend_json_regex = re.compile(r"tabtrend(\d{4})\.json")
+
+# {semester: connection} of databases opened for writing
+connections = {}
+# {semester: connection} of databases opened read-only
+read_connections = {}
+
+def database_filename(semester):
+    return f"tabtrend{semester}.db"
+
+def json_filename(semester):
+    return f"tabtrend{semester}.json"
+
+# Get the database connection of a semester for writing, create the database and import its trends file on first use
+def get_connection(semester):
+    semester = str(semester)
+    if semester not in connections:
+        # Autocommit: transactions are opened explicitly by transaction()
+        # Shared between threads: trendsetter writes snapshots in an executor, one snapshot at a time
+        conn = sqlite3.connect(database_filename(semester), timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        create_tables(conn)
+        connections[semester] = conn
+        try:
+            # Import is retried until it completes: it is recorded in the same transaction as the imported trends
+            if os.path.exists(json_filename(semester)) and get_meta(conn, "json_migrated") is None:
+                migrate_from_json(semester, json_filename(semester))
+            if conn.execute("SELECT 1 FROM latest").fetchone() is None:
+                rebuild_latest(semester)  # Database created before the latest states were kept
+            if conn.execute("SELECT 1 FROM loop_times").fetchone() is None:
+                # Database created before loop times were kept: loops with a snapshot of any section
+                with transaction(semester):
+                    conn.execute("INSERT OR IGNORE INTO loop_times SELECT loop, MIN(time) FROM snapshots GROUP BY loop")
+        except:
+            # Set up again on next use
+            del connections[semester]
+            conn.close()
+            raise
+    return connections[semester]
+
+# Get the database connection of a semester for reading
+# Returns None if the database doesn't exist: readers never create databases
+def get_read_connection(semester):
+    semester = str(semester)
+    if semester in connections:  # Opened for writing by this process
+        return connections[semester]
+    if semester not in read_connections:
+        if not os.path.exists(database_filename(semester)):
+            return None
+        read_connections[semester] = sqlite3.connect(
+            f"file:{database_filename(semester)}?mode=ro", uri=True, timeout=10, check_same_thread=False
+        )
+    return read_connections[semester]
+
+# Open the databases of every semester with trends for writing, called by writers when they start
+# Creates tables added since a database was created and imports trends files not imported yet
+def prepare_databases():
+    for semester in list_semesters(include_json=True):
+        get_connection(semester)
+
+def create_tables(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            course_code TEXT NOT NULL,
+            section_code TEXT NOT NULL,
+            loop INTEGER NOT NULL,
+            class_nbr INTEGER NOT NULL,
+            time INTEGER NOT NULL,
+            quota INTEGER NOT NULL,
+            enrol INTEGER NOT NULL,
+            avail INTEGER NOT NULL,
+            wait INTEGER NOT NULL,
+            PRIMARY KEY (course_code, section_code, loop)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS reserved (
+            course_code TEXT NOT NULL,
+            section_code TEXT NOT NULL,
+            loop INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            dept TEXT NOT NULL,
+            quota INTEGER NOT NULL,
+            enrol INTEGER NOT NULL,
+            avail INTEGER NOT NULL,
+            PRIMARY KEY (course_code, section_code, loop, position)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS latest (
+            course_code TEXT NOT NULL,
+            section_code TEXT NOT NULL,
+            loop INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            PRIMARY KEY (course_code, section_code)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS loop_times (
+            loop INTEGER PRIMARY KEY,
+            time INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS update_time (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            last_update_time INTEGER NOT NULL,
+            last_update_loop INTEGER NOT NULL
+        );
+    """)
+
+# Run statements in one write transaction
+@contextlib.contextmanager
+def transaction(semester):
+    conn = get_connection(semester)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except:
+        # Also when COMMIT fails (e.g. database is busy): the connection must not stay in the transaction
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+def get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key, )).fetchone()
+    return None if row is None else row[0]
+
+# Append snapshots of sections and set the update time, in one transaction
+# snapshots: list of {"course_code", "section_code", "class_nbr", "time", "loop", "total": [quota, enrol, avail, wait],
+#                     "reserved": [[dept, quota, enrol, avail], ...]}
+def append_snapshots(semester, snapshots, update_time=None, update_loop=None):
+    with transaction(semester) as conn:
+        write_snapshots(conn, snapshots)
+        if update_time is not None:
+            write_update_time(conn, update_time, update_loop)
+
+# Set the update time, unless a later loop is already stored (e.g. when a trends file is imported again)
+def write_update_time(conn, update_time, update_loop):
+    conn.execute(
+        "INSERT INTO update_time VALUES (0, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET last_update_time = excluded.last_update_time, last_update_loop = excluded.last_update_loop "
+        "WHERE excluded.last_update_loop >= update_time.last_update_loop",
+        (update_time, update_loop)
+    )
+    conn.execute("INSERT OR REPLACE INTO loop_times VALUES (?, ?)", (update_loop, update_time))
+
+def write_snapshots(conn, snapshots):
+    # Snapshots already stored for the same loop are kept, e.g. when a migration is run again
+    conn.executemany(
+        "INSERT OR IGNORE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(s["course_code"], s["section_code"], s["loop"], s["class_nbr"], s["time"], *s["total"][0: 4]) for s in snapshots]
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO reserved VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (s["course_code"], s["section_code"], s["loop"], position, *r[0: 4])
+            for s in snapshots for position, r in enumerate(s["reserved"])
+        ]
+    )
+    # Keep the state of the newest loop, snapshots may be written out of order by a migration
+    conn.executemany(
+        "INSERT INTO latest VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (course_code, section_code) DO UPDATE SET loop = excluded.loop, state = excluded.state WHERE excluded.loop >= latest.loop",
+        [(s["course_code"], s["section_code"], s["loop"], json.dumps([s["total"][0: 4], s["reserved"]])) for s in snapshots]
+    )
+    conn.executemany("INSERT OR IGNORE INTO loop_times VALUES (?, ?)", {(s["loop"], s["time"]) for s in snapshots})
+
+# Fill the latest states from the stored snapshots
+def rebuild_latest(semester):
+    conn = get_connection(semester)
+    latest_loops = conn.execute("SELECT course_code, section_code, MAX(loop) FROM snapshots GROUP BY course_code, section_code").fetchall()
+    if not latest_loops:
+        return
+    snapshots = []
+    for course_code, section_code, loop in latest_loops:
+        snapshot = get_section_snapshots(semester, course_code, section_code)[-1]
+        snapshots.append({**snapshot, "course_code": course_code})
+    with transaction(semester) as conn:
+        write_snapshots(conn, snapshots)
+
+# Get last update time or loop of a semester's trends, 0 if trends were never updated
+def get_update_time(semester, loop=False):
+    conn = get_read_connection(semester)
+    if conn is None:
+        return 0
+    row = conn.execute("SELECT last_update_time, last_update_loop FROM update_time").fetchone()
+    if row is None:
+        return 0
+    return row[1] if loop else row[0]
+
+# Run a query with "IN ({})" filled with values, in batches below SQLite's limit of variables in a statement
+# Returns all rows
+def select_in(conn, query, values):
+    values = list(values)
+    rows = []
+    for i in range(0, len(values), 500):
+        batch = values[i: i + 500]
+        rows += conn.execute(query.format(", ".join("?" * len(batch))), batch)
+    return rows
+
+# Get times of loops
+# Returns {loop: time}, loops without a known time are left out
+def get_loop_times(semester, loops):
+    conn = get_read_connection(semester)
+    if conn is None:
+        return {}
+    return dict(select_in(conn, "SELECT loop, time FROM loop_times WHERE loop IN ({})", loops))
+
+# Get all snapshots of a section, oldest first
+# Returns list of dicts in the layout of append_snapshots(), without "course_code"
+def get_section_snapshots(semester, course_code, section_code):
+    conn = get_read_connection(semester)
+    if conn is None:
+        return []
+    reserved = {}
+    for loop, dept, quota, enrol, avail in conn.execute(
+        "SELECT loop, dept, quota, enrol, avail FROM reserved WHERE course_code = ? AND section_code = ? ORDER BY loop, position",
+        (course_code, section_code)
+    ):
+        reserved.setdefault(loop, []).append([dept, quota, enrol, avail])
+
+    rows = conn.execute(
+        "SELECT loop, class_nbr, time, quota, enrol, avail, wait FROM snapshots "
+        "WHERE course_code = ? AND section_code = ? ORDER BY loop",
+        (course_code, section_code)
+    )
+    return [
+        {
+            "section_code": section_code,
+            "class_nbr": class_nbr,
+            "time": time,
+            "loop": loop,
+            "total": [quota, enrol, avail, wait],
+            "reserved": reserved.get(loop, [])
+        }
+        for loop, class_nbr, time, quota, enrol, avail, wait in rows
+    ]
+
+# Get the loop of the latest snapshot of a section, changed only when the section's trend changes
+# Returns None if the section has no trends
+def get_section_loop(semester, course_code, section_code):
+    conn = get_read_connection(semester)
+    if conn is None:
+        return None
+    row = conn.execute(
+        "SELECT loop FROM latest WHERE course_code = ? AND section_code = ?", (course_code, section_code)
+    ).fetchone()
+    return None if row is None else row[0]
+
+# Get codes of sections with trends in a course, in the order they were first recorded
+def get_section_codes(semester, course_code):
+    conn = get_read_connection(semester)
+    if conn is None:
+        return []
+    rows = conn.execute(
+        "SELECT section_code FROM snapshots WHERE course_code = ? GROUP BY section_code ORDER BY MIN(loop), section_code",
+        (course_code, )
+    )
+    return [row[0] for row in rows]
+
+# Get the latest state (totals and reserved quotas) of every section of a semester, or of some courses
+# Returns {(course_code, section_code): state}, see section_state()
+def get_latest_states(semester, course_codes=None):
+    conn = get_connection(semester)
+    if course_codes is None:
+        rows = conn.execute("SELECT course_code, section_code, state FROM latest")
+    else:
+        rows = select_in(conn, "SELECT course_code, section_code, state FROM latest WHERE course_code IN ({})", course_codes)
+    return {(course_code, section_code): section_state(*json.loads(state)) for course_code, section_code, state in rows}
+
+# Hashable state of a section: (totals, reserved quotas)
+def section_state(total, reserved):
+    return tuple(total), tuple(tuple(r) for r in reserved)
+
+# Import trends of the TinyDB layout: {"_default": {id: update time document}, course_code: {id: snapshot}}
+# Imported in one transaction with a marker in the meta table: a failed import leaves nothing behind and is retried
+def migrate_from_json(semester, filename):
+    with open(filename, encoding='utf-8') as trend_file:
+        trends = json.load(trend_file)
+
+    update_time = None
+    update_loop = None
+    snapshots = []
+    for table, documents in trends.items():
+        for document in documents.values():
+            if table == "_default":
+                if "last_update_time" in document:
+                    update_time = document["last_update_time"]
+                    update_loop = document["last_update_loop"]
+                continue
+            snapshots.append({**document, "course_code": table})
+
+    with transaction(semester) as conn:
+        write_snapshots(conn, snapshots)
+        if update_time is not None:
+            write_update_time(conn, update_time, update_loop)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('json_migrated', ?)", (filename, ))
+
+# Export trends of a semester in the TinyDB layout, e.g. for debugging
+# Exports an empty file if the semester has no database
+def export_json(semester, filename):
+    conn = get_read_connection(semester)
+    trends = {"_default": {"1": {"last_update_time": get_update_time(semester), "last_update_loop": get_update_time(semester, True)}}}
+    course_codes = [] if conn is None else [row[0] for row in conn.execute("SELECT DISTINCT course_code FROM snapshots")]
+    for course_code in course_codes:
+        documents = []
+        for section_code in get_section_codes(semester, course_code):
+            documents += get_section_snapshots(semester, course_code, section_code)
+        documents.sort(key=lambda d: d["loop"])
+        trends[course_code] = {str(i + 1): d for i, d in enumerate(documents)}
+
+    with open(filename, 'w', encoding='utf-8') as outfile:
+        json.dump(trends, outfile, indent=4)
+
+# Get semesters with recorded trends
+# include_json: also semesters with only a trends file, which readers can't see until a writer imports it
+# Returns list of semester codes (str), latest first
+def list_semesters(include_json=False):
+    semesters = set()
+    for filename in os.listdir():
+        database_match = trend_database_regex.fullmatch(filename)
+        # Empty databases have no trends, e.g. created by a writer that hasn't recorded a snapshot yet
+        if database_match and get_update_time(database_match.group(1)) > 0:
+            semesters.add(database_match.group(1))
+        json_match = trend_json_regex.fullmatch(filename)
+        if include_json and json_match:
+            semesters.add(json_match.group(1))
+    return sorted(semesters, reverse=True)
@@ -6,7 +6,9 @@ import discord
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
 
+import config
 import get_quota
+import trend_store
 
 abspath = os.path.abspath(__file__)
 dname = os.path.dirname(abspath)
@@ -19,7 +21,8 @@ TOKEN = os.getenv('TRENDSETTER_TOKEN')
 intents = discord.Intents.default()
 bot = commands.Bot(command_prefix="=", intents=intents, help_command=None)
 
-# Update trends every 10 minutes
+# Update trends every 15 minutes
+# Only needed if Tab doesn't record trends in its update loop (config.trend_capture)
 @tasks.loop(minutes=15.0)
 async def set_trends():
     # Record start time of operation
@@ -60,6 +63,10 @@ async def on_ready():
             f'{guild.name}(id: {guild.id})'
         )
 
+    if config.trend_capture:
+        print("Trends are recorded by Tab, set config.trend_capture to False to record them here")
+        return
+    trend_store.prepare_databases()
     await set_trends.start()
 
 # Launch bot
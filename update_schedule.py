@@ -0,0 +1,118 @@
+# update_schedule.py
+# Plans quota updates around the refresh times of the quota website
+# Crawls in bursts right after each refresh and backs off in between
+# Learns how long after the nominal refresh minute changes actually show up
+# Never crawls more than config.schedule_max_crawls times an hour: late refreshes spread the burst out instead
+import collections
+import statistics
+
+import config
+
+# Seconds after the nominal refresh minute when changes were observed, most recent last
+observed_delays = collections.deque(maxlen=config.schedule_history)
+
+# Start time of the last successful crawl, None before the first one
+last_crawl_time = None
+# Nominal refresh time of the latest window a change was already seen in
+last_changed_window = None
+# Window of the last crawl and number of crawls (failed ones too) started in it
+crawl_window = None
+window_crawls = 0
+# Start times of crawls in the last hour, oldest first
+recent_crawls = collections.deque()
+
+# Get nominal refresh times (UNIX timestamp) of the hours around a time
+def nominal_refresh_times(stamp):
+    hour_start = stamp - stamp % 3600
+    return sorted(
+        hour_start + hour * 3600 + minute * 60
+        for hour in (-1, 0, 1)
+        for minute in config.publish_minutes
+    )
+
+# Learned delay between the nominal refresh minute and changes showing up
+# Clamped: a few bad observations can't move the bursts away from the refresh
+def learned_delay():
+    if not observed_delays:
+        return 0
+    return min(max(statistics.median(observed_delays), 0), config.schedule_max_delay)
+
+# Max number of crawls in one window
+def window_budget():
+    return config.schedule_max_crawls // len(config.publish_minutes)
+
+# Get nominal refresh time of the window a time belongs to
+# A window begins a little before the nominal refresh minute
+def current_window(stamp):
+    return max(t for t in nominal_refresh_times(stamp) if t - config.schedule_burst_lead <= stamp)
+
+# Get nominal refresh time of the window before a window
+def previous_window(window):
+    return max(t for t in nominal_refresh_times(window) if t < window)
+
+# Get start time of the next window after a time
+def next_window_start(stamp):
+    return min(t - config.schedule_burst_lead for t in nominal_refresh_times(stamp) if t - config.schedule_burst_lead > stamp)
+
+# Record the result of a crawl
+# crawl_time: start time of the crawl
+# changed: True if any subject changed since the last crawl,
+#          None if the crawl failed or had nothing to compare with (first crawl after a start)
+def record_crawl(crawl_time, changed):
+    global last_crawl_time, last_changed_window, crawl_window, window_crawls
+
+    window = current_window(crawl_time)
+    if window != crawl_window:
+        crawl_window = window
+        window_crawls = 0
+    window_crawls += 1
+    recent_crawls.append(crawl_time)
+    while recent_crawls[0] <= crawl_time - 3600:
+        recent_crawls.popleft()
+
+    # First change seen in this window
+    if changed and last_changed_window != window:
+        # Learn when the refresh happened only if it is known to be between the last crawl and this one
+        if last_crawl_time is not None and last_crawl_time >= window - config.schedule_burst_lead:
+            refresh_time = (last_crawl_time + crawl_time) / 2
+            observed_delays.append(min(max(refresh_time - window, 0), config.schedule_max_delay))
+            last_changed_window = window
+        # Found by the first crawl of the window: it may have happened any time before
+        # It is the refresh of this window only if the refresh of the previous window was seen,
+        # otherwise the previous refresh came after its burst: keep bursting for this one
+        elif last_changed_window == previous_window(window):
+            last_changed_window = window
+
+    if changed is not None:
+        last_crawl_time = crawl_time
+
+# Get seconds between the start of a crawl and the start of the next one
+# Delayed if needed so that no hour has more than config.schedule_max_crawls crawls
+def next_interval(crawl_time):
+    interval = planned_interval(crawl_time)
+    if len(recent_crawls) >= config.schedule_max_crawls:
+        interval = max(interval, recent_crawls[-config.schedule_max_crawls] + 3600 - crawl_time)
+    return interval
+
+# Interval planned from the refresh windows and the learned delay, before the hourly limit
+def planned_interval(crawl_time):
+    window = current_window(crawl_time)
+    window_start = window - config.schedule_burst_lead
+
+    # Burst from the nominal refresh minute until a change is seen,
+    # or until the burst runs out after the learned refresh time
+    # Burst as long as the refresh can be late if the refresh of the previous window wasn't seen
+    burst_length = learned_delay() + config.schedule_burst_length
+    if last_changed_window != previous_window(window):
+        burst_length = config.schedule_max_delay + config.schedule_burst_length
+    # Crawls left in the window's budget are spread over the rest of the burst
+    burst_end = window_start + burst_length
+    crawls_left = window_budget() - window_crawls if crawl_window == window else window_budget()
+    if last_changed_window != window and crawl_time < burst_end and crawls_left > 0:
+        return max(config.schedule_burst_interval, (burst_end - crawl_time) / crawls_left)
+
+    # Back off until the next window, straight to it if the budget is used up
+    wait = next_window_start(crawl_time) - crawl_time
+    if crawls_left <= 0:
+        return wait
+    return max(config.schedule_burst_interval, min(wait, config.schedule_idle_interval))